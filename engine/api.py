@@ -2,16 +2,19 @@
 
 from __future__ import annotations
 
+import json
 import os
 import time
 from pathlib import Path
 
 from fastapi import Depends, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 
+from engine import workers
 from engine.auth import Role, require_authenticated, require_owner, resolve_role
 from engine.config import get_owner_dir, load_config
+from engine.embedding_service import batcher_stats, cache_stats
 from engine.schemas_api import (
     APIResponse,
     AskRequest,
@@ -36,9 +39,18 @@ app = FastAPI(title="Mind Spiral API", version="0.1.0")
 
 @app.on_event("startup")
 async def _preload_embedding_model():
-    """啟動時預載 embedding model，避免首次請求等 ~16s。"""
+    """啟動時建立 worker pool 並預載 embedding model，避免首次請求等 ~16s。"""
     from engine.signal_store import _get_global_embedder
-    _get_global_embedder(_config)
+    workers.configure(_config)
+    await workers.run_blocking(_get_global_embedder, _config)
+
+
+@app.on_event("shutdown")
+async def _close_chroma_clients():
+    """關閉 worker pool 與所有 owner 共用的 ChromaDB client。"""
+    from engine.chroma_registry import close_all
+    workers.shutdown()
+    close_all()
 
 # CORS
 _cors_origins = os.environ.get("MIND_SPIRAL_CORS_ORIGINS", "*").split(",")
@@ -63,9 +75,47 @@ async def http_exception_handler(request, exc):
     )
 
 
+@app.exception_handler(workers.WorkerPoolFull)
+async def worker_pool_full_handler(request, exc):
+    return JSONResponse(
+        status_code=503,
+        headers={"Retry-After": "5"},
+        content=ErrorResponse(
+            error=ErrorDetail(code="503", message="伺服器忙碌中，請稍後再試"),
+        ).model_dump(),
+    )
+
+
 # ─── Helpers ───
 
 
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _sse_response(events) -> StreamingResponse:
+    """把 (event, data) async generator 包成 text/event-stream。
+
+    先在 handler 內取出第一個事件（檢索完成的 context），pool 滿或檢索出錯時
+    仍能回正常的錯誤狀態碼；開始串流之後的錯誤改送 error 事件。
+    """
+    first = await events.__anext__()
+
+    async def _body():
+        yield _sse(*first)
+        try:
+            async for event, data in events:
+                yield _sse(event, data)
+        except Exception as e:
+            yield _sse("error", {"message": str(e)})
+
+    return StreamingResponse(
+        _body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 def _check_owner_exists(owner_id: str):
     owner_dir = get_owner_dir(_config, owner_id)
     if not (owner_dir / "signals.jsonl").exists():
@@ -86,6 +136,9 @@ async def health():
             "version": "0.1.0",
             "uptime_seconds": round(uptime, 1),
             "chromadb_version": chromadb.__version__,
+            "worker_pool": workers.pool_stats(),
+            "embedding_batcher": batcher_stats(),
+            "embedding_cache": cache_stats(),
         },
     ).model_dump()
 
@@ -99,23 +152,30 @@ async def stats(owner_id: str):
     from engine.frame_clusterer import _load_frames
     from engine.identity_scanner import _load_identity
 
+    def _collect() -> dict:
+        owner_dir = get_owner_dir(_config, owner_id)
+        store = SignalStore(_config, owner_id)
+        return {
+            "signals": store.stats(),
+            "convictions_count": len(_load_convictions(owner_dir)),
+            "traces_count": len(_load_traces(owner_dir)),
+            "frames_count": len(_load_frames(owner_dir)),
+            "identities_count": len(_load_identity(owner_dir)),
+        }
+
     _check_owner_exists(owner_id)
-    owner_dir = get_owner_dir(_config, owner_id)
-    store = SignalStore(_config, owner_id)
+    return APIResponse(data=await workers.run_blocking(_collect)).model_dump()
 
-    signal_stats = store.stats()
-    convictions = _load_convictions(owner_dir)
-    traces = _load_traces(owner_dir)
-    frames = _load_frames(owner_dir)
-    identities = _load_identity(owner_dir)
+
+@app.get("/stats/cache")
+async def cache_stats_endpoint(role: Role = Depends(require_owner)):
+    """Query 快取用量 — 各 owner 的估計 bytes（分層）、閒置時間與淘汰次數。僅 owner。"""
+    from engine.query_engine import cache_stats as query_cache_stats
 
     return APIResponse(
         data={
-            "signals": signal_stats,
-            "convictions_count": len(convictions),
-            "traces_count": len(traces),
-            "frames_count": len(frames),
-            "identities_count": len(identities),
+            "query_cache": query_cache_stats(),
+            "embedding_cache": cache_stats(),
         },
     ).model_dump()
 
@@ -126,10 +186,10 @@ async def ask_endpoint(
     role: Role = Depends(resolve_role),
 ):
     """統一入口 — 自動判斷 query 或 generate。"""
-    from engine.query_engine import ask
+    from engine.query_engine import aask
 
     _check_owner_exists(req.owner_id)
-    result = ask(
+    result = await aask(
         owner_id=req.owner_id,
         text=req.text,
         caller=req.caller_id,
@@ -144,10 +204,10 @@ async def query_endpoint(
     role: Role = Depends(resolve_role),
 ):
     """五層感知查詢。"""
-    from engine.query_engine import query
+    from engine.query_engine import aquery
 
     _check_owner_exists(req.owner_id)
-    result = query(
+    result = await aquery(
         owner_id=req.owner_id,
         question=req.question,
         caller=req.caller_id,
@@ -162,10 +222,10 @@ async def generate_endpoint(
     role: Role = Depends(resolve_role),
 ):
     """Generation Mode — 產出內容。"""
-    from engine.query_engine import generate
+    from engine.query_engine import agenerate
 
     _check_owner_exists(req.owner_id)
-    result = generate(
+    result = await agenerate(
         owner_id=req.owner_id,
         task=req.text,
         output_type=req.output_type,
@@ -175,6 +235,58 @@ async def generate_endpoint(
     return APIResponse(data=result).model_dump()
 
 
+@app.post("/ask/stream")
+async def ask_stream_endpoint(
+    req: AskRequest,
+    role: Role = Depends(resolve_role),
+):
+    """統一入口（SSE 串流）— 先送 context 事件，再逐段送 token，最後 done。"""
+    from engine.query_engine import astream_ask
+
+    _check_owner_exists(req.owner_id)
+    return await _sse_response(astream_ask(
+        owner_id=req.owner_id,
+        text=req.text,
+        caller=req.caller_id,
+        config=_config,
+    ))
+
+
+@app.post("/query/stream")
+async def query_stream_endpoint(
+    req: QueryRequest,
+    role: Role = Depends(resolve_role),
+):
+    """五層感知查詢（SSE 串流）。"""
+    from engine.query_engine import astream_query
+
+    _check_owner_exists(req.owner_id)
+    return await _sse_response(astream_query(
+        owner_id=req.owner_id,
+        question=req.question,
+        caller=req.caller_id,
+        config=_config,
+    ))
+
+
+@app.post("/generate/stream")
+async def generate_stream_endpoint(
+    req: GenerateRequest,
+    role: Role = Depends(resolve_role),
+):
+    """Generation Mode（SSE 串流）。"""
+    from engine.query_engine import astream_generate
+
+    _check_owner_exists(req.owner_id)
+    return await _sse_response(astream_generate(
+        owner_id=req.owner_id,
+        task=req.text,
+        output_type=req.output_type,
+        caller=req.caller_id,
+        config=_config,
+    ))
+
+
 @app.post("/context")
 async def context_endpoint(
     req: ContextRequest,
@@ -188,7 +300,8 @@ async def context_endpoint(
     from engine.query_engine import context
 
     _check_owner_exists(req.owner_id)
-    result = context(
+    result = await workers.run_blocking(
+        context,
         owner_id=req.owner_id,
         question=req.question,
         caller=req.caller_id,
@@ -238,7 +351,7 @@ async def ingest_endpoint(
         )
         signals.append(signal)
 
-    count = store.ingest(signals)
+    count = await workers.run_blocking(store.ingest, signals)
     return APIResponse(
         data={"ingested": count, "total_submitted": len(req.signals)},
     ).model_dump()
@@ -256,7 +369,8 @@ async def recall_endpoint(
     from engine.explorer import recall
 
     _check_owner_exists(req.owner_id)
-    result = recall(
+    result = await workers.run_blocking(
+        recall,
         owner_id=req.owner_id,
         text=req.text,
         context=req.context,
@@ -278,7 +392,8 @@ async def explore_endpoint(
     from engine.explorer import explore
 
     _check_owner_exists(req.owner_id)
-    result = explore(
+    result = await workers.run_blocking(
+        explore,
         owner_id=req.owner_id,
         topic=req.topic,
         depth=req.depth,
@@ -296,7 +411,8 @@ async def evolution_endpoint(
     from engine.explorer import evolution
 
     _check_owner_exists(req.owner_id)
-    result = evolution(
+    result = await workers.run_blocking(
+        evolution,
         owner_id=req.owner_id,
         topic=req.topic,
         config=_config,
@@ -313,7 +429,7 @@ async def blindspots_endpoint(
     from engine.explorer import blindspots
 
     _check_owner_exists(owner_id)
-    result = blindspots(owner_id=owner_id, config=_config)
+    result = await workers.run_blocking(blindspots, owner_id=owner_id, config=_config)
     return APIResponse(data=result).model_dump()
 
 
@@ -326,7 +442,8 @@ async def connections_endpoint(
     from engine.explorer import connections
 
     _check_owner_exists(req.owner_id)
-    result = connections(
+    result = await workers.run_blocking(
+        connections,
         owner_id=req.owner_id,
         topic_a=req.topic_a,
         topic_b=req.topic_b,
@@ -341,10 +458,10 @@ async def simulate_endpoint(
     role: Role = Depends(resolve_role),
 ):
     """模擬預測 — 假設情境下的反應路徑。"""
-    from engine.explorer import simulate
+    from engine.explorer import asimulate
 
     _check_owner_exists(req.owner_id)
-    result = simulate(
+    result = await asimulate(
         owner_id=req.owner_id,
         scenario=req.scenario,
         context=req.context,
@@ -0,0 +1,82 @@
+"""ChromaDB client registry — 同一個 owner 在 process 內共用一個 PersistentClient
+
+SignalStore、query_engine、explorer 都從這裡拿 client / collection，
+避免每個請求重新開 SQLite、重新載入 HNSW segments。
+"""
+
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+
+import chromadb
+
+
+_clients: dict[str, chromadb.ClientAPI] = {}
+_collections: dict[tuple[str, str], object] = {}
+_lock = threading.RLock()
+
+
+def _key(owner_dir: Path) -> str:
+    return str((owner_dir / "chroma").resolve())
+
+
+def get_client(owner_dir: Path) -> chromadb.ClientAPI:
+    """取得該 owner 共用的 ChromaDB client（第一次呼叫時建立）。"""
+    key = _key(owner_dir)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = chromadb.PersistentClient(path=key)
+            _clients[key] = client
+        return client
+
+
+def get_collection(owner_dir: Path, name: str, create: bool = False):
+    """取得 collection handle 並快取。
+
+    create=False 時 collection 不存在會丟例外（同 chromadb.get_collection），
+    呼叫端沿用既有的 try/except 處理索引尚未建立的情況。
+    """
+    key = (_key(owner_dir), name)
+    with _lock:
+        col = _collections.get(key)
+        if col is not None:
+            return col
+        client = get_client(owner_dir)
+        if create:
+            col = client.get_or_create_collection(name=name, metadata={"hnsw:space": "cosine"})
+        else:
+            col = client.get_collection(name=name)
+        _collections[key] = col
+        return col
+
+
+def close_client(owner_dir: Path) -> None:
+    """關閉並移除該 owner 的 client 與所有 collection handle。"""
+    key = _key(owner_dir)
+    with _lock:
+        for col_key in [k for k in _collections if k[0] == key]:
+            del _collections[col_key]
+        client = _clients.pop(key, None)
+    _release(client)
+
+
+def close_all() -> None:
+    """關閉所有 owner 的 client（process 結束或測試用）。"""
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+        _collections.clear()
+    for client in clients:
+        _release(client)
+
+
+def _release(client: chromadb.ClientAPI | None) -> None:
+    # 較舊的 chromadb 沒有 close()，只能丟掉參考
+    close = getattr(client, "close", None)
+    if close is not None:
+        try:
+            close()
+        except Exception:
+            pass
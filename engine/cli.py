@@ -74,12 +74,13 @@ def search(owner: str, text: str, n: int, direction: str | None):
 
 @cli.command()
 @click.option("--owner", required=True, help="使用者 ID")
-def detect(owner: str):
+@click.option("--full", is_flag=True, help="強制全量重新聚類（預設只處理新 signals）")
+def detect(owner: str, full: bool):
     """偵測 convictions（embedding 聚類 + 共鳴收斂）"""
     from engine.conviction_detector import detect as run_detect
 
     config = load_config()
-    new_convictions, strength_changes = run_detect(owner, config)
+    new_convictions, strength_changes = run_detect(owner, config, full=full)
 
     if strength_changes:
         click.echo(f"\n=== {len(strength_changes)} 個信念 strength 變動 ===")
@@ -147,6 +148,35 @@ def extract(owner: str, limit: int | None):
         click.echo(f"  confidence: {t.conclusion.confidence}")
 
 
+@cli.command()
+@click.option("--owner", required=True, help="使用者 ID")
+@click.option("--max-concurrent", default=None, type=int, help="同時送出的 LLM 呼叫數（預設讀目前 backend 的 config）")
+def backfill(owner: str, max_concurrent: int | None):
+    """全量歷史推理軌跡提取（每組完成即 checkpoint，中斷後重跑會接續）"""
+    from engine.trace_extractor import backfill as run_backfill
+
+    config = load_config()
+    click.echo(f"[{owner}] 開始全量提取推理軌跡...")
+
+    def _progress(p: dict):
+        click.echo(
+            f"  {p['prompts_done']}/{p['prompts_total']} prompts｜"
+            f"{p['groups_done']}/{p['groups_total']} 組｜"
+            f"+{p['new_traces']} traces（累計 {p['total_traces']}）｜"
+            f"{p['groups_per_min']} 組/min，{p['tokens_per_min']} tokens/min"
+        )
+
+    summary = run_backfill(owner, config, max_concurrent=max_concurrent, on_progress=_progress)
+
+    if not summary["groups"]:
+        click.echo("沒有待處理的分組")
+        return
+
+    click.echo(f"\n=== 完成：{summary['groups_done']}/{summary['groups']} 組，"
+               f"{summary['prompts']} 次 LLM 呼叫，{summary['traces']} 個推理軌跡，"
+               f"耗時 {summary['elapsed_sec']:.0f}s ===")
+
+
 @cli.command()
 @click.option("--owner", required=True, help="使用者 ID")
 def followups(owner: str):
@@ -0,0 +1,138 @@
+"""Clustering — conviction / frame 共用的 embedding 聚類
+
+兩種 backend（config: engine.conviction.clustering / engine.frame.clustering）：
+- agglomerative：AgglomerativeClustering(average linkage)，sklearn 內部建 dense
+  pairwise 距離矩陣，O(N²) 記憶體，適合小量資料
+- knn_graph：先建 sparse k-nearest-neighbour 圖（Chroma HNSW 或分塊精確搜尋），
+  只保留相似度 >= threshold 的邊，按連通分量切開，每個分量再用
+  connectivity 限制的 average linkage 聚類。記憶體 O(N·k)
+"""
+
+from __future__ import annotations
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from sklearn.cluster import AgglomerativeClustering
+
+
+def _normalize(embeddings: np.ndarray) -> np.ndarray:
+    return embeddings / (np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-8)
+
+
+def knn_from_embeddings(
+    embeddings: np.ndarray,
+    k: int,
+    block_size: int = 1024,
+) -> tuple[np.ndarray, np.ndarray]:
+    """分塊精確 kNN（cosine）。回傳 (neighbor index [N, k], similarity [N, k])，不含自己。
+
+    每次只算 block_size × N 的相似度，記憶體不隨 N² 成長。
+    """
+    normed = _normalize(np.asarray(embeddings, dtype=np.float32))
+    n = len(normed)
+    k = min(k, n - 1)
+    neighbors = np.zeros((n, k), dtype=np.int64)
+    sims = np.zeros((n, k), dtype=np.float32)
+    for start in range(0, n, block_size):
+        block = normed[start:start + block_size] @ normed.T
+        rows = np.arange(len(block))
+        block[rows, rows + start] = -np.inf  # 排除自己
+        top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        neighbors[start:start + len(block)] = top
+        sims[start:start + len(block)] = block[rows[:, None], top]
+    return neighbors, sims
+
+
+def knn_from_collection(
+    collection,
+    ids: list[str],
+    embeddings: np.ndarray,
+    k: int,
+    batch_size: int = 256,
+) -> tuple[np.ndarray, np.ndarray]:
+    """用 Chroma collection 既有的 HNSW 索引查 kNN。ids / embeddings 需對應 collection 內容。
+
+    查不到的位置以 -1 / 0 補齊。
+    """
+    pos = {sid: i for i, sid in enumerate(ids)}
+    n = len(ids)
+    k = min(k, n - 1)
+    neighbors = np.full((n, k), -1, dtype=np.int64)
+    sims = np.zeros((n, k), dtype=np.float32)
+    for start in range(0, n, batch_size):
+        batch = np.asarray(embeddings[start:start + batch_size]).tolist()
+        results = collection.query(query_embeddings=batch, n_results=k + 1, include=["distances"])
+        for row, (res_ids, res_dists) in enumerate(zip(results["ids"], results["distances"])):
+            i = start + row
+            col = 0
+            for sid, dist in zip(res_ids, res_dists):
+                j = pos.get(sid)
+                if j is None or j == i or col >= k:
+                    continue
+                neighbors[i, col] = j
+                sims[i, col] = 1 - dist  # cosine distance → similarity
+                col += 1
+    return neighbors, sims
+
+
+def _agglomerative(embeddings: np.ndarray, threshold: float, connectivity=None) -> np.ndarray:
+    clustering = AgglomerativeClustering(
+        n_clusters=None,
+        distance_threshold=1 - threshold,  # cosine distance = 1 - similarity
+        metric="cosine",
+        linkage="average",
+        connectivity=connectivity,
+    )
+    return clustering.fit_predict(embeddings)
+
+
+def _knn_graph_labels(
+    embeddings: np.ndarray,
+    threshold: float,
+    neighbors: np.ndarray,
+    sims: np.ndarray,
+) -> np.ndarray:
+    n = len(embeddings)
+    rows = np.repeat(np.arange(n), neighbors.shape[1])
+    cols = neighbors.ravel()
+    keep = (cols >= 0) & (sims.ravel() >= threshold)
+    rows, cols = rows[keep], cols[keep]
+    graph = coo_matrix((np.ones(len(rows)), (rows, cols)), shape=(n, n)).tocsr()
+    graph = graph.maximum(graph.T)  # 對稱化
+
+    n_components, component = connected_components(graph, directed=False)
+    labels = np.empty(n, dtype=np.int64)
+    next_label = 0
+    for comp in range(n_components):
+        members = np.flatnonzero(component == comp)
+        if len(members) <= 2:
+            # 單點或一條邊（相似度已 >= threshold）直接成一群
+            labels[members] = next_label
+            next_label += 1
+            continue
+        sub_labels = _agglomerative(
+            embeddings[members], threshold, connectivity=graph[members][:, members],
+        )
+        labels[members] = sub_labels + next_label
+        next_label += int(sub_labels.max()) + 1
+    return labels
+
+
+def cluster_labels(
+    embeddings: np.ndarray,
+    threshold: float,
+    backend: str = "agglomerative",
+    knn_k: int = 15,
+    neighbors: tuple[np.ndarray, np.ndarray] | None = None,
+) -> np.ndarray:
+    """依 backend 聚類，回傳每個 embedding 的 cluster label。
+
+    neighbors: knn_graph 用的 (index, similarity)；未提供時用分塊精確 kNN 現算。
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if backend != "knn_graph" or len(embeddings) <= 2:
+        return _agglomerative(embeddings, threshold)
+    if neighbors is None:
+        neighbors = knn_from_embeddings(embeddings, knn_k)
+    return _knn_graph_labels(embeddings, threshold, *neighbors)
@@ -3,21 +3,28 @@
 from __future__ import annotations
 
 import json
+import time
 from datetime import datetime
 from pathlib import Path
 
 import numpy as np
 
 from engine.config import get_owner_dir
-from engine.conviction_detector import _load_convictions, _save_convictions
-from engine.llm import call_llm
+from engine.conviction_detector import (
+    _load_conviction_embeddings,
+    _load_convictions,
+    _save_convictions,
+)
+from engine.llm import backend_max_concurrent, call_llm, estimate_tokens
 from engine.models import Conviction, ConvictionTension
 from engine.signal_store import SignalStore
 
 
-def _classify_tension(c1: Conviction, c2: Conviction, config: dict) -> tuple[str, int] | tuple[None, int]:
-    """用 LLM 判斷兩個 conviction 的關係。回傳 (relationship, confidence) 或 (None, 0)。"""
-    prompt = (
+_VALID_RELATIONSHIPS = {"contradiction", "evolution", "context_dependent", "creative_tension"}
+
+
+def _build_tension_prompt(c1: Conviction, c2: Conviction) -> str:
+    return (
         "以下是同一個人持有的兩個信念：\n\n"
         f"A: {c1.statement}\n"
         f"B: {c2.statement}\n\n"
@@ -32,10 +39,11 @@ def _classify_tension(c1: Conviction, c2: Conviction, config: dict) -> tuple[str
         "範例：contradiction 8\n"
         "只回答一行。"
     )
-    result = call_llm(prompt, config=config, tier="light").strip().lower()
-    valid = {"contradiction", "evolution", "context_dependent", "creative_tension"}
 
-    parts = result.split()
+
+def _parse_tension(raw: str) -> tuple[str, int] | tuple[None, int]:
+    """解析「關係詞 信心分數」。回傳 (relationship, confidence) 或 (None, 0)。"""
+    parts = raw.strip().lower().split()
     relationship = parts[0] if parts else ""
     confidence = 5  # default
     if len(parts) >= 2:
@@ -44,118 +52,290 @@ def _classify_tension(c1: Conviction, c2: Conviction, config: dict) -> tuple[str
         except ValueError:
             pass
 
-    if relationship not in valid:
+    if relationship not in _VALID_RELATIONSHIPS:
         return None, 0
     return relationship, confidence
 
 
-def _load_checked_pairs(owner_dir: Path) -> set[tuple[str, str]]:
-    """載入已檢查過的 pair（避免重複 LLM 呼叫）。"""
-    path = owner_dir / "checked_pairs.json"
+def _is_unrelated(raw: str) -> bool:
+    """LLM 明確回答 unrelated（合法回應，與格式錯誤區分）。"""
+    parts = raw.strip().lower().split()
+    return bool(parts) and parts[0] == "unrelated"
+
+
+def _classify_tension(c1: Conviction, c2: Conviction, config: dict) -> tuple[str, int] | tuple[None, int]:
+    """用 LLM 判斷兩個 conviction 的關係。回傳 (relationship, confidence) 或 (None, 0)。"""
+    return _parse_tension(call_llm(_build_tension_prompt(c1, c2), config=config, tier="light", cache=True))
+
+
+# ─── Checked pairs ───────────────────────────────────────────────────────────
+
+
+def _pair_codes(ord_a: np.ndarray, ord_b: np.ndarray) -> np.ndarray:
+    """兩個 ordinal 編成一個 int64：(小 << 32) | 大，與順序無關。"""
+    ord_a = np.asarray(ord_a, dtype=np.int64)
+    ord_b = np.asarray(ord_b, dtype=np.int64)
+    return (np.minimum(ord_a, ord_b) << 32) | np.maximum(ord_a, ord_b)
+
+
+class _CheckedPairs:
+    """已檢查過的 conviction pair（避免重複 LLM 呼叫）。
+
+    - checked_pairs.ids：一行一個 conviction_id，行號就是穩定的 ordinal，只 append
+    - checked_pairs.bin：int64 pair code（見 _pair_codes），只 append
+
+    載入後 codes 是排序去重的 ndarray，membership 用 np.isin 向量化查。
+    conviction_deduper 合併時呼叫 prune() 移除被併掉的 conviction 的 pairs。
+    舊版 checked_pairs.json 第一次載入時自動轉換。
+    """
+
+    def __init__(self, owner_dir: Path):
+        self.ids_path = owner_dir / "checked_pairs.ids"
+        self.codes_path = owner_dir / "checked_pairs.bin"
+        self.legacy_path = owner_dir / "checked_pairs.json"
+        self.ordinals: dict[str, int] = {}
+        self.codes = np.zeros(0, dtype=np.int64)
+        self._new_ids: list[str] = []
+        self._new_codes: list[np.ndarray] = []
+
+        if self.ids_path.exists():
+            with open(self.ids_path) as f:
+                for line in f:
+                    self.ordinals[line.rstrip("\n")] = len(self.ordinals)
+        if self.codes_path.exists():
+            self.codes = np.unique(np.fromfile(self.codes_path, dtype=np.int64))
+        if self.legacy_path.exists():
+            self._migrate_legacy()
+
+    def _migrate_legacy(self) -> None:
+        with open(self.legacy_path) as f:
+            pairs = json.load(f)
+        if pairs:
+            a = self.ordinals_for([p[0] for p in pairs])
+            b = self.ordinals_for([p[1] for p in pairs])
+            self.add(_pair_codes(a, b))
+        self.save()
+        self.legacy_path.unlink()
+
+    def ordinals_for(self, conviction_ids: list[str]) -> np.ndarray:
+        """取得 ordinal，沒見過的 id 配新的（save() 時寫入）。"""
+        out = np.empty(len(conviction_ids), dtype=np.int64)
+        for i, cid in enumerate(conviction_ids):
+            ordinal = self.ordinals.get(cid)
+            if ordinal is None:
+                ordinal = len(self.ordinals)
+                self.ordinals[cid] = ordinal
+                self._new_ids.append(cid)
+            out[i] = ordinal
+        return out
+
+    def contains(self, codes: np.ndarray) -> np.ndarray:
+        """回傳每個 code 是否已檢查過的 bool mask。"""
+        if not len(self.codes):
+            return np.zeros(len(codes), dtype=bool)
+        return np.isin(codes, self.codes, assume_unique=False)
+
+    def add(self, codes: np.ndarray) -> None:
+        self._new_codes.append(np.asarray(codes, dtype=np.int64))
+
+    def save(self) -> None:
+        """把新 id 與新 pair append 到檔案尾端。"""
+        if self._new_ids:
+            with open(self.ids_path, "a") as f:
+                f.write("".join(cid + "\n" for cid in self._new_ids))
+            self._new_ids = []
+        if self._new_codes:
+            new = np.concatenate(self._new_codes)
+            self._new_codes = []
+            if len(new):
+                with open(self.codes_path, "ab") as f:
+                    new.tofile(f)
+                self.codes = np.union1d(self.codes, new)
+
+    def prune(self, conviction_ids) -> int:
+        """刪除包含任一 conviction_id 的 pairs，回傳刪掉的數量。ordinal 保留不回收。"""
+        ords = np.array(
+            [self.ordinals[cid] for cid in conviction_ids if cid in self.ordinals],
+            dtype=np.int64,
+        )
+        if not len(ords) or not len(self.codes):
+            return 0
+        drop = np.isin(self.codes >> 32, ords) | np.isin(self.codes & 0xFFFFFFFF, ords)
+        removed = int(drop.sum())
+        if removed:
+            self.codes = self.codes[~drop]
+            tmp = self.codes_path.with_suffix(".bin.tmp")
+            with open(tmp, "wb") as f:
+                self.codes.tofile(f)
+            tmp.replace(self.codes_path)
+        return removed
+
+
+def _find_candidate_pairs(
+    emb_matrix: np.ndarray,
+    ordinals: np.ndarray,
+    checked: _CheckedPairs,
+    low: float = 0.7,
+    high: float = 0.95,
+    block_size: int = 1024,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+    """分塊矩陣乘法找 cosine 落在 [low, high] 的 pairs（i < j），排除已檢查過的。
+
+    ordinals: 每個 row 對應 conviction 在 checked 裡的 ordinal。
+    回傳 (i, j, similarity, 掃描的 pair 數)，順序與逐對雙迴圈相同。
+    """
+    n = len(emb_matrix)
+    normed = emb_matrix / (np.linalg.norm(emb_matrix, axis=1, keepdims=True) + 1e-8)
+    cols = np.arange(n)
+    out_i, out_j, out_sim = [], [], []
+    scanned = 0
+    for start in range(0, n, block_size):
+        block = normed[start:start + block_size] @ normed.T
+        rows = np.arange(start, start + len(block))
+        upper = cols[None, :] > rows[:, None]
+        scanned += int(upper.sum())
+        bi, bj = np.nonzero(upper & (block >= low) & (block <= high))
+        if not len(bi):
+            continue
+        gi = bi + start
+        keep = ~checked.contains(_pair_codes(ordinals[gi], ordinals[bj]))
+        bi, bj, gi = bi[keep], bj[keep], gi[keep]
+        out_i.append(gi)
+        out_j.append(bj)
+        out_sim.append(block[bi, bj])
+
+    if not out_i:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0), scanned
+    return np.concatenate(out_i), np.concatenate(out_j), np.concatenate(out_sim), scanned
+
+
+# ─── LLM backlog ─────────────────────────────────────────────────────────────
+#
+# 帶通篩出的 pair 先進 contradiction_backlog.json（同時記入 checked，不會重複入列），
+# 每次 scan 依優先度取出、在筆數 / token / 時間預算內分類，剩下的留給下一次。
+
+
+def _load_backlog(owner_dir: Path) -> list[dict]:
+    path = owner_dir / "contradiction_backlog.json"
     if not path.exists():
-        return set()
+        return []
     with open(path) as f:
-        pairs = json.load(f)
-    return {(p[0], p[1]) for p in pairs}
+        return json.load(f)
 
 
-def _save_checked_pairs(owner_dir: Path, pairs: set[tuple[str, str]]) -> None:
-    """儲存已檢查過的 pair。"""
-    path = owner_dir / "checked_pairs.json"
+def _save_backlog(owner_dir: Path, backlog: list[dict]) -> None:
+    path = owner_dir / "contradiction_backlog.json"
     with open(path, "w") as f:
-        json.dump(sorted(pairs), f)
+        json.dump(backlog, f, ensure_ascii=False)
+
+
+def _backlog_priority(entry: dict, by_id: dict[str, Conviction]) -> float:
+    """相似度 × 兩個 conviction 平均強度（用當下的 strength，強度變了優先度跟著變）。"""
+    c1, c2 = by_id[entry["a"]], by_id[entry["b"]]
+    return entry["similarity"] * (c1.strength.score + c2.strength.score) / 2
 
 
-def scan(owner_id: str, config: dict) -> list[dict]:
+def scan(owner_id: str, config: dict) -> tuple[list[dict], dict]:
     """掃描 active convictions，找出潛在矛盾 pairs。
 
-    只對新出現的 pair 呼叫 LLM，已檢查過的 pair 跳過。
+    新候選 pair 進 backlog，LLM 依優先度在預算內消化 backlog；已入列過的 pair 不會再入列。
+    回傳 (results, scan_stats)；scan_stats 含掃描 pair 數、新候選數、分類數、剩餘 backlog 與耗時。
     """
+    started = time.time()
+    scan_stats = {
+        "pairs_scanned": 0, "candidates": 0, "classified": 0, "failed": 0,
+        "backlog_remaining": 0, "elapsed_sec": 0.0,
+    }
+
     owner_dir = get_owner_dir(config, owner_id)
     convictions = _load_convictions(owner_dir)
     active = [c for c in convictions if c.lifecycle and c.lifecycle.status == "active"]
 
     if len(active) < 2:
-        return []
+        return [], scan_stats
 
     store = SignalStore(config, owner_id)
 
-    # 計算所有 conviction 的 embeddings — batch encode
-    statements = [c.statement for c in active]
-    embs = store._get_embedder().encode(
-        statements, normalize_embeddings=True,
-        show_progress_bar=len(statements) > 50,
-    )
-    conv_embeddings: list[tuple[Conviction, np.ndarray]] = [
-        (c, np.array(e)) for c, e in zip(active, embs)
-    ]
+    # 所有 conviction 的 embeddings — 持久化快取，只 encode 新的
+    emb_matrix = _load_conviction_embeddings(store, active)
 
     # 載入已檢查過的 pair，避免重複 LLM
-    previously_checked = _load_checked_pairs(owner_dir)
-    newly_checked: set[tuple[str, str]] = set()
+    checked = _CheckedPairs(owner_dir)
+    ordinals = checked.ordinals_for([c.conviction_id for c in active])
 
     results: list[dict] = []
-    min_confidence = config.get("engine", {}).get("contradiction", {}).get("min_confidence", 7)
-
-    # Phase 1: 篩選需要 LLM 的 pairs（cosine 落在 0.7~0.95）
-    candidates: list[tuple[Conviction, Conviction, float, tuple[str, str]]] = []
-
-    for i, (c1, e1) in enumerate(conv_embeddings):
-        for j, (c2, e2) in enumerate(conv_embeddings):
-            if i >= j:
-                continue
-
-            pair_key = tuple(sorted([c1.conviction_id, c2.conviction_id]))
-            if pair_key in previously_checked:
-                continue
-            newly_checked.add(pair_key)
-
-            sim = float(np.dot(e1, e2) / (np.linalg.norm(e1) * np.linalg.norm(e2) + 1e-8))
-            if sim < 0.7 or sim > 0.95:
+    contra_cfg = config.get("engine", {}).get("contradiction", {})
+    min_confidence = contra_cfg.get("min_confidence", 7)
+
+    # Phase 1: 篩選需要 LLM 的 pairs（cosine 落在 0.7~0.95），進 backlog
+    # 帶外的 pair 不記入 checked：statement 不變時相似度也不變，下次一樣會被帶通濾掉
+    cand_i, cand_j, cand_sim, scanned = _find_candidate_pairs(emb_matrix, ordinals, checked)
+    checked.add(_pair_codes(ordinals[cand_i], ordinals[cand_j]))
+    backlog = _load_backlog(owner_dir)
+    queued_at = datetime.now().isoformat()
+    for i, j, sim in zip(cand_i.tolist(), cand_j.tolist(), cand_sim.tolist()):
+        backlog.append({
+            "a": active[i].conviction_id,
+            "b": active[j].conviction_id,
+            "similarity": round(sim, 4),
+            "queued_at": queued_at,
+        })
+    scan_stats["pairs_scanned"] = scanned
+    scan_stats["candidates"] = len(cand_i)
+
+    # 已不再 active 的 conviction（被取代 / 合併）其 pair 直接丟掉
+    by_id = {c.conviction_id: c for c in active}
+    backlog = [e for e in backlog if e["a"] in by_id and e["b"] in by_id]
+    backlog.sort(key=lambda e: _backlog_priority(e, by_id), reverse=True)
+
+    # Phase 2: 依優先度批次 LLM 分類，筆數 / token / 時間任一預算用完就停
+    max_pairs = contra_cfg.get("max_llm_per_scan", 50)
+    max_tokens = contra_cfg.get("max_tokens_per_scan", 20000)
+    max_seconds = contra_cfg.get("max_seconds_per_scan", 300)
+    chunk_size = contra_cfg.get("max_concurrent") or backend_max_concurrent(config)
+
+    from engine.llm import batch_llm, forget_cached
+
+    done = 0
+    tokens_used = 0
+    failed: list[dict] = []  # LLM 呼叫失敗的 pair 留在 backlog，下次 scan 重試
+    while done < len(backlog) and done < max_pairs:
+        if time.time() - started >= max_seconds:
+            break
+        chunk: list[tuple[Conviction, Conviction, float]] = []
+        chunk_entries: list[dict] = []
+        prompts: list[str] = []
+        for entry in backlog[done:min(done + chunk_size, max_pairs)]:
+            c1, c2 = by_id[entry["a"]], by_id[entry["b"]]
+            prompt = _build_tension_prompt(c1, c2)
+            cost = estimate_tokens(prompt)
+            # 第一個 pair 一定跑，避免單一 prompt 超出預算時 backlog 永遠卡住
+            if tokens_used + cost > max_tokens and (done or chunk):
+                break
+            tokens_used += cost
+            chunk.append((c1, c2, entry["similarity"]))
+            chunk_entries.append(entry)
+            prompts.append(prompt)
+        if not chunk:
+            break
+
+        llm_results = batch_llm(
+            prompts, config=config, max_concurrent=chunk_size, tier="light", cache=True, return_exceptions=True,
+        )
+        done += len(chunk)
+
+        unparsed: list[str] = []
+        for (c1, c2, sim), entry, prompt, raw in zip(chunk, chunk_entries, prompts, llm_results):
+            if isinstance(raw, BaseException):
+                failed.append(entry)
                 continue
-
-            candidates.append((c1, c2, sim, pair_key))
-
-    # Phase 2: 批次 LLM 分類（每次最多 50 pairs，避免長時間阻塞）
-    max_llm_per_scan = config.get("engine", {}).get("contradiction", {}).get("max_llm_per_scan", 50)
-    candidates = candidates[:max_llm_per_scan]
-
-    if candidates:
-        from engine.llm import batch_llm
-
-        prompts = []
-        for c1, c2, _, _ in candidates:
-            prompts.append(
-                "以下是同一個人持有的兩個信念：\n\n"
-                f"A: {c1.statement}\n"
-                f"B: {c2.statement}\n\n"
-                "請判斷這兩個信念的關係，用以下格式回答（一行）：\n"
-                "關係詞 信心分數(1-10)\n\n"
-                "可用的關係詞：\n"
-                "- contradiction（直接矛盾）\n"
-                "- evolution（觀點演進，B 取代 A）\n"
-                "- context_dependent（在不同情境下都合理）\n"
-                "- creative_tension（有張力但共存）\n"
-                "- unrelated（無關）\n\n"
-                "範例：contradiction 8\n"
-                "只回答一行。"
-            )
-
-        llm_results = batch_llm(prompts, config=config, tier="light")
-        valid_relationships = {"contradiction", "evolution", "context_dependent", "creative_tension"}
-
-        for (c1, c2, sim, _), raw in zip(candidates, llm_results):
-            result_text = raw.strip().lower()
-            parts = result_text.split()
-            relationship = parts[0] if parts else ""
-            confidence = 5
-            if len(parts) >= 2:
-                try:
-                    confidence = int(parts[1])
-                except ValueError:
-                    pass
-
-            if relationship not in valid_relationships:
+            relationship, confidence = _parse_tension(raw)
+            if relationship is None:
+                if not _is_unrelated(raw):
+                    # 格式不對：pair 留在 backlog，壞回應從快取刪掉，下次重問
+                    failed.append(entry)
+                    unparsed.append(prompt)
                 continue
             if confidence < min_confidence:
                 continue
@@ -189,9 +369,20 @@ def scan(owner_id: str, config: dict) -> list[dict]:
                     c1.tensions.append(tension_a)
                 if c1.conviction_id not in existing_b:
                     c2.tensions.append(tension_b)
+        forget_cached(unparsed, config=config, tier="light")
 
-    # 儲存更新後的 convictions + checked pairs
-    _save_convictions(owner_dir, convictions)
-    _save_checked_pairs(owner_dir, previously_checked | newly_checked)
+        if tokens_used >= max_tokens:
+            break
 
-    return results
+    # 儲存更新後的 convictions + 未消化的 backlog + checked pairs
+    # backlog 一定先寫：checked 先落地而 backlog 沒寫成功的話，新入列的 pair 會永遠消失
+    remaining = failed + backlog[done:]
+    _save_convictions(owner_dir, convictions)
+    _save_backlog(owner_dir, remaining)
+    checked.save()
+
+    scan_stats["classified"] = done - len(failed)
+    scan_stats["failed"] = len(failed)
+    scan_stats["backlog_remaining"] = len(remaining)
+    scan_stats["elapsed_sec"] = round(time.time() - started, 2)
+    return results, scan_stats
@@ -5,10 +5,15 @@ from __future__ import annotations
 import json
 from pathlib import Path
 
-import numpy as np
-
 from engine.config import get_owner_dir, load_config
-from engine.conviction_detector import _load_convictions, _save_convictions
+from engine.contradiction_alert import _CheckedPairs
+from engine.conviction_detector import (
+    _load_conviction_embeddings,
+    _load_convictions,
+    _prune_conviction_embeddings,
+    _save_convictions,
+)
+from engine.generations import bump_generation
 from engine.models import (
     Conviction,
     ResonanceEvidence,
@@ -51,12 +56,7 @@ def _find_duplicate_pairs(
     if len(convictions) < 2:
         return []
 
-    statements = [c.statement for c in convictions]
-    embeddings = store._get_embedder().encode(
-        statements, normalize_embeddings=True,
-        show_progress_bar=len(statements) > 50,
-    )
-    emb_matrix = np.array(embeddings)
+    emb_matrix = _load_conviction_embeddings(store, convictions)
 
     # cosine similarity matrix（已 normalize，直接 dot）
     sim_matrix = emb_matrix @ emb_matrix.T
@@ -94,7 +94,7 @@ def _llm_confirm_duplicates(
             f"只回答 YES 或 NO。如果意思幾乎一樣只是用詞/標點不同，回答 YES。"
         )
 
-    results = batch_llm(prompts, tier="light")
+    results = batch_llm(prompts, tier="light", cache=True)
 
     confirmed = []
     for (a, b, sim), result in zip(pairs, results):
@@ -151,6 +151,7 @@ def _update_downstream_references(owner_dir: Path, id_map: dict[str, str]) -> di
 
         with open(traces_path, "w") as f:
             f.write("\n".join(lines) + "\n")
+        bump_generation(owner_dir, "traces")
         stats["traces"] = updated
 
     # 2. frames.jsonl
@@ -181,6 +182,7 @@ def _update_downstream_references(owner_dir: Path, id_map: dict[str, str]) -> di
 
         with open(frames_path, "w") as f:
             f.write("\n".join(lines) + "\n")
+        bump_generation(owner_dir, "frames")
         stats["frames"] = updated
 
     # 3. identity.json
@@ -198,29 +200,11 @@ def _update_downstream_references(owner_dir: Path, id_map: dict[str, str]) -> di
 
             with open(identity_path, "w") as f:
                 json.dump(identities, f, ensure_ascii=False, indent=2)
+            bump_generation(owner_dir, "identities")
         stats["identity"] = updated
 
-    # 4. contradiction_checked.jsonl — 刪除包含 secondary id 的 pair
-    checked_path = owner_dir / "contradiction_checked.jsonl"
-    if checked_path.exists():
-        removed = 0
-        secondary_ids = set(id_map.keys())
-        kept_lines = []
-        with open(checked_path) as f:
-            for line in f:
-                if not line.strip():
-                    continue
-                data = json.loads(line)
-                pair = data.get("pair", [])
-                if any(pid in secondary_ids for pid in pair):
-                    removed += 1
-                else:
-                    kept_lines.append(line.strip())
-
-        with open(checked_path, "w") as f:
-            for ln in kept_lines:
-                f.write(ln + "\n")
-        stats["contradiction_checked_removed"] = removed
+    # 4. contradiction checked pairs — 刪除包含 secondary id 的 pair
+    stats["contradiction_checked_removed"] = _CheckedPairs(owner_dir).prune(id_map.keys())
 
     # 5. convictions 自身的 tensions[].opposing_conviction
     # 這個在 merge 時處理（呼叫端負責）
@@ -343,6 +327,7 @@ def dedupe(
 
     # 儲存
     _save_convictions(owner_dir, merged_convictions)
+    _prune_conviction_embeddings(owner_dir, config, merged_convictions)
 
     # Step 4: 更新下游引用
     downstream_stats = _update_downstream_references(owner_dir, id_map)
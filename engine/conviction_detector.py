@@ -2,16 +2,19 @@
 
 from __future__ import annotations
 
+import hashlib
 import json
+import os
 import uuid
 from collections import defaultdict
 from datetime import datetime
 from pathlib import Path
 
 import numpy as np
-from sklearn.cluster import AgglomerativeClustering
 
+from engine.clustering import cluster_labels, knn_from_collection
 from engine.config import get_owner_dir
+from engine.generations import bump_generation
 from engine.llm import call_llm
 from engine.models import (
     ActionAlignment,
@@ -25,7 +28,7 @@ from engine.models import (
     SpontaneousMention,
     TemporalPersistence,
 )
-from engine.signal_store import SignalStore
+from engine.signal_store import SignalStore, _embedding_model_name
 
 
 def _has_both_directions(signals: list[Signal]) -> list[InputOutputConvergence]:
@@ -152,7 +155,7 @@ def _generate_conviction_statement(signals: list[Signal], config: dict) -> str |
         "- 絕對不要輸出「我需要」「我無法」「讓我」「根據以上」等 AI 自我指涉語句\n"
         "- 如果這些想法太零散無法歸納出明確信念，只回答 SKIP"
     )
-    result = call_llm(prompt, config=config, tier="medium").strip().strip("「」""\"'")
+    result = call_llm(prompt, config=config, tier="medium", cache=True).strip().strip("「」""\"'")
 
     if not result or result.upper() == "SKIP":
         return None
@@ -180,6 +183,100 @@ def _save_convictions(owner_dir: Path, convictions: list[Conviction]) -> None:
     with open(path, "w") as f:
         for c in convictions:
             f.write(c.model_dump_json() + "\n")
+    bump_generation(owner_dir, "convictions")
+
+
+# ─── Conviction statement embeddings（持久化快取）───
+
+_CONVICTION_EMB_FILE = "conviction_embeddings.npz"
+# 舊版：矩陣與 key 分兩個檔案，首次載入時轉成單一 .npz
+_LEGACY_EMB_FILE = "conviction_embeddings.npy"
+_LEGACY_EMB_META_FILE = "conviction_embeddings.json"
+
+
+def _statement_key(c: Conviction) -> str:
+    digest = hashlib.sha1(c.statement.encode("utf-8")).hexdigest()[:16]
+    return f"{c.conviction_id}:{digest}"
+
+
+def _read_emb_cache(owner_dir: Path, model_name: str) -> tuple[dict[str, np.ndarray], bool]:
+    """讀 embeddings 快取，回傳 (key → embedding, 是否需要重寫)。換 model 時回傳空的。"""
+    path = owner_dir / _CONVICTION_EMB_FILE
+    if path.exists():
+        with np.load(path) as data:
+            if str(data["model"]) != model_name:
+                return {}, True
+            return dict(zip(data["keys"].tolist(), data["matrix"])), False
+
+    legacy_meta = owner_dir / _LEGACY_EMB_META_FILE
+    legacy_matrix = owner_dir / _LEGACY_EMB_FILE
+    if legacy_meta.exists() and legacy_matrix.exists():
+        with open(legacy_meta) as f:
+            meta = json.load(f)
+        matrix = np.load(legacy_matrix)
+        if meta.get("model") == model_name and len(meta.get("keys", [])) == len(matrix):
+            return dict(zip(meta["keys"], matrix)), True
+    return {}, False
+
+
+def _write_emb_cache(owner_dir: Path, model_name: str, cached: dict[str, np.ndarray]) -> None:
+    """keys 與矩陣存在同一個 .npz，寫 tmp 後 os.replace，不會出現 key 與 row 對不上的半成品。"""
+    keys = list(cached)
+    matrix = np.array([cached[k] for k in keys], dtype=np.float32) if keys else np.zeros((0, 0), dtype=np.float32)
+    path = owner_dir / _CONVICTION_EMB_FILE
+    tmp = owner_dir / f"{_CONVICTION_EMB_FILE}.tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, model=np.array(model_name), keys=np.array(keys, dtype=str), matrix=matrix)
+    os.replace(tmp, path)
+    for legacy in (owner_dir / _LEGACY_EMB_FILE, owner_dir / _LEGACY_EMB_META_FILE):
+        legacy.unlink(missing_ok=True)
+
+
+def _load_conviction_embeddings(store: SignalStore, convictions: list[Conviction]) -> np.ndarray:
+    """回傳 convictions 的 normalized statement embeddings（同順序）。
+
+    以 (conviction_id, statement hash) 為 key 存在 owner 目錄，
+    只 encode 新增或 statement 改變過的 convictions；換 embedding model 時整份重算。
+    新 encode 的 row 合併進既有快取，只傳子集（active convictions）時不會丟掉其他 row；
+    過期的 key 只在 _prune_conviction_embeddings 時清掉。
+    """
+    owner_dir = store.owner_dir
+    model_name = _embedding_model_name(store.config)
+    cached, dirty = _read_emb_cache(owner_dir, model_name)
+
+    keys = [_statement_key(c) for c in convictions]
+    missing = [i for i, k in enumerate(keys) if k not in cached]
+    if missing:
+        statements = [convictions[i].statement for i in missing]
+        embs = store._get_embedder().encode(
+            statements, normalize_embeddings=True,
+            show_progress_bar=len(statements) > 50,
+        )
+        for i, emb in zip(missing, embs):
+            cached[keys[i]] = np.asarray(emb, dtype=np.float32)
+
+    if missing or dirty:
+        _write_emb_cache(owner_dir, model_name, cached)
+
+    if not keys:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.array([cached[k] for k in keys], dtype=np.float32)
+
+
+def _prune_conviction_embeddings(owner_dir: Path, config: dict, convictions: list[Conviction]) -> int:
+    """只保留目前 convictions（完整清單）的 embeddings，回傳刪除筆數。
+
+    在 convictions.jsonl 整份重寫後呼叫（detect / dedupe）。
+    """
+    model_name = _embedding_model_name(config)
+    cached, _ = _read_emb_cache(owner_dir, model_name)
+    keep = {_statement_key(c) for c in convictions}
+    stale = [k for k in cached if k not in keep]
+    if stale:
+        for k in stale:
+            del cached[k]
+        _write_emb_cache(owner_dir, model_name, cached)
+    return len(stale)
 
 
 def _compute_authority_weight(signals: list[Signal]) -> float:
@@ -251,111 +348,304 @@ def _extract_domains(signals: list[Signal]) -> list[str]:
     return [t for t, _ in Counter(all_topics).most_common(3)]
 
 
+def _evidence_signal_ids(conv: Conviction) -> set[str]:
+    """收集 conviction 的 resonance evidence 引用到的所有 signal IDs。"""
+    sig_ids: set[str] = set()
+    if conv.resonance_evidence:
+        re = conv.resonance_evidence
+        if re.input_output_convergence:
+            for ioc in re.input_output_convergence:
+                sig_ids.add(ioc.input_signal)
+                sig_ids.add(ioc.output_signal)
+        if re.temporal_persistence:
+            for tp in re.temporal_persistence:
+                sig_ids.update(tp.signal_ids)
+        if re.cross_context_consistency:
+            for ccc in re.cross_context_consistency:
+                sig_ids.update(ccc.signal_ids)
+        if re.spontaneous_mentions:
+            for sm in re.spontaneous_mentions:
+                sig_ids.add(sm.signal_id)
+        if re.action_alignment:
+            for aa in re.action_alignment:
+                sig_ids.add(aa.statement_signal)
+                sig_ids.add(aa.action_signal)
+    return sig_ids
+
+
+# ─── 聚類狀態（增量模式用）───
+
+_CLUSTER_STATE_FILE = "conviction_clusters.json"
+_CLUSTER_CENTROIDS_FILE = "conviction_centroids.npy"
+
+
+def _load_cluster_state(owner_dir: Path) -> dict | None:
+    """載入上次聚類留下的 clusters（members）+ centroids。
+
+    不存在、兩個檔案對不上（筆數不同，或 centroids 不是 JSON 記錄的那一份）時回傳 None，
+    呼叫端會改跑全量重聚類。
+    """
+    meta_path = owner_dir / _CLUSTER_STATE_FILE
+    centroids_path = owner_dir / _CLUSTER_CENTROIDS_FILE
+    if not meta_path.exists() or not centroids_path.exists():
+        return None
+    try:
+        with open(meta_path) as f:
+            state = json.load(f)
+        centroids = np.load(centroids_path)
+    except (json.JSONDecodeError, ValueError, OSError):
+        return None
+    if centroids.ndim != 2 or len(centroids) != len(state.get("clusters", [])):
+        return None
+    if state.get("centroids_digest") != _centroids_digest(centroids):
+        return None
+    state["centroids"] = centroids
+    return state
+
+
+def _centroids_digest(centroids: np.ndarray) -> str:
+    return hashlib.sha256(np.ascontiguousarray(centroids, dtype=np.float32).tobytes()).hexdigest()
+
+
+def _save_cluster_state(owner_dir: Path, state: dict) -> None:
+    """儲存聚類狀態。centroids 存 .npy，其餘存 JSON（含 centroids 的 digest）。
+
+    兩個檔案各自寫 tmp 後 os.replace；中途當掉留下新舊混搭時，載入端比對 digest 會發現並改跑全量。
+    """
+    centroids = np.asarray(state["centroids"], dtype=np.float32)
+    if centroids.ndim != 2:  # 沒有任何 cluster 時是 shape (0,)
+        centroids = centroids.reshape(len(state["clusters"]), -1 if state["clusters"] else 0)
+    meta = {k: v for k, v in state.items() if k != "centroids"}
+    meta["centroids_digest"] = _centroids_digest(centroids)
+
+    tmp = owner_dir / f"{_CLUSTER_CENTROIDS_FILE}.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, centroids)
+    os.replace(tmp, owner_dir / _CLUSTER_CENTROIDS_FILE)
+    tmp = owner_dir / f"{_CLUSTER_STATE_FILE}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp, owner_dir / _CLUSTER_STATE_FILE)
+
+
+def _needs_full_recluster(state: dict | None, conv_cfg: dict, threshold: float) -> bool:
+    """判斷這次要不要全量重新聚類。"""
+    if state is None or conv_cfg.get("mode", "incremental") == "full":
+        return True
+    if state.get("threshold") != threshold:
+        return True
+    last_full = state.get("last_full_recluster")
+    if not last_full:
+        return True
+    days = (datetime.now() - datetime.strptime(last_full, "%Y-%m-%d")).days
+    return days >= conv_cfg.get("full_recluster_days", 7)
+
+
+def _cluster_all(
+    ids: list[str],
+    embeddings: np.ndarray,
+    threshold: float,
+    conv_cfg: dict,
+    collection=None,
+) -> tuple[list[list[str]], np.ndarray]:
+    """全量聚類。回傳 (每個 cluster 的 signal IDs, centroids)。
+
+    backend=knn_graph 時直接用 signals collection 的 HNSW 索引建 kNN 圖。
+    """
+    backend = conv_cfg.get("clustering", "agglomerative")
+    knn_k = conv_cfg.get("knn_k", 15)
+    neighbors = None
+    if backend == "knn_graph" and collection is not None and len(ids) > 2:
+        neighbors = knn_from_collection(collection, ids, embeddings, knn_k)
+    labels = cluster_labels(embeddings, threshold, backend=backend, knn_k=knn_k, neighbors=neighbors)
+
+    # 按 label 分組
+    by_label: dict[int, list[int]] = defaultdict(list)
+    for i, label in enumerate(labels):
+        by_label[label].append(i)
+
+    members = [[ids[i] for i in idxs] for idxs in by_label.values()]
+    centroids = np.array([embeddings[idxs].mean(axis=0) for idxs in by_label.values()])
+    return members, centroids
+
+
+def _assign_incremental(
+    state: dict,
+    new_ids: list[str],
+    new_embeddings: np.ndarray,
+    threshold: float,
+    block_size: int = 256,
+) -> set[int]:
+    """把新 signals 分配到既有 cluster（centroid 相似度 >= threshold），否則開新 cluster。
+
+    直接修改 state 的 clusters / centroids，回傳有變動的 cluster index。
+    centroid 比對是 average linkage 的近似，誤差由定期全量重聚類修正。
+    """
+    members: list[list[str]] = state["clusters"]
+    counts = np.array([len(m) for m in members], dtype=np.float64)
+    sums = np.asarray(state["centroids"], dtype=np.float64) * counts[:, None] if len(members) else None
+    new_normed = new_embeddings / (np.linalg.norm(new_embeddings, axis=1, keepdims=True) + 1e-8)
+
+    # 先對既有 centroids 做分塊矩陣乘法，找每個新 signal 的最佳 cluster
+    base = len(members)
+    best_idx = np.full(len(new_ids), -1)
+    best_sim = np.full(len(new_ids), -1.0)
+    if base:
+        existing = sums / counts[:, None]
+        existing /= np.linalg.norm(existing, axis=1, keepdims=True) + 1e-8
+        for start in range(0, len(new_ids), block_size):
+            sims = new_normed[start:start + block_size] @ existing.T
+            best_idx[start:start + block_size] = sims.argmax(axis=1)
+            best_sim[start:start + block_size] = sims.max(axis=1)
+
+    touched: set[int] = set()
+    seed_sums: list[np.ndarray] = []  # 本次新開的 clusters
+    seed_counts: list[int] = []
+    for i, sid in enumerate(new_ids):
+        emb = new_normed[i]
+        if best_sim[i] >= threshold:
+            target = int(best_idx[i])
+            members[target].append(sid)
+            sums[target] += emb
+            counts[target] += 1
+            touched.add(target)
+            continue
+
+        # 沒有既有 cluster 夠近 → 比對本次新開的 clusters，再不行就開新的
+        target = -1
+        if seed_sums:
+            seeds = np.array(seed_sums) / np.array(seed_counts)[:, None]
+            seeds /= np.linalg.norm(seeds, axis=1, keepdims=True) + 1e-8
+            sims = seeds @ emb
+            if sims.max() >= threshold:
+                target = int(sims.argmax())
+        if target >= 0:
+            seed_sums[target] = seed_sums[target] + emb
+            seed_counts[target] += 1
+            members[base + target].append(sid)
+        else:
+            seed_sums.append(emb.astype(np.float64))
+            seed_counts.append(1)
+            members.append([sid])
+            target = len(seed_sums) - 1
+        touched.add(base + target)
+
+    centroid_parts = []
+    if base:
+        centroid_parts.append(sums / counts[:, None])
+    if seed_sums:
+        centroid_parts.append(np.array(seed_sums) / np.array(seed_counts)[:, None])
+    state["centroids"] = np.vstack(centroid_parts)
+    return touched
+
+
 def detect(
     owner_id: str,
     config: dict,
     store: SignalStore | None = None,
     signal_map: dict | None = None,
+    full: bool = False,
 ) -> tuple[list[Conviction], list[dict]]:
     """主入口：偵測 convictions。
 
-    1. 從 ChromaDB 取所有 signal embeddings
-    2. AgglomerativeClustering 聚類
-    3. 每個 cluster 做五種共鳴收斂檢查
-    4. 通過門檻的 cluster 生成/更新 conviction
+    1. 聚類 signal embeddings：
+       - 增量模式（預設）：只把上次之後新進的 signals 分配到既有 cluster 或開新 cluster
+       - 全量模式：重聚所有 signals（agglomerative 或 knn_graph backend）（沒有狀態、
+         超過 full_recluster_days、門檻改變、或 full=True 時）
+    2. 有變動的 cluster 做五種共鳴收斂檢查
+    3. 通過門檻的 cluster 生成/更新 conviction
 
     回傳 (new_convictions, strength_changes)。
     strength_changes: [{"conviction_id", "statement", "old", "new", "delta"}]
 
-    可傳入 store 和 signal_map 避免重複載入（daily_batch 共用）。
+    可傳入 store（daily_batch 共用）與已載入的 signal_map；沒傳 signal_map 時只讀需要的 signals。
     """
     store = store or SignalStore(config, owner_id)
     owner_dir = get_owner_dir(config, owner_id)
+    conv_cfg = config.get("engine", {}).get("conviction", {})
+    threshold = conv_cfg.get("similarity_threshold", 0.75)
+    today = datetime.now().strftime("%Y-%m-%d")
 
-    # 取所有 signals + embeddings
     collection = store._collection
-    all_data = collection.get(include=["embeddings", "documents"])
-    if not all_data["ids"] or all_data["embeddings"] is None:
-        return [], []
-
-    ids = all_data["ids"]
-    embeddings = np.array(all_data["embeddings"])
-    if embeddings.size == 0:
-        return [], []
-
-    if len(ids) < 2:
-        return [], []
-
-    # Step 1: AgglomerativeClustering
-    threshold = config.get("engine", {}).get("conviction", {}).get("similarity_threshold", 0.75)
-    clustering = AgglomerativeClustering(
-        n_clusters=None,
-        distance_threshold=1 - threshold,  # cosine distance = 1 - similarity
-        metric="cosine",
-        linkage="average",
-    )
-    labels = clustering.fit_predict(embeddings)
-
-    # 按 label 分組
-    clusters: dict[int, list[str]] = defaultdict(list)
-    for signal_id, label in zip(ids, labels):
-        clusters[label].append(signal_id)
+    state = _load_cluster_state(owner_dir)
+
+    # Step 1: 聚類 → [(signal_ids, centroid)]，只包含這次需要檢查的 clusters
+    clusters: list[tuple[list[str], np.ndarray]] = []
+    full_run = full or _needs_full_recluster(state, conv_cfg, threshold)
+    if full_run:
+        # 取所有 signals + embeddings
+        all_data = collection.get(include=["embeddings"])
+        if not all_data["ids"] or all_data["embeddings"] is None:
+            return [], []
+
+        ids = all_data["ids"]
+        embeddings = np.asarray(all_data["embeddings"], dtype=np.float32)
+        if embeddings.size == 0:
+            return [], []
+
+        if len(ids) < 2:
+            return [], []
+
+        members, centroids = _cluster_all(ids, embeddings, threshold, conv_cfg, collection)
+        state = {
+            "threshold": threshold,
+            "last_full_recluster": today,
+            "clusters": members,
+            "centroids": centroids,
+        }
+        clusters = list(zip(members, centroids))
+    else:
+        # 只取上次之後新進的 signals
+        assigned = {sid for m in state["clusters"] for sid in m}
+        new_ids = [sid for sid in store.signal_ids() if sid not in assigned]
+        if new_ids:
+            new_data = collection.get(ids=new_ids, include=["embeddings"])
+            if new_data["ids"] and new_data["embeddings"] is not None:
+                touched = _assign_incremental(
+                    state, new_data["ids"], np.asarray(new_data["embeddings"], dtype=np.float32), threshold,
+                )
+                clusters = [(state["clusters"][i], state["centroids"][i]) for i in sorted(touched)]
+
+    # 載入既有 convictions
+    existing = _load_convictions(owner_dir)
+    evidence_ids = {c.conviction_id: _evidence_signal_ids(c) for c in existing}
 
-    # 載入 signals（一次性，或用傳入的 cache）
+    # 載入 signals（一次性，或用傳入的 cache）；增量模式只讀需要的那些
     if signal_map is None:
-        all_signals = store.load_all()
+        if full_run:
+            all_signals = store.load_all()
+        else:
+            needed = {sid for signal_ids, _ in clusters for sid in signal_ids}
+            for ids_ in evidence_ids.values():
+                needed.update(ids_)
+            all_signals = store._load_signals_by_ids(list(needed))
         signal_map = {s.signal_id: s for s in all_signals}
 
-    # 載入既有 convictions — batch encode 取代逐一計算
-    existing = _load_convictions(owner_dir)
+    # 既有 conviction statements 的 embeddings（持久化快取，只 encode 新的）
     existing_embeddings: list[tuple[Conviction, np.ndarray]] = []
     if existing:
-        statements = [c.statement for c in existing]
-        embs = store._get_embedder().encode(
-            statements, normalize_embeddings=True,
-            show_progress_bar=len(statements) > 50,
-        )
-        for c, emb in zip(existing, embs):
-            existing_embeddings.append((c, np.array(emb)))
+        embs = _load_conviction_embeddings(store, existing)
+        existing_embeddings = list(zip(existing, embs))
 
-    min_resonance = config.get("engine", {}).get("conviction", {}).get("min_resonance_count", 2)
-    match_threshold = config.get("engine", {}).get("conviction", {}).get("match_threshold", 0.80)
+    min_resonance = conv_cfg.get("min_resonance_count", 2)
+    match_threshold = conv_cfg.get("match_threshold", 0.80)
     new_convictions: list[Conviction] = []
     updated_ids: set[str] = set()
-    today = datetime.now().strftime("%Y-%m-%d")
 
     # 收集已被 conviction 覆蓋的 signal IDs（用於跳過已覆蓋的 clusters）
     covered_signal_ids: set[str] = set()
-    for conv in existing:
-        if conv.resonance_evidence:
-            re = conv.resonance_evidence
-            if re.temporal_persistence:
-                for tp in re.temporal_persistence:
-                    covered_signal_ids.update(tp.signal_ids)
-            if re.cross_context_consistency:
-                for ccc in re.cross_context_consistency:
-                    covered_signal_ids.update(ccc.signal_ids)
-            if re.input_output_convergence:
-                for ioc in re.input_output_convergence:
-                    covered_signal_ids.add(ioc.input_signal)
-                    covered_signal_ids.add(ioc.output_signal)
-            if re.spontaneous_mentions:
-                for sm in re.spontaneous_mentions:
-                    covered_signal_ids.add(sm.signal_id)
-            if re.action_alignment:
-                for aa in re.action_alignment:
-                    covered_signal_ids.add(aa.statement_signal)
-                    covered_signal_ids.add(aa.action_signal)
+    for ids_ in evidence_ids.values():
+        covered_signal_ids.update(ids_)
 
     # 預建 existing embedding 矩陣（向量化比對，取代逐一 loop）
     existing_emb_matrix = None
     if existing_embeddings:
-        existing_emb_matrix = np.array([emb for _, emb in existing_embeddings])
+        existing_emb_matrix = np.array([emb for _, emb in existing_embeddings], dtype=np.float32)
 
     # Phase 1: 篩選需要 LLM 的 unmatched clusters
     pending_clusters: list[tuple[list[Signal], ResonanceEvidence, int, np.ndarray]] = []
 
-    for label, signal_ids in clusters.items():
+    for signal_ids, cluster_emb in clusters:
         if len(signal_ids) < 3:
             continue
 
@@ -374,8 +664,6 @@ def detect(
             continue
 
         # 比對既有 convictions（門檻從 0.85 降為 0.80）
-        idx_in_cluster = [i for i, sid in enumerate(ids) if sid in signal_set]
-        cluster_emb = embeddings[idx_in_cluster].mean(axis=0)
         matched_existing = None
 
         if existing_emb_matrix is not None:
@@ -400,7 +688,7 @@ def detect(
 
     # Phase 2: 批次 LLM 生成新 conviction statements
     if pending_clusters:
-        from engine.llm import batch_llm
+        from engine.llm import batch_llm, forget_cached
 
         prompts = []
         for cluster_signals, _, _, _ in pending_clusters:
@@ -417,13 +705,18 @@ def detect(
             )
             prompts.append(prompt)
 
-        results = batch_llm(prompts, config=config, tier="medium")
+        results = batch_llm(prompts, config=config, tier="medium", cache=True)
 
-        for (cluster_signals, evidence, resonance_count, _), raw_statement in zip(pending_clusters, results):
+        rejected: list[str] = []
+        for (cluster_signals, evidence, resonance_count, _), prompt, raw_statement in zip(
+            pending_clusters, prompts, results,
+        ):
             statement = raw_statement.strip().strip("「」""\"'")
             if not statement or statement.upper() == "SKIP":
                 continue
             if _is_llm_hallucination(statement):
+                # 壞回應不留在快取，cluster 下次被碰到時重新生成
+                rejected.append(prompt)
                 continue
             conviction = Conviction(
                 owner_id=owner_id,
@@ -439,6 +732,7 @@ def detect(
                 ),
             )
             new_convictions.append(conviction)
+        forget_cached(rejected, config=config, tier="medium")
 
     # 快照：重算前先記錄既有 conviction 的 strength
     old_strengths = {c.conviction_id: c.strength.score for c in existing}
@@ -447,26 +741,7 @@ def detect(
     all_convictions = existing + new_convictions
     for conv in all_convictions:
         # 收集這個 conviction 關聯的 signal IDs
-        sig_ids: set[str] = set()
-        if conv.resonance_evidence:
-            re = conv.resonance_evidence
-            if re.input_output_convergence:
-                for ioc in re.input_output_convergence:
-                    sig_ids.add(ioc.input_signal)
-                    sig_ids.add(ioc.output_signal)
-            if re.temporal_persistence:
-                for tp in re.temporal_persistence:
-                    sig_ids.update(tp.signal_ids)
-            if re.cross_context_consistency:
-                for ccc in re.cross_context_consistency:
-                    sig_ids.update(ccc.signal_ids)
-            if re.spontaneous_mentions:
-                for sm in re.spontaneous_mentions:
-                    sig_ids.add(sm.signal_id)
-            if re.action_alignment:
-                for aa in re.action_alignment:
-                    sig_ids.add(aa.statement_signal)
-                    sig_ids.add(aa.action_signal)
+        sig_ids = _evidence_signal_ids(conv)
 
         conv_signals = [signal_map[sid] for sid in sig_ids if sid in signal_map]
         if conv_signals:
@@ -480,6 +755,11 @@ def detect(
             conv.strength = _compute_strength(resonance_count, len(conv_signals), conv_signals)
 
     _save_convictions(owner_dir, all_convictions)
+    _prune_conviction_embeddings(owner_dir, config, all_convictions)
+
+    # convictions 存好後才更新聚類狀態，中途失敗時下次會重新處理這批 signals
+    state["last_updated"] = today
+    _save_cluster_state(owner_dir, state)
 
     # 計算 strength 變動（|delta| > 0.05 才回傳）
     strength_changes: list[dict] = []
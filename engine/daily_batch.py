@@ -131,21 +131,17 @@ def run_daily(owner_id: str, config: dict | None = None) -> dict:
 
     cfg = config or load_config()
 
-    # 共用 store + signal_map，避免重複建 client 和 load_all
+    # 共用 store 避免重複建 client；不預載 signals，各步驟只經 offset 索引讀需要的部分
     store = SignalStore(cfg, owner_id)
-    all_signals = store.load_all()
-    signal_map = {s.signal_id: s for s in all_signals}
 
     # Step 1: Conviction detection（回傳 new_convictions + strength_changes）
-    new_convictions, strength_changes = detect_convictions(
-        owner_id, cfg, store=store, signal_map=signal_map
-    )
+    new_convictions, strength_changes = detect_convictions(owner_id, cfg, store=store)
 
     # Step 2: Trace extraction（需要在 conviction detection 之後，才能引用 convictions）
-    new_traces = extract_traces(owner_id, cfg, store=store, signal_map=signal_map)
+    new_traces = extract_traces(owner_id, cfg, store=store)
 
     # Step 3: Contradiction scan
-    contradictions = scan_contradictions(owner_id, cfg)
+    contradictions, contradiction_stats = scan_contradictions(owner_id, cfg)
 
     # Step 4: Decision followups
     followups = get_pending_followups(owner_id, cfg)
@@ -163,6 +159,7 @@ def run_daily(owner_id: str, config: dict | None = None) -> dict:
         "strength_changes": len(strength_changes),
         "new_traces": len(new_traces),
         "contradictions": len(contradictions),
+        "contradiction_scan": contradiction_stats,
         "followups": len(followups),
         "digest": digest_text,
     }
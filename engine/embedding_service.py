@@ -0,0 +1,280 @@
+"""Embedding service — 單句 embedding 的 micro-batching
+
+並行請求（/query、/recall、/explore…）各自呼叫 compute_embedding 時，
+原本每個都跑一次 batch=1 的 forward pass。這裡把進來的文字排隊幾毫秒，
+湊成一批一起 encode，再把結果分回各請求的 Future。
+
+config: engine.embedding.batch_max_size / batch_max_wait_ms
+（batch_max_size <= 1 時不排隊，直接 encode）
+
+前面再擋一層 LRU（key = 正規化文字 + model 名稱）：agent 重試、simulate → explore、
+connections 反覆查同一個 topic 時直接回快取，不跑模型。
+config: engine.embedding.cache_size / cache_persist（落地到 {data_dir}/embedding_cache.sqlite）
+/ cache_disk_max_entries（落地筆數上限，超過時從最久沒用到的開始刪）
+"""
+
+from __future__ import annotations
+
+import hashlib
+import queue
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+
+import numpy as np
+
+from engine.config import get_data_dir
+
+
+# ─── Micro-batching ───
+
+
+class _EmbeddingBatcher:
+    def __init__(self, embedder, max_batch: int, max_wait_ms: float):
+        self.embedder = embedder
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue: queue.Queue[tuple[str, Future]] = queue.Queue()
+        self.batches = 0
+        self.texts = 0
+        self.thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self.thread.start()
+
+    def embed(self, text: str) -> np.ndarray:
+        future: Future = Future()
+        self.queue.put((text, future))
+        return future.result()
+
+    def _collect(self) -> list[tuple[str, Future]]:
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            try:
+                embeddings = self.embedder.encode(
+                    [text for text, _ in batch], normalize_embeddings=True, show_progress_bar=False,
+                )
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.texts += len(batch)
+            for (_, future), emb in zip(batch, embeddings):
+                future.set_result(np.asarray(emb))
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "texts": self.texts,
+            "avg_batch_size": round(self.texts / self.batches, 2) if self.batches else 0.0,
+            "queued": self.queue.qsize(),
+        }
+
+
+# ─── Query embedding LRU ───
+
+# 落地快取每寫入 N 筆做一次淘汰，避免每次 put 都掃表
+_EVICT_EVERY = 200
+
+
+def _normalize_text(text: str) -> str:
+    # 只做 NFKC + 空白收斂；不轉小寫，大小寫對 embedding 有影響
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text)).strip()
+
+
+class _EmbeddingCache:
+    """記憶體 LRU，可選 SQLite 落地（process 重啟後仍命中）。
+
+    落地的 rows 記 accessed_at，超過 disk_max_entries 時刪最久沒用到的。
+    記憶體命中不逐次寫回 SQLite，先記在 _touched，淘汰前一次更新。
+    """
+
+    def __init__(self, capacity: int, path: Path | None = None, disk_max_entries: int = 100_000):
+        self.capacity = capacity
+        self.disk_max_entries = disk_max_entries
+        self.entries: OrderedDict[str, np.ndarray] = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.path = path
+        self.conn = None
+        self._writes = 0
+        self._touched: set[str] = set()
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(str(path), check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY, embedding BLOB NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON embeddings(accessed_at)")
+            self.conn.commit()
+            self.evict()
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\x00{_normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> np.ndarray | None:
+        with self.lock:
+            emb = self.entries.get(key)
+            if emb is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                if self.conn is not None:
+                    self._touched.add(key)
+                return emb
+            if self.conn is not None:
+                row = self.conn.execute("SELECT embedding FROM embeddings WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    emb = np.frombuffer(row[0], dtype=np.float32)
+                    self._remember(key, emb)
+                    self._touched.add(key)
+                    self.disk_hits += 1
+                    return emb
+            self.misses += 1
+            return None
+
+    def put(self, key: str, emb: np.ndarray) -> None:
+        emb = np.asarray(emb, dtype=np.float32)
+        emb.setflags(write=False)
+        with self.lock:
+            self._remember(key, emb)
+            if self.conn is None:
+                return
+            self.conn.execute(
+                "INSERT OR REPLACE INTO embeddings (key, embedding, accessed_at) VALUES (?, ?, ?)",
+                (key, emb.tobytes(), time.time()),
+            )
+            self.conn.commit()
+            self._writes += 1
+            if self._writes < _EVICT_EVERY:
+                return
+            self._writes = 0
+        self.evict()
+
+    def evict(self) -> int:
+        """寫回累積的 accessed_at，刪除超出 disk_max_entries 的最久沒用到的 rows，回傳刪除筆數。"""
+        if self.conn is None:
+            return 0
+        with self.lock:
+            if self._touched:
+                now = time.time()
+                self.conn.executemany(
+                    "UPDATE embeddings SET accessed_at = ? WHERE key = ?", [(now, k) for k in self._touched],
+                )
+                self._touched.clear()
+            cur = self.conn.execute(
+                "DELETE FROM embeddings WHERE key IN ("
+                " SELECT key FROM embeddings ORDER BY accessed_at DESC, key LIMIT -1 OFFSET ?)",
+                (max(self.disk_max_entries, 0),),
+            )
+            self.conn.commit()
+            return cur.rowcount
+
+    def _remember(self, key: str, emb: np.ndarray) -> None:
+        self.entries[key] = emb
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+                "persist_path": str(self.path) if self.path else None,
+                "disk_max_entries": self.disk_max_entries if self.path else None,
+            }
+
+
+# ─── Service ───
+
+_batcher: _EmbeddingBatcher | None = None
+_cache: _EmbeddingCache | None = None
+_cache_configured = False
+_lock = threading.Lock()
+
+
+def _get_batcher(config: dict) -> _EmbeddingBatcher | None:
+    global _batcher
+    emb_cfg = config.get("engine", {}).get("embedding", {})
+    max_batch = emb_cfg.get("batch_max_size", 16)
+    if max_batch <= 1:
+        return None
+    with _lock:
+        if _batcher is None:
+            from engine.signal_store import _get_global_embedder
+            _batcher = _EmbeddingBatcher(
+                _get_global_embedder(config),
+                max_batch=max_batch,
+                max_wait_ms=emb_cfg.get("batch_max_wait_ms", 5),
+            )
+        return _batcher
+
+
+def _get_cache(config: dict) -> _EmbeddingCache | None:
+    global _cache, _cache_configured
+    with _lock:
+        if not _cache_configured:
+            emb_cfg = config.get("engine", {}).get("embedding", {})
+            capacity = emb_cfg.get("cache_size", 4096)
+            if capacity > 0:
+                path = get_data_dir(config) / "embedding_cache.sqlite" if emb_cfg.get("cache_persist", False) else None
+                _cache = _EmbeddingCache(capacity, path, emb_cfg.get("cache_disk_max_entries", 100_000))
+            _cache_configured = True
+        return _cache
+
+
+def _encode(config: dict, text: str) -> np.ndarray:
+    batcher = _get_batcher(config)
+    if batcher is None:
+        from engine.signal_store import _get_global_embedder
+        return np.asarray(_get_global_embedder(config).encode(text, normalize_embeddings=True))
+    return batcher.embed(text)
+
+
+def embed_text(config: dict, text: str) -> np.ndarray:
+    """單句 normalized embedding；先查 LRU，沒命中才進 batcher（並行呼叫合併成一批 encode）。"""
+    cache = _get_cache(config)
+    if cache is None:
+        return _encode(config, text)
+    from engine.signal_store import _embedding_model_name
+    key = cache.key(_embedding_model_name(config), text)
+    emb = cache.get(key)
+    if emb is None:
+        emb = _encode(config, text)
+        cache.put(key, emb)
+    return emb
+
+
+def batcher_stats() -> dict | None:
+    return _batcher.stats() if _batcher is not None else None
+
+
+def cache_stats() -> dict | None:
+    return _cache.stats() if _cache is not None else None
@@ -18,10 +18,12 @@ from engine.config import get_owner_dir, load_config
 from engine.conviction_detector import _load_convictions
 from engine.frame_clusterer import _load_frames
 from engine.identity_scanner import _load_identity
-from engine.llm import call_llm
+from engine.llm import acall_llm, call_llm
 from engine.models import Conviction, ContextFrame, ReasoningTrace
+from engine.query_engine import _get_cached, _result_pairs, _vector_lookups
 from engine.signal_store import SignalStore
 from engine.trace_extractor import _load_traces
+from engine.workers import run_blocking
 
 
 # ─── 1. Recall（記憶回溯）───
@@ -90,31 +92,24 @@ def explore(
     owner_dir = get_owner_dir(cfg, owner_id)
     store = SignalStore(cfg, owner_id)
 
-    convictions = _load_convictions(owner_dir)
-    traces = _load_traces(owner_dir)
-    frames = _load_frames(owner_dir)
+    # 五層資料與向量索引都從 query_engine 的 owner 快取拿
+    cached = _get_cached(owner_id, owner_dir, cfg)
+    frames = cached["frames"]
 
-    # 用 embedding 找相關 convictions
+    # 用 embedding 找相關 convictions / traces（in-memory top-k）
     q_emb = store.compute_embedding(topic)
-
-    import chromadb
-    chroma_dir = owner_dir / "chroma"
-    client = chromadb.PersistentClient(path=str(chroma_dir))
+    lookups = _vector_lookups(q_emb, cached, owner_id, {
+        "convictions": 10,
+        "traces": 10 if depth != "lite" else 0,
+    })
 
     # 找相關 convictions
-    conviction_map = {c.conviction_id: c for c in convictions}
-    related_convictions = []
-    try:
-        col = client.get_collection(name=f"{owner_id}_convictions")
-        results = col.query(query_embeddings=[q_emb], n_results=10)
-        if results["ids"] and results["ids"][0]:
-            for i, cid in enumerate(results["ids"][0]):
-                if cid in conviction_map:
-                    c = conviction_map[cid]
-                    distance = results["distances"][0][i] if results.get("distances") else 1.0
-                    related_convictions.append((c, distance))
-    except Exception:
-        pass
+    conviction_map = cached["conviction_map"]
+    related_convictions = [
+        (conviction_map[cid], distance)
+        for cid, distance in _result_pairs(lookups.get("convictions"))
+        if cid in conviction_map
+    ]
 
     # 過濾距離太遠的
     related_convictions = [(c, d) for c, d in related_convictions if d < 0.8]
@@ -136,19 +131,10 @@ def explore(
 
     # Full depth: 加 traces, frames, tensions, signals
     conviction_ids = {c.conviction_id for c, _ in related_convictions}
-    trace_map = {t.trace_id: t for t in traces}
+    trace_map = cached["trace_map"]
 
     # 找相關 traces
-    related_traces = []
-    try:
-        col = client.get_collection(name=f"{owner_id}_traces")
-        results = col.query(query_embeddings=[q_emb], n_results=10)
-        if results["ids"] and results["ids"][0]:
-            for tid in results["ids"][0]:
-                if tid in trace_map:
-                    related_traces.append(trace_map[tid])
-    except Exception:
-        pass
+    related_traces = [trace_map[tid] for tid, _ in _result_pairs(lookups.get("traces")) if tid in trace_map]
 
     # 找所屬 frames
     related_frames = []
@@ -227,29 +213,17 @@ def evolution(
     cfg = config or load_config()
     owner_dir = get_owner_dir(cfg, owner_id)
     store = SignalStore(cfg, owner_id)
+    cached = _get_cached(owner_id, owner_dir, cfg)
 
-    convictions = _load_convictions(owner_dir)
-    traces = _load_traces(owner_dir)
-
-    # 找相關 convictions
+    # 找相關 convictions / traces
     q_emb = store.compute_embedding(topic)
+    lookups = _vector_lookups(q_emb, cached, owner_id, {"convictions": 8, "traces": 15})
 
-    import chromadb
-    chroma_dir = owner_dir / "chroma"
-    client = chromadb.PersistentClient(path=str(chroma_dir))
-
-    conviction_map = {c.conviction_id: c for c in convictions}
-    related_ids = []
-    try:
-        col = client.get_collection(name=f"{owner_id}_convictions")
-        results = col.query(query_embeddings=[q_emb], n_results=8)
-        if results["ids"] and results["ids"][0]:
-            for i, cid in enumerate(results["ids"][0]):
-                d = results["distances"][0][i] if results.get("distances") else 1.0
-                if d < 0.8 and cid in conviction_map:
-                    related_ids.append(cid)
-    except Exception:
-        pass
+    conviction_map = cached["conviction_map"]
+    related_ids = [
+        cid for cid, d in _result_pairs(lookups.get("convictions"))
+        if d < 0.8 and cid in conviction_map
+    ]
 
     # 讀 strength snapshots
     snapshots_path = owner_dir / "strength_snapshots.jsonl"
@@ -283,18 +257,8 @@ def evolution(
         })
 
     # 相關 traces 按時間排列
-    trace_map = {t.trace_id: t for t in traces}
-    related_traces = []
-    try:
-        col = client.get_collection(name=f"{owner_id}_traces")
-        results = col.query(query_embeddings=[q_emb], n_results=15)
-        if results["ids"] and results["ids"][0]:
-            for tid in results["ids"][0]:
-                if tid in trace_map:
-                    related_traces.append(trace_map[tid])
-    except Exception:
-        pass
-
+    trace_map = cached["trace_map"]
+    related_traces = [trace_map[tid] for tid, _ in _result_pairs(lookups.get("traces")) if tid in trace_map]
     related_traces.sort(key=lambda t: t.source.date)
 
     # 推理風格隨時間的變化
@@ -472,50 +436,24 @@ def connections(
     cfg = config or load_config()
     owner_dir = get_owner_dir(cfg, owner_id)
     store = SignalStore(cfg, owner_id)
+    cached = _get_cached(owner_id, owner_dir, cfg)
 
-    convictions = _load_convictions(owner_dir)
-    traces = _load_traces(owner_dir)
-    frames = _load_frames(owner_dir)
+    frames = cached["frames"]
+    conviction_map = cached["conviction_map"]
 
-    import chromadb
-    chroma_dir = owner_dir / "chroma"
-    client = chromadb.PersistentClient(path=str(chroma_dir))
-    conviction_map = {c.conviction_id: c for c in convictions}
+    def _find_ids(topic: str, limit: int = 8) -> tuple[set[str], set[str]]:
+        """回傳 (距離 < 0.8 的 conviction ids, top-k trace ids)。"""
+        lookups = _vector_lookups(store.compute_embedding(topic), cached, owner_id, {
+            "convictions": limit,
+            "traces": limit,
+        })
+        conviction_ids = {cid for cid, d in _result_pairs(lookups.get("convictions")) if d < 0.8}
+        trace_ids = {tid for tid, _ in _result_pairs(lookups.get("traces"))}
+        return conviction_ids, trace_ids
 
-    emb_a = store.compute_embedding(topic_a)
-    emb_b = store.compute_embedding(topic_b)
-
-    def _find_conviction_ids(emb: list[float], limit: int = 8) -> set[str]:
-        try:
-            col = client.get_collection(name=f"{owner_id}_convictions")
-            results = col.query(query_embeddings=[emb], n_results=limit)
-            if results["ids"] and results["ids"][0]:
-                ids = set()
-                for i, cid in enumerate(results["ids"][0]):
-                    d = results["distances"][0][i] if results.get("distances") else 1.0
-                    if d < 0.8:
-                        ids.add(cid)
-                return ids
-        except Exception:
-            pass
-        return set()
-
-    def _find_trace_ids(emb: list[float], limit: int = 8) -> set[str]:
-        try:
-            col = client.get_collection(name=f"{owner_id}_traces")
-            results = col.query(query_embeddings=[emb], n_results=limit)
-            if results["ids"] and results["ids"][0]:
-                return set(results["ids"][0])
-        except Exception:
-            pass
-        return set()
-
-    ids_a = _find_conviction_ids(emb_a)
-    ids_b = _find_conviction_ids(emb_b)
+    ids_a, trace_ids_a = _find_ids(topic_a)
+    ids_b, trace_ids_b = _find_ids(topic_b)
     shared_conviction_ids = ids_a & ids_b
-
-    trace_ids_a = _find_trace_ids(emb_a)
-    trace_ids_b = _find_trace_ids(emb_b)
     shared_trace_ids = trace_ids_a & trace_ids_b
 
     # 找共用的 frames
@@ -545,7 +483,7 @@ def connections(
                         "relationship": t.relationship,
                     })
 
-    trace_map = {t.trace_id: t for t in traces}
+    trace_map = cached["trace_map"]
 
     return {
         "topic_a": topic_a,
@@ -580,15 +518,13 @@ def connections(
 # ─── 6. Simulate（模擬預測）───
 
 
-def simulate(
+def _prepare_simulation(
     owner_id: str,
     scenario: str,
-    context: str | None = None,
-    config: dict | None = None,
-) -> dict:
-    """模擬這個人在假設情境下的反應路徑。"""
-    cfg = config or load_config()
-
+    context: str | None,
+    cfg: dict,
+) -> tuple[dict, dict, str]:
+    """收集五層資料並組 prompt，回傳 (explored, blindspots, prompt)。"""
     # 用 explore 取得相關的五層資料
     explored = explore(owner_id, scenario, depth="full", config=cfg)
 
@@ -659,8 +595,10 @@ def simulate(
 
 用第一人稱「我」回答，語氣符合這個人的風格。"""
 
-    response = call_llm(prompt, config=cfg, tier="medium")
+    return explored, spots, prompt
+
 
+def _simulation_result(scenario: str, context: str | None, explored: dict, spots: dict, response: str) -> dict:
     return {
         "scenario": scenario,
         "context": context,
@@ -671,3 +609,31 @@ def simulate(
         "tensions_involved": len(explored["tensions"]),
         "blindspot_warning": spots.get("thinking_inertia"),
     }
+
+
+def simulate(
+    owner_id: str,
+    scenario: str,
+    context: str | None = None,
+    config: dict | None = None,
+) -> dict:
+    """模擬這個人在假設情境下的反應路徑。"""
+    cfg = config or load_config()
+
+    explored, spots, prompt = _prepare_simulation(owner_id, scenario, context, cfg)
+    response = call_llm(prompt, config=cfg, tier="medium")
+    return _simulation_result(scenario, context, explored, spots, response)
+
+
+async def asimulate(
+    owner_id: str,
+    scenario: str,
+    context: str | None = None,
+    config: dict | None = None,
+) -> dict:
+    """simulate 的 async 版本：檢索在 worker pool 跑，LLM 直接 await。"""
+    cfg = config or load_config()
+
+    explored, spots, prompt = await run_blocking(_prepare_simulation, owner_id, scenario, context, cfg)
+    response = await acall_llm(prompt, config=cfg, tier="medium")
+    return _simulation_result(scenario, context, explored, spots, response)
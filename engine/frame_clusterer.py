@@ -14,9 +14,10 @@ from datetime import datetime
 from pathlib import Path
 
 import numpy as np
-from sklearn.cluster import AgglomerativeClustering
 
+from engine.clustering import cluster_labels
 from engine.config import get_owner_dir
+from engine.generations import bump_generation
 from engine.conviction_detector import _load_convictions
 from engine.llm import batch_llm, call_llm
 from engine.models import (
@@ -51,6 +52,7 @@ def _save_frames(owner_dir: Path, frames: list[ContextFrame]) -> None:
     with open(path, "w") as f:
         for frame in frames:
             f.write(frame.model_dump_json() + "\n")
+    bump_generation(owner_dir, "frames")
 
 
 def _trace_to_text(trace: ReasoningTrace, conviction_map: dict[str, str]) -> str:
@@ -202,7 +204,7 @@ def _generate_frame_metadata(
 輸出 JSON（不要加 markdown 標記）：
 {{"name": "...", "description": "...", "trigger_patterns": [{{"pattern": "...", "keywords": ["...", "..."]}}], "tone": "..."}}"""
 
-    result = call_llm(prompt, config=config, tier="light").strip()
+    result = call_llm(prompt, config=config, tier="light", cache=True).strip()
     if result.startswith("```"):
         result = result.split("\n", 1)[1] if "\n" in result else result[3:]
     if result.endswith("```"):
@@ -222,7 +224,7 @@ def cluster(owner_id: str, config: dict, min_traces: int = 3) -> list[ContextFra
 
     1. 載入 traces + convictions
     2. 每個 trace 轉成語義文字 → embedding
-    3. AgglomerativeClustering 聚類
+    3. 聚類（engine.frame.clustering：agglomerative | knn_graph）
     4. 過濾：至少 min_traces 個 traces 的 cluster
     5. LLM 生成 frame metadata
     """
@@ -245,17 +247,15 @@ def cluster(owner_id: str, config: dict, min_traces: int = 3) -> list[ContextFra
     if len(traces) < 2:
         return []
 
-    # Step 2: AgglomerativeClustering
+    # Step 2: 聚類（agglomerative 或 sparse kNN graph）
     frame_cfg = config.get("engine", {}).get("frame", {})
     threshold = frame_cfg.get("similarity_threshold", 0.55)
 
-    clustering = AgglomerativeClustering(
-        n_clusters=None,
-        distance_threshold=1 - threshold,
-        metric="cosine",
-        linkage="average",
+    labels = cluster_labels(
+        embeddings, threshold,
+        backend=frame_cfg.get("clustering", "agglomerative"),
+        knn_k=frame_cfg.get("knn_k", 15),
     )
-    labels = clustering.fit_predict(embeddings)
 
     # 按 label 分組
     groups: dict[int, list[int]] = defaultdict(list)
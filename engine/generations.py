@@ -0,0 +1,53 @@
+"""Data generations — 每個 owner 各層資料的版本號
+
+generations.json：{"frames": n, "convictions": n, "traces": n, "identities": n, "index": n}
+每個寫入者（_save_convictions / _save_traces / _append_traces / _save_frames /
+_save_identity / deduper 的下游改寫）寫完檔案後呼叫 bump_generation。
+常駐的 API process 每次查詢比對版本號，只重新載入有變動的層，
+cron 跑完 daily batch 後不需要重啟 server。
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+from pathlib import Path
+
+
+# index：build_index 重建 ChromaDB 索引後遞增，快取據此重新載入 in-memory 向量
+LAYERS = ("frames", "convictions", "traces", "identities", "index")
+
+_MANIFEST_FILE = "generations.json"
+_LOCK_FILE = "generations.lock"
+
+
+def _read_manifest(owner_dir: Path) -> dict[str, int]:
+    try:
+        with open(owner_dir / _MANIFEST_FILE) as f:
+            data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {layer: 0 for layer in LAYERS}
+    return {layer: int(data.get(layer, 0)) for layer in LAYERS}
+
+
+def bump_generation(owner_dir: Path, *layers: str) -> dict[str, int]:
+    """遞增指定層的版本號（跨 process 以 flock 互斥，寫入用 tmp + rename）。"""
+    with open(owner_dir / _LOCK_FILE, "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        gens = _read_manifest(owner_dir)
+        for layer in layers:
+            gens[layer] += 1
+        tmp = owner_dir / f"{_MANIFEST_FILE}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(gens, f)
+        os.replace(tmp, owner_dir / _MANIFEST_FILE)
+    return gens
+
+
+def read_generations(owner_dir: Path) -> dict[str, int]:
+    """讀目前各層版本號（幾十 bytes 的 JSON，每次查詢讀一次）。
+
+    不用 mtime 判斷是否變動：同一個時間刻度內的連續寫入會被漏掉。
+    """
+    return _read_manifest(owner_dir)
@@ -14,6 +14,7 @@ from datetime import datetime
 from pathlib import Path
 
 from engine.config import get_owner_dir
+from engine.generations import bump_generation
 from engine.conviction_detector import _load_convictions
 from engine.frame_clusterer import _load_frames, _save_frames
 from engine.llm import batch_llm
@@ -42,6 +43,7 @@ def _save_identity(owner_dir: Path, identities: list[IdentityCore]) -> None:
     path = owner_dir / "identity.json"
     with open(path, "w") as f:
         json.dump([i.model_dump() for i in identities], f, ensure_ascii=False, indent=2)
+    bump_generation(owner_dir, "identities")
 
 
 def _generate_expressions(
@@ -84,7 +86,7 @@ def _generate_expressions(
 def call_llm_single(prompt: str, config: dict) -> str | None:
     """單次 LLM 呼叫，處理 markdown 清理。"""
     from engine.llm import call_llm
-    result = call_llm(prompt, config=config, tier="light").strip()
+    result = call_llm(prompt, config=config, tier="light", cache=True).strip()
     if result.startswith("```"):
         result = result.split("\n", 1)[1] if "\n" in result else result[3:]
     if result.endswith("```"):
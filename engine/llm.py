@@ -1,101 +1,232 @@
-"""LLM 抽象層 — 支援 local Ollama、cloud (Anthropic API)、claude_code（Agent SDK）"""
+"""LLM 抽象層 — 支援 local Ollama、cloud (Anthropic API)、claude_code（Agent SDK）
+
+async 原生：acall_llm / abatch_llm / astream_llm 在呼叫端的 event loop 上執行；
+call_llm / batch_llm 是同步 shim，交給共用的背景 loop 跑。
+"""
 
 from __future__ import annotations
 
 import asyncio
 import os
-from typing import TYPE_CHECKING
+import random
+import threading
+import weakref
+from collections.abc import AsyncIterator
 
 from engine.config import load_config
+from engine.llm_cache import cache_key, get_cache
 
-if TYPE_CHECKING:
-    from openai import OpenAI
 
+def _resolve_model(cfg: dict, backend: str, tier: str) -> str:
+    """依 backend + tier 決定實際使用的 model（也是 response cache key 的一部分）。"""
+    llm_cfg = cfg.get("llm", {}).get(backend, {})
+    if backend == "cloud":
+        # 三檔制 model mapping
+        model_map = {
+            "heavy": llm_cfg.get("model_heavy", "claude-sonnet-4-5-20250929"),
+            "medium": llm_cfg.get("model_medium", "claude-sonnet-4-5-20250929"),
+            "light": llm_cfg.get("model_light", "claude-haiku-4-5-20251001"),
+        }
+        return model_map.get(tier, model_map["heavy"])
+    if backend == "claude_code":
+        # 三檔制：light=Haiku, medium=Sonnet, heavy=Opus
+        if tier == "light":
+            return llm_cfg.get("model_light", "claude-haiku-4-5-20251001")
+        if tier == "medium":
+            return llm_cfg.get("model_medium", "claude-sonnet-4-5-20250929")
+        return llm_cfg.get("model_heavy", "claude-opus-4-6")
+    # OpenAI-compatible backends (local) — tier 不影響（本地模型只有一個）
+    return llm_cfg.get("model", "")
 
-_client: OpenAI | None = None
-_anthropic_client = None
 
+# ─── Async clients（cloud / local）───
+#
+# httpx 的 async client 綁定建立它的 event loop，所以每個 loop 各自一組 client
+# （FastAPI 的 loop 與同步 shim 用的背景 loop 都是長壽的，client 會一直重用），
+# loop 被回收時跟著釋放。SDK 內建 retry 關掉，統一由 _with_retry 處理。
 
-def _get_client(config: dict | None = None) -> OpenAI:
-    global _client
-    if _client is not None:
-        return _client
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = weakref.WeakKeyDictionary()
 
-    from openai import OpenAI as _OpenAI
 
-    cfg = config or load_config()
-    backend = cfg["engine"]["llm_backend"]
-    llm_cfg = cfg["llm"][backend]
+def _get_async_client(cfg: dict, backend: str):
+    loop = asyncio.get_running_loop()
+    clients = _async_clients.setdefault(loop, {})
+    client = clients.get(backend)
+    if client is not None:
+        return client
 
-    if backend == "local":
-        _client = _OpenAI(base_url=llm_cfg["base_url"], api_key="not-needed")
+    if backend == "cloud":
+        import anthropic
+        client = anthropic.AsyncAnthropic(
+            api_key=os.environ.get("ANTHROPIC_API_KEY", ""),
+            max_retries=0,
+        )
     else:
-        api_key = os.environ.get(llm_cfg.get("api_key_env", ""), "")
-        _client = _OpenAI(base_url=llm_cfg["gateway_url"], api_key=api_key)
+        from openai import AsyncOpenAI
+        llm_cfg = cfg["llm"][backend]
+        if backend == "local":
+            client = AsyncOpenAI(base_url=llm_cfg["base_url"], api_key="not-needed", max_retries=0)
+        else:
+            api_key = os.environ.get(llm_cfg.get("api_key_env", ""), "")
+            client = AsyncOpenAI(base_url=llm_cfg["gateway_url"], api_key=api_key, max_retries=0)
+    clients[backend] = client
+    return client
+
+
+def _is_retryable(exc: Exception) -> bool:
+    """429 / 5xx / 連線錯誤才重試（anthropic 與 openai SDK 的例外都有 status_code）。"""
+    status = getattr(exc, "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    return type(exc).__name__ in {"APIConnectionError", "APITimeoutError"}
+
+
+async def _with_retry(make_call, cfg: dict):
+    """指數退避 + jitter 重試。config: llm.retry.max_attempts / base_delay / max_delay。"""
+    retry_cfg = cfg.get("llm", {}).get("retry", {})
+    max_attempts = retry_cfg.get("max_attempts", 5)
+    base_delay = retry_cfg.get("base_delay", 1.0)
+    max_delay = retry_cfg.get("max_delay", 30.0)
+
+    for attempt in range(max_attempts):
+        try:
+            return await make_call()
+        except Exception as e:
+            if attempt == max_attempts - 1 or not _is_retryable(e):
+                raise
+            # 有 Retry-After 就照辦（上限 max_delay）
+            retry_after = None
+            response = getattr(e, "response", None)
+            if response is not None:
+                try:
+                    retry_after = float(response.headers.get("retry-after", ""))
+                except (TypeError, ValueError):
+                    retry_after = None
+            if retry_after is None:
+                retry_after = min(max_delay, base_delay * 2 ** attempt) * (0.5 + random.random() / 2)
+            await asyncio.sleep(min(max_delay, retry_after))
+
+
+async def _anthropic_query(
+    prompt: str,
+    system: str | None,
+    cfg: dict,
+    tier: str,
+) -> str:
+    client = _get_async_client(cfg, "cloud")
+    kwargs = {
+        "model": _resolve_model(cfg, "cloud", tier),
+        "max_tokens": 4096,
+        "messages": [{"role": "user", "content": prompt}],
+    }
+    if system:
+        kwargs["system"] = system
 
-    return _client
+    resp = await _with_retry(lambda: client.messages.create(**kwargs), cfg)
+    return resp.content[0].text if resp.content else ""
 
 
-def _get_anthropic_client():
-    global _anthropic_client
-    if _anthropic_client is not None:
-        return _anthropic_client
+async def _openai_query(
+    prompt: str,
+    system: str | None,
+    cfg: dict,
+    tier: str,
+) -> str:
+    backend = cfg["engine"]["llm_backend"]
+    client = _get_async_client(cfg, backend)
+    messages = []
+    if system:
+        messages.append({"role": "system", "content": system})
+    messages.append({"role": "user", "content": prompt})
 
-    import anthropic
-    _anthropic_client = anthropic.Anthropic(
-        api_key=os.environ.get("ANTHROPIC_API_KEY", ""),
+    resp = await _with_retry(
+        lambda: client.chat.completions.create(
+            model=_resolve_model(cfg, backend, tier), messages=messages, temperature=0.3,
+        ),
+        cfg,
     )
-    return _anthropic_client
+    return resp.choices[0].message.content or ""
+
+
+async def _anthropic_stream(
+    prompt: str,
+    system: str | None,
+    cfg: dict,
+    tier: str,
+) -> AsyncIterator[str]:
+    client = _get_async_client(cfg, "cloud")
+    kwargs = {
+        "model": _resolve_model(cfg, "cloud", tier),
+        "max_tokens": 4096,
+        "messages": [{"role": "user", "content": prompt}],
+        "stream": True,
+    }
+    if system:
+        kwargs["system"] = system
 
+    # 只有建立連線會重試；開始吐 token 之後中斷就直接往上丟
+    stream = await _with_retry(lambda: client.messages.create(**kwargs), cfg)
+    async for event in stream:
+        if event.type == "content_block_delta":
+            text = getattr(event.delta, "text", None)
+            if text:
+                yield text
 
-def _call_anthropic(
+
+async def _openai_stream(
     prompt: str,
+    system: str | None,
+    cfg: dict,
+    tier: str,
+) -> AsyncIterator[str]:
+    backend = cfg["engine"]["llm_backend"]
+    client = _get_async_client(cfg, backend)
+    messages = []
+    if system:
+        messages.append({"role": "system", "content": system})
+    messages.append({"role": "user", "content": prompt})
+
+    stream = await _with_retry(
+        lambda: client.chat.completions.create(
+            model=_resolve_model(cfg, backend, tier), messages=messages, temperature=0.3, stream=True,
+        ),
+        cfg,
+    )
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+async def _api_batch(
+    prompts: list[str],
     system: str | None = None,
     config: dict | None = None,
+    max_concurrent: int = 5,
     tier: str = "heavy",
-) -> str:
-    """直接呼叫 Anthropic API。"""
+    return_exceptions: bool = False,
+) -> list[str | BaseException]:
+    """cloud / local backend 的並行批次：async client + Semaphore 控制並行數量。"""
     cfg = config or load_config()
-    cloud_cfg = cfg.get("llm", {}).get("cloud", {})
+    query_one = _anthropic_query if cfg["engine"]["llm_backend"] == "cloud" else _openai_query
+    semaphore = asyncio.Semaphore(max_concurrent)
 
-    # 三檔制 model mapping
-    model_map = {
-        "heavy": cloud_cfg.get("model_heavy", "claude-sonnet-4-5-20250929"),
-        "medium": cloud_cfg.get("model_medium", "claude-sonnet-4-5-20250929"),
-        "light": cloud_cfg.get("model_light", "claude-haiku-4-5-20251001"),
-    }
-    model = model_map.get(tier, model_map["heavy"])
+    async def _run_one(prompt: str) -> str:
+        async with semaphore:
+            return await query_one(prompt, system, cfg, tier)
 
-    client = _get_anthropic_client()
-    kwargs = {"model": model, "max_tokens": 4096, "messages": [{"role": "user", "content": prompt}]}
-    if system:
-        kwargs["system"] = system
-
-    resp = client.messages.create(**kwargs)
-    return resp.content[0].text if resp.content else ""
+    return await asyncio.gather(*[_run_one(p) for p in prompts], return_exceptions=return_exceptions)
 
 
 # ─── Claude Code backend (Agent SDK) ───
 
 
-def _get_event_loop() -> asyncio.AbstractEventLoop:
-    """取得或建立 event loop。"""
-    try:
-        loop = asyncio.get_running_loop()
-        return loop
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        return loop
-
-
-async def _claude_code_query(
+async def _claude_code_stream(
     prompt: str,
     system: str | None = None,
     config: dict | None = None,
     tier: str = "heavy",
-) -> str:
-    """用 Claude Agent SDK 的 query() 做單次 LLM 呼叫。
+) -> AsyncIterator[str]:
+    """用 Claude Agent SDK 的 query()，每收到一個 TextBlock 就 yield。
 
     tier: "light"=Haiku, "medium"=Sonnet, "heavy"=Opus。
     """
@@ -107,15 +238,7 @@ async def _claude_code_query(
     )
 
     cfg = config or load_config()
-    cc_cfg = cfg.get("llm", {}).get("claude_code", {})
-
-    # 三檔制：light=Haiku, medium=Sonnet, heavy=Opus
-    if tier == "light":
-        model = cc_cfg.get("model_light", "claude-haiku-4-5-20251001")
-    elif tier == "medium":
-        model = cc_cfg.get("model_medium", "claude-sonnet-4-5-20250929")
-    else:  # heavy
-        model = cc_cfg.get("model_heavy", "claude-opus-4-6")
+    model = _resolve_model(cfg, "claude_code", tier)
 
     full_prompt = f"{system}\n\n{prompt}" if system else prompt
 
@@ -127,14 +250,21 @@ async def _claude_code_query(
     if model:
         options.model = model
 
-    result_parts: list[str] = []
     async for msg in query(prompt=full_prompt, options=options):
         if isinstance(msg, AssistantMessage):
             for block in msg.content:
                 if isinstance(block, TextBlock):
-                    result_parts.append(block.text)
+                    yield block.text
 
-    return "".join(result_parts)
+
+async def _claude_code_query(
+    prompt: str,
+    system: str | None = None,
+    config: dict | None = None,
+    tier: str = "heavy",
+) -> str:
+    """用 Claude Agent SDK 的 query() 做單次 LLM 呼叫。"""
+    return "".join([part async for part in _claude_code_stream(prompt, system, config, tier)])
 
 
 async def _claude_code_batch(
@@ -143,7 +273,8 @@ async def _claude_code_batch(
     config: dict | None = None,
     max_concurrent: int = 5,
     tier: str = "heavy",
-) -> list[str]:
+    return_exceptions: bool = False,
+) -> list[str | BaseException]:
     """用多個並行的 Agent SDK query 處理批次 prompts。
 
     透過 asyncio.Semaphore 控制並行數量，避免資源耗盡。
@@ -155,76 +286,207 @@ async def _claude_code_batch(
             return await _claude_code_query(prompt, system=system, config=config, tier=tier)
 
     tasks = [_run_one(p) for p in prompts]
-    return await asyncio.gather(*tasks)
+    return await asyncio.gather(*tasks, return_exceptions=return_exceptions)
 
 
 # ─── 統一介面 ───
 
 
-def call_llm(
+def backend_max_concurrent(config: dict) -> int:
+    """目前 backend 的並行上限（llm.<backend>.max_concurrent）。"""
+    backend = config["engine"]["llm_backend"]
+    return config.get("llm", {}).get(backend, {}).get("max_concurrent", 5)
+
+
+def estimate_tokens(text: str) -> int:
+    """粗估 token 數：中文一字約 1 token（UTF-8 3 bytes），英文約 3~4 字元 1 token。"""
+    return len(text.encode("utf-8")) // 3 + 1
+
+
+async def _abatch_backend(
+    prompts: list[str],
+    system: str | None,
+    cfg: dict,
+    max_concurrent: int,
+    tier: str,
+    return_exceptions: bool = False,
+) -> list[str | BaseException]:
+    if cfg["engine"]["llm_backend"] == "claude_code":
+        return await _claude_code_batch(
+            prompts, system, cfg, max_concurrent, tier=tier, return_exceptions=return_exceptions,
+        )
+    return await _api_batch(prompts, system, cfg, max_concurrent, tier=tier, return_exceptions=return_exceptions)
+
+
+async def acall_llm(
     prompt: str,
     system: str | None = None,
     config: dict | None = None,
     tier: str = "heavy",
+    cache: bool = False,
 ) -> str:
-    """單次 LLM 呼叫。
+    """單次 LLM 呼叫（coroutine，在呼叫端的 event loop 上執行）。
 
     tier: "light"=Haiku（分類/填表）, "medium"=Sonnet（歸納/推理）, "heavy"=Opus（最終生成）。
+    cache: True 時讀寫 response cache（見 engine/llm_cache.py）。只給 extraction / 批次這類
+    可重現的呼叫用；面向使用者的生成不開，避免相同 prompt 重播同一段回應。
+    """
+    results = await abatch_llm([prompt], system=system, config=config, max_concurrent=1, tier=tier, cache=cache)
+    return results[0]
+
+
+async def abatch_llm(
+    prompts: list[str],
+    system: str | None = None,
+    config: dict | None = None,
+    max_concurrent: int | None = None,
+    tier: str = "heavy",
+    cache: bool = False,
+    return_exceptions: bool = False,
+) -> list[str | BaseException]:
+    """批次 LLM 呼叫（coroutine）。所有 backend 都以 max_concurrent 並行處理
+    （None = 目前 backend 的 llm.<backend>.max_concurrent）。
+
+    命中 response cache 的 prompt 直接回傳，只有 miss 的送 backend；空回應不寫入。
+    return_exceptions: True 時單一 prompt 失敗不中斷整批，該位置回傳 exception（不寫入 cache）。
+    """
+    cfg = config or load_config()
+    max_concurrent = max_concurrent or backend_max_concurrent(cfg)
+    store = get_cache(cfg) if cache else None
+    if store is None:
+        return await _abatch_backend(prompts, system, cfg, max_concurrent, tier, return_exceptions)
+
+    backend = cfg["engine"]["llm_backend"]
+    model = _resolve_model(cfg, backend, tier)
+    keys = [cache_key(backend, model, tier, system, p) for p in prompts]
+    hits = store.get_many(list(dict.fromkeys(keys)))
+
+    results = [hits.get(k) for k in keys]
+    # 同一批內重複的 prompt 只送一次
+    miss_keys = list(dict.fromkeys(k for k, r in zip(keys, results) if r is None))
+    if miss_keys:
+        prompt_by_key = dict(zip(keys, prompts))
+        fresh = await _abatch_backend(
+            [prompt_by_key[k] for k in miss_keys], system, cfg, max_concurrent, tier, return_exceptions,
+        )
+        store.put_many([(k, r, model, tier) for k, r in zip(miss_keys, fresh) if isinstance(r, str) and r])
+        fresh_by_key = dict(zip(miss_keys, fresh))
+        results = [r if r is not None else fresh_by_key[k] for k, r in zip(keys, results)]
+    return results
+
+
+def forget_cached(
+    prompts: list[str],
+    system: str | None = None,
+    config: dict | None = None,
+    tier: str = "heavy",
+) -> int:
+    """刪除 prompts 的快取回應，回傳刪除筆數。
+
+    cache=True 的呼叫端解析回應失敗、打算下次重跑時呼叫，否則重跑會拿到同一個壞回應。
+    """
+    cfg = config or load_config()
+    store = get_cache(cfg)
+    if store is None or not prompts:
+        return 0
+    backend = cfg["engine"]["llm_backend"]
+    model = _resolve_model(cfg, backend, tier)
+    return store.delete_many(list({cache_key(backend, model, tier, system, p) for p in prompts}))
+
+
+async def astream_llm(
+    prompt: str,
+    system: str | None = None,
+    config: dict | None = None,
+    tier: str = "heavy",
+    cache: bool = False,
+) -> AsyncIterator[str]:
+    """串流 LLM 呼叫（async generator），逐段 yield 文字。
+
+    cloud / local 是 token 級串流；claude_code 以 Agent SDK 回傳的 TextBlock 為單位。
+    命中 response cache 時整段一次 yield；完整串流結束後寫入 cache。
     """
     cfg = config or load_config()
     backend = cfg["engine"]["llm_backend"]
+    store = get_cache(cfg) if cache else None
+    key = None
+    if store is not None:
+        model = _resolve_model(cfg, backend, tier)
+        key = cache_key(backend, model, tier, system, prompt)
+        hit = store.get_many([key]).get(key)
+        if hit is not None:
+            yield hit
+            return
 
     if backend == "claude_code":
-        loop = _get_event_loop()
-        if loop.is_running():
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
-                future = pool.submit(asyncio.run, _claude_code_query(prompt, system, cfg, tier=tier))
-                return future.result()
-        else:
-            return loop.run_until_complete(_claude_code_query(prompt, system, cfg, tier=tier))
+        stream = _claude_code_stream(prompt, system, cfg, tier)
+    elif backend == "cloud":
+        stream = _anthropic_stream(prompt, system, cfg, tier)
+    else:
+        stream = _openai_stream(prompt, system, cfg, tier)
 
-    if backend == "cloud":
-        return _call_anthropic(prompt, system, cfg, tier=tier)
+    parts: list[str] = []
+    async for text in stream:
+        parts.append(text)
+        yield text
 
-    # OpenAI-compatible backends (local) — tier 不影響（本地模型只有一個）
-    client = _get_client(cfg)
-    model = cfg["llm"][backend]["model"]
+    if store is not None and parts:
+        store.put_many([(key, "".join(parts), model, tier)])
 
-    messages = []
-    if system:
-        messages.append({"role": "system", "content": system})
-    messages.append({"role": "user", "content": prompt})
 
-    resp = client.chat.completions.create(model=model, messages=messages, temperature=0.3)
-    return resp.choices[0].message.content or ""
+# ─── 同步 shim ───
+#
+# 同步呼叫端（CLI、daily batch、explorer…）共用一個長壽的背景 event loop，
+# 不再每次呼叫都開 ThreadPoolExecutor + asyncio.run；async client 也跟著重用。
 
+_sync_loop: asyncio.AbstractEventLoop | None = None
+_sync_loop_lock = threading.Lock()
 
-def batch_llm(
-    prompts: list[str],
+
+def _get_sync_loop() -> asyncio.AbstractEventLoop:
+    global _sync_loop
+    with _sync_loop_lock:
+        if _sync_loop is None or _sync_loop.is_closed():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="llm-sync-loop", daemon=True).start()
+            _sync_loop = loop
+        return _sync_loop
+
+
+def _run_sync(coro):
+    loop = _get_sync_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("不能在 LLM 背景 loop 內呼叫同步 call_llm / batch_llm，請改用 acall_llm / abatch_llm")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+def call_llm(
+    prompt: str,
     system: str | None = None,
     config: dict | None = None,
-    max_concurrent: int = 5,
     tier: str = "heavy",
-) -> list[str]:
-    """批次 LLM 呼叫。claude_code backend 會並行處理，其他 backend 循序。"""
-    cfg = config or load_config()
-    backend = cfg["engine"]["llm_backend"]
+    cache: bool = False,
+) -> str:
+    """acall_llm 的同步版本。"""
+    return _run_sync(acall_llm(prompt, system=system, config=config, tier=tier, cache=cache))
 
-    if backend == "claude_code":
-        loop = _get_event_loop()
-        if loop.is_running():
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
-                future = pool.submit(
-                    asyncio.run,
-                    _claude_code_batch(prompts, system, cfg, max_concurrent, tier=tier),
-                )
-                return future.result()
-        else:
-            return loop.run_until_complete(
-                _claude_code_batch(prompts, system, cfg, max_concurrent, tier=tier)
-            )
 
-    # cloud / local backends: 循序處理
-    return [call_llm(p, system=system, config=cfg, tier=tier) for p in prompts]
+def batch_llm(
+    prompts: list[str],
+    system: str | None = None,
+    config: dict | None = None,
+    max_concurrent: int | None = None,
+    tier: str = "heavy",
+    cache: bool = False,
+    return_exceptions: bool = False,
+) -> list[str | BaseException]:
+    """abatch_llm 的同步版本。"""
+    return _run_sync(abatch_llm(
+        prompts, system=system, config=config, max_concurrent=max_concurrent, tier=tier, cache=cache,
+        return_exceptions=return_exceptions,
+    ))
@@ -0,0 +1,160 @@
+"""LLM response cache — 持久化 LLM 回應（SQLite）
+
+key = sha256(backend, model, tier, system, prompt)。call_llm / batch_llm 傳 cache=True 時使用
+（預設關閉）：detect / extract / cluster / scan-identity / dedupe / contradiction scan
+重跑時相同 prompt 不再重新付費；query / generate / simulate 等面向使用者的生成不走快取。
+回應解析失敗的呼叫端要用 llm.forget_cached 刪掉該筆，否則重跑時會重播同一個壞回應。
+
+淘汰（config: llm.cache）：
+- max_age_days：超過天數的回應刪除
+- max_size_mb：總大小超過上限時，從最久沒被讀到的開始刪
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from engine.config import get_data_dir
+
+
+# 每寫入 N 筆做一次淘汰，避免每次 put 都掃表
+_EVICT_EVERY = 200
+
+
+class _LLMCache:
+    def __init__(self, path: Path, max_age_days: float, max_size_mb: float):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.max_age_sec = max_age_days * 86400
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.lock = threading.Lock()
+        self._writes = 0
+        # batch_llm 的 claude_code 路徑會在別的 thread 跑，共用連線靠 lock 保護
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, response TEXT NOT NULL, model TEXT, tier TEXT,"
+            " size INTEGER NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON responses(accessed_at)")
+        self.conn.commit()
+        self.evict()
+
+    def get_many(self, keys: list[str]) -> dict[str, str]:
+        if not keys:
+            return {}
+        now = time.time()
+        found: dict[str, str] = {}
+        with self.lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = self.conn.execute(
+                    f"SELECT key, response, created_at FROM responses WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for key, response, created_at in rows:
+                    if now - created_at <= self.max_age_sec:
+                        found[key] = response
+            if found:
+                self.conn.executemany(
+                    "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                    [(now, k) for k in found],
+                )
+                self.conn.commit()
+        return found
+
+    def put_many(self, entries: list[tuple[str, str, str, str]]) -> None:
+        """entries: [(key, response, model, tier), ...]"""
+        if not entries:
+            return
+        now = time.time()
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(k, r, m, t, len(r.encode("utf-8")), now, now) for k, r, m, t in entries],
+            )
+            self.conn.commit()
+            self._writes += len(entries)
+            if self._writes < _EVICT_EVERY:
+                return
+            self._writes = 0
+        self.evict()
+
+    def delete_many(self, keys: list[str]) -> int:
+        """刪除指定 key 的回應（呼叫端解析失敗時用），回傳刪除筆數。"""
+        if not keys:
+            return 0
+        removed = 0
+        with self.lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                cur = self.conn.execute(
+                    f"DELETE FROM responses WHERE key IN ({','.join('?' * len(chunk))})", chunk,
+                )
+                removed += cur.rowcount
+            self.conn.commit()
+        return removed
+
+    def evict(self) -> int:
+        """刪除過期與超出大小上限的回應，回傳刪除筆數。"""
+        with self.lock:
+            cur = self.conn.execute(
+                "DELETE FROM responses WHERE created_at < ?", (time.time() - self.max_age_sec,),
+            )
+            removed = cur.rowcount
+            cur = self.conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM ("
+                "  SELECT key, SUM(size) OVER (ORDER BY accessed_at DESC, key) AS running FROM responses"
+                " ) WHERE running > ?)",
+                (self.max_bytes,),
+            )
+            removed += cur.rowcount
+            self.conn.commit()
+        return removed
+
+    def stats(self) -> dict:
+        with self.lock:
+            count, size = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {"path": str(self.path), "entries": count, "size_mb": round(size / 1024 / 1024, 2)}
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+
+_caches: dict[str, _LLMCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(config: dict) -> _LLMCache | None:
+    """依 config 取得共用的 cache；llm.cache.enabled 為 false 時回傳 None。"""
+    cache_cfg = config.get("llm", {}).get("cache", {})
+    if not cache_cfg.get("enabled", True):
+        return None
+    raw = cache_cfg.get("path") or ""
+    path = Path(raw) if raw else get_data_dir(config) / "llm_cache.sqlite"
+    key = str(path.resolve())
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _LLMCache(
+                path,
+                max_age_days=cache_cfg.get("max_age_days", 30),
+                max_size_mb=cache_cfg.get("max_size_mb", 512),
+            )
+            _caches[key] = cache
+        return cache
+
+
+def cache_key(backend: str, model: str, tier: str, system: str | None, prompt: str) -> str:
+    payload = json.dumps([backend, model, tier, system or "", prompt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
@@ -2,10 +2,12 @@
 
 from __future__ import annotations
 
-from mcp.server.fastmcp import FastMCP
+import json
+
+from mcp.server.fastmcp import Context, FastMCP
 
 from engine.config import load_config
-from engine.query_engine import ask, query, generate, build_index
+from engine.query_engine import ask, astream_ask, query, generate, build_index
 from engine.signal_store import SignalStore
 from engine.conviction_detector import _load_convictions
 from engine.trace_extractor import _load_traces
@@ -54,6 +56,29 @@ def mind_spiral_generate(
     )
 
 
+@mcp.tool()
+async def mind_spiral_ask_stream(
+    owner_id: str,
+    text: str,
+    ctx: Context,
+    caller_id: str | None = None,
+) -> dict:
+    """統一入口（串流）— 同 mind_spiral_ask，但邊生成邊以 log notification 送出。
+
+    先送一則 context（命中框架、激活信念，JSON），接著逐段送出生成文字；
+    工具最後回傳與 mind_spiral_ask 相同的完整結果。
+    """
+    result: dict = {}
+    async for event, data in astream_ask(owner_id=owner_id, text=text, caller=caller_id, config=_config):
+        if event == "context":
+            await ctx.info(json.dumps({"context": data}, ensure_ascii=False))
+        elif event == "token":
+            await ctx.info(data)
+        else:
+            result = data
+    return result
+
+
 @mcp.tool()
 def mind_spiral_stats(owner_id: str) -> dict:
     """查看五層數據統計。"""
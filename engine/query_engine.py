@@ -9,24 +9,34 @@
 
 效能設計：
 - Frame/Trace/Conviction 的 embedding 預先建好索引（build_index）
-- 查詢時只算一次問題的 embedding，其餘用 ChromaDB 向量搜尋
-- 反射匹配命中時完全跳過 embedding 計算
-- 資料快取：同一 owner 的資料只載入一次，後續查詢直接用記憶體
+- 查詢時只算一次問題的 embedding；frames / convictions / traces 向量放進記憶體做 exact search，
+  ChromaDB 只當持久化來源
+- 反射匹配命中時跳過 frame 的向量查詢；frames / convictions / traces 三個 collection 併發查一次，
+  信心校準沿用同一批 distances
+- 資料快取：同一 owner 的資料只載入一次，後續查詢直接用記憶體；
+  generations.json 版本號變動時只重新載入有變的層；多 owner 以 LRU + TTL + 記憶體上限淘汰
 - ChromaDB client 單例化：同一 owner 共用一個 client
+- 查詢索引（trace_map、active frames、frame → traces、conviction → signal IDs）隨快取預先建好，
+  每次查詢只做 dict 查找
 """
 
 from __future__ import annotations
 
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from pathlib import Path
 
-import chromadb
-
+from engine.chroma_registry import get_client, get_collection
 from engine.config import get_owner_dir
-from engine.conviction_detector import _load_convictions
+from engine.conviction_detector import _load_conviction_embeddings, _load_convictions
 from engine.frame_clusterer import _load_frames
+from engine.generations import bump_generation, read_generations
 from engine.identity_scanner import _load_identity
-from engine.llm import call_llm
+from engine.llm import acall_llm, astream_llm, call_llm
 from engine.models import (
     ContextFrame,
     Conviction,
@@ -35,6 +45,8 @@ from engine.models import (
 )
 from engine.signal_store import SignalStore
 from engine.trace_extractor import _load_traces
+from engine.vector_index import load_vector_indexes
+from engine.workers import run_blocking
 
 
 @dataclass
@@ -51,6 +63,7 @@ class QueryContext:
     low_confidence: bool = False  # 信心校準：證據不足時為 True
     is_temporal: bool = False  # 時序查詢標記
     response: str = ""
+    timings: dict[str, float] = field(default_factory=dict)  # 各階段耗時（ms）
 
 
 # ─── 時序偵測 ───
@@ -66,34 +79,255 @@ def _is_temporal_query(question: str) -> bool:
 
 
 # ─── 快取 + 單例 ───
+#
+# 多 owner 的 LRU 快取（config: engine.query_cache）：
+# - max_owners：最多同時快取幾個 owner
+# - max_memory_mb：所有 owner 估計用量總和上限，超過時從最久沒查的開始釋放
+# - ttl_seconds：閒置超過就釋放（0 = 不過期）
+# 淘汰只丟掉快取 entry，不關閉共用的 ChromaDB client：被淘汰的 owner 可能還有請求
+# 拿著它的 collection handle（chromadb 關閉 client 後既有 handle 全部失效）。
+
+_cache: OrderedDict[str, dict] = OrderedDict()
+_cache_lock = threading.Lock()
+_evictions = 0
+
+# 各層的載入函式；key 與 generations.LAYERS 一致
+_LAYER_LOADERS = {
+    "frames": _load_frames,
+    "convictions": _load_convictions,
+    "traces": _load_traces,
+    "identities": _load_identity,
+}
+
+# 估計一層的用量時抽樣幾個物件做深度量測，再乘上總數
+_SIZE_SAMPLE = 32
+
+
+def _deep_sizeof(obj, seen: set[int]) -> int:
+    """粗略的遞迴 sys.getsizeof（pydantic model 走 __dict__）；seen 避免共用物件重複計算。"""
+    total = 0
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen:
+            continue
+        seen.add(id(o))
+        total += sys.getsizeof(o)
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+        elif hasattr(o, "__dict__"):
+            stack.append(o.__dict__)
+    return total
+
+
+def _layer_bytes(items: list) -> int:
+    if not items:
+        return sys.getsizeof(items)
+    step = max(1, len(items) // _SIZE_SAMPLE)
+    sample = items[::step][:_SIZE_SAMPLE]
+    seen: set[int] = set()
+    per_item = sum(_deep_sizeof(item, seen) for item in sample) / len(sample)
+    return sys.getsizeof(items) + int(per_item * len(items))
+
+
+def _index_bytes(index) -> int:
+    # 物件與 layer 共用，只算容器本身（dict / list / dict of lists）
+    total = sys.getsizeof(index)
+    values = index.values() if isinstance(index, dict) else index
+    return total + sum(sys.getsizeof(v) for v in values if isinstance(v, (list, tuple)))
+
+
+def _chroma_bytes(owner_dir: Path) -> int:
+    """HNSW segment 會整份載入記憶體，以磁碟上的 segment 檔案大小估計（不含 sqlite）。"""
+    chroma_dir = owner_dir / "chroma"
+    if not chroma_dir.exists():
+        return 0
+    return sum(f.stat().st_size for d in chroma_dir.iterdir() if d.is_dir() for f in d.iterdir() if f.is_file())
+
+
+# ─── 預先建好的查詢索引 ───
+#
+# 每次查詢只做 dict 查找，不再掃 traces / frames。索引跟著來源層一起重建：
+# - frames → active_frames / frame_map / frame_keywords
+# - traces → trace_map / traces_by_recency
+# - frames + traces → frame_traces（frame_id → historical_traces，traces.jsonl 順序）
+# - convictions → conviction_map / convictions_by_strength / conviction_signal_ids
+
+_INDEX_SOURCES = {
+    "active_frames": ("frames",),
+    "frame_map": ("frames",),
+    "frame_keywords": ("frames",),
+    "trace_map": ("traces",),
+    "traces_by_recency": ("traces",),
+    "frame_traces": ("frames", "traces"),
+    "conviction_map": ("convictions",),
+    "convictions_by_strength": ("convictions",),
+    "conviction_signal_ids": ("convictions",),
+}
+
+
+def _conviction_signal_ids(c: Conviction) -> list[str]:
+    """conviction 的原話佐證 signal IDs（每筆 evidence 取前 2 個）。"""
+    ev = c.resonance_evidence
+    signal_ids: list[str] = []
+    for source_list in [
+        ev.temporal_persistence or [],
+        ev.cross_context_consistency or [],
+        ev.input_output_convergence or [],
+        ev.spontaneous_mentions or [],
+        ev.action_alignment or [],
+    ]:
+        for item in source_list:
+            if hasattr(item, "signal_ids"):
+                signal_ids.extend(item.signal_ids[:2])
+    return signal_ids
+
+
+def _build_indexes(entry: dict, stale: list[str]) -> None:
+    """重建來源層有變動的索引（就地寫入 entry）。"""
+    rebuild = {name for name, sources in _INDEX_SOURCES.items() if any(s in stale for s in sources)}
+
+    if "active_frames" in rebuild:
+        active = [f for f in entry["frames"] if f.lifecycle and f.lifecycle.status == "active"]
+        entry["active_frames"] = active
+        entry["frame_map"] = {f.frame_id: f for f in active}
+        entry["frame_keywords"] = [
+            (f, [kw.lower() for tp in f.trigger_patterns if tp.keywords for kw in tp.keywords])
+            for f in active
+        ]
+    if "trace_map" in rebuild:
+        entry["trace_map"] = {t.trace_id: t for t in entry["traces"]}
+        entry["traces_by_recency"] = sorted(entry["traces"], key=lambda t: t.source.date, reverse=True)
+    if "frame_traces" in rebuild:
+        trace_frames: dict[str, list[str]] = {}
+        for f in entry["active_frames"]:
+            for tid in f.reasoning_patterns.historical_traces or []:
+                trace_frames.setdefault(tid, []).append(f.frame_id)
+        frame_traces: dict[str, list[ReasoningTrace]] = {}
+        for t in entry["traces"]:
+            for fid in trace_frames.get(t.trace_id, ()):
+                frame_traces.setdefault(fid, []).append(t)
+        entry["frame_traces"] = frame_traces
+    if "conviction_map" in rebuild:
+        entry["conviction_map"] = {c.conviction_id: c for c in entry["convictions"]}
+        entry["convictions_by_strength"] = sorted(entry["convictions"], key=lambda c: -c.strength.score)
+        entry["conviction_signal_ids"] = {
+            c.conviction_id: _conviction_signal_ids(c) for c in entry["convictions"]
+        }
 
-_cache: dict[str, dict] = {}
+    for name in rebuild:
+        entry["bytes"][name] = _index_bytes(entry[name])
 
 
-def _get_cached(owner_id: str, owner_dir: Path) -> dict:
-    """取得或建立該 owner 的快取（資料 + ChromaDB client）。"""
-    if owner_id not in _cache:
-        chroma_dir = owner_dir / "chroma"
-        _cache[owner_id] = {
-            "frames": _load_frames(owner_dir),
-            "convictions": _load_convictions(owner_dir),
-            "traces": _load_traces(owner_dir),
-            "identities": _load_identity(owner_dir),
-            "conviction_map": {},
-            "chroma": chromadb.PersistentClient(path=str(chroma_dir)),
-        }
-        _cache[owner_id]["conviction_map"] = {
-            c.conviction_id: c for c in _cache[owner_id]["convictions"]
+def _entry_bytes(entry: dict) -> int:
+    # ChromaDB segment 只列在 stats：client 不隨淘汰關閉，算進預算也釋放不了
+    return sum(v for k, v in entry["bytes"].items() if k != "chroma")
+
+
+def _evict_locked(cfg: dict, keep: str) -> None:
+    """依 TTL / 數量 / 記憶體上限淘汰 owner（呼叫端持有 _cache_lock）。"""
+    global _evictions
+    qc_cfg = cfg.get("engine", {}).get("query_cache", {})
+    max_owners = qc_cfg.get("max_owners", 64)
+    max_bytes = qc_cfg.get("max_memory_mb", 1024) * 1024 * 1024
+    ttl = qc_cfg.get("ttl_seconds", 3600)
+    now = time.monotonic()
+
+    victims = []
+    if ttl > 0:
+        victims = [oid for oid, e in _cache.items() if oid != keep and now - e["last_used"] > ttl]
+    total = sum(_entry_bytes(e) for oid, e in _cache.items() if oid not in victims)
+    count = len(_cache) - len(victims)
+    for oid, e in _cache.items():
+        if count <= max_owners and total <= max_bytes:
+            break
+        if oid == keep or oid in victims:
+            continue
+        victims.append(oid)
+        total -= _entry_bytes(e)
+        count -= 1
+
+    for oid in victims:
+        del _cache[oid]
+        _evictions += 1
+
+
+def _get_cached(owner_id: str, owner_dir: Path, cfg: dict) -> dict:
+    """取得或建立該 owner 的快取（資料 + ChromaDB client）。
+
+    每次呼叫比對 generations.json，別的 process（cron daily batch）寫過的層才重新載入。
+    有變動時建新的 dict 換上去，正在跑的查詢仍拿到一致的舊快照。
+    """
+    gens = read_generations(owner_dir)
+    with _cache_lock:
+        entry = _cache.get(owner_id)
+        if entry is not None:
+            _cache.move_to_end(owner_id)
+            entry["last_used"] = time.monotonic()
+            if entry["generations"] == gens:
+                return entry
+
+    if entry is None:
+        entry = {
+            "chroma": get_client(owner_dir),
+            "generations": {},
+            "bytes": {"chroma": _chroma_bytes(owner_dir)},
         }
-    return _cache[owner_id]
+    stale = [layer for layer in _LAYER_LOADERS if entry["generations"].get(layer) != gens[layer]]
+    entry = dict(entry)
+    entry["bytes"] = dict(entry["bytes"])
+    for layer in stale:
+        entry[layer] = _LAYER_LOADERS[layer](owner_dir)
+        entry["bytes"][layer] = _layer_bytes(entry[layer])
+    _build_indexes(entry, stale)
+    if entry["generations"].get("index") != gens["index"]:
+        # build_index 重建過 collection（或剛建立快取）→ 從 ChromaDB 重新載入向量
+        if cfg.get("engine", {}).get("query_cache", {}).get("vector_index", True):
+            entry["vectors"] = load_vector_indexes(owner_dir, owner_id)
+        else:
+            entry["vectors"] = None
+        entry["bytes"]["vectors"] = sum(v.nbytes for v in (entry["vectors"] or {}).values() if v is not None)
+    entry["generations"] = gens
+    entry["last_used"] = time.monotonic()
+
+    with _cache_lock:
+        _cache[owner_id] = entry
+        _cache.move_to_end(owner_id)
+        _evict_locked(cfg, keep=owner_id)
+    return entry
 
 
 def invalidate_cache(owner_id: str | None = None):
-    """清除快取。build_index / detect / cluster 後應呼叫。"""
-    if owner_id:
-        _cache.pop(owner_id, None)
-    else:
-        _cache.clear()
+    """清除資料快取（ChromaDB client 留在 registry）。build_index 後呼叫；資料層的變動由 generations 自動偵測。"""
+    with _cache_lock:
+        if owner_id:
+            _cache.pop(owner_id, None)
+        else:
+            _cache.clear()
+
+
+def cache_stats() -> dict:
+    """各 owner 的估計用量（bytes，分層）與閒置秒數。"""
+    now = time.monotonic()
+    with _cache_lock:
+        owners = {
+            oid: {
+                "bytes": dict(e["bytes"]),
+                "total_bytes": _entry_bytes(e),
+                "idle_seconds": round(now - e["last_used"], 1),
+            }
+            for oid, e in _cache.items()
+        }
+        evictions = _evictions
+    return {
+        "owners_cached": len(owners),
+        "total_bytes": sum(o["total_bytes"] for o in owners.values()),
+        "evictions": evictions,
+        "owners": owners,
+    }
 
 
 # ─── 索引管理 ───
@@ -107,18 +341,13 @@ def build_index(owner_id: str, config: dict) -> dict:
     """
     owner_dir = get_owner_dir(config, owner_id)
     store = SignalStore(config, owner_id)
-    chroma_dir = owner_dir / "chroma"
-    client = chromadb.PersistentClient(path=str(chroma_dir))
 
     stats = {"traces_indexed": 0, "frames_indexed": 0, "convictions_indexed": 0}
 
     # --- Trace 索引 ---
     traces = _load_traces(owner_dir)
     if traces:
-        col = client.get_or_create_collection(
-            name=f"{owner_id}_traces",
-            metadata={"hnsw:space": "cosine"},
-        )
+        col = get_collection(owner_dir, f"{owner_id}_traces", create=True)
         existing = col.get()
         if existing["ids"]:
             col.delete(ids=existing["ids"])
@@ -147,10 +376,7 @@ def build_index(owner_id: str, config: dict) -> dict:
     # --- Frame 索引 ---
     frames = _load_frames(owner_dir)
     if frames:
-        col = client.get_or_create_collection(
-            name=f"{owner_id}_frames",
-            metadata={"hnsw:space": "cosine"},
-        )
+        col = get_collection(owner_dir, f"{owner_id}_frames", create=True)
         existing = col.get()
         if existing["ids"]:
             col.delete(ids=existing["ids"])
@@ -174,10 +400,7 @@ def build_index(owner_id: str, config: dict) -> dict:
     # --- Conviction 索引 ---
     convictions = _load_convictions(owner_dir)
     if convictions:
-        col = client.get_or_create_collection(
-            name=f"{owner_id}_convictions",
-            metadata={"hnsw:space": "cosine"},
-        )
+        col = get_collection(owner_dir, f"{owner_id}_convictions", create=True)
         existing = col.get()
         if existing["ids"]:
             col.delete(ids=existing["ids"])
@@ -194,36 +417,97 @@ def build_index(owner_id: str, config: dict) -> dict:
                 "level": c.strength.level,
             })
 
-        embeddings = store._get_embedder().encode(
-            documents, normalize_embeddings=True,
-            show_progress_bar=len(documents) > 50,
-        ).tolist()
+        # 沿用 conviction embeddings 快取（與 detect / contradiction / dedupe 共用）
+        embeddings = _load_conviction_embeddings(store, convictions).tolist()
 
         col.add(ids=ids, documents=documents, embeddings=embeddings, metadatas=metadatas)
         stats["convictions_indexed"] = len(ids)
 
-    # 清除快取，下次查詢會重新載入
+    # 其他 process 的快取看 generations 的 "index" 重新載入向量；本 process 直接清掉
+    bump_generation(owner_dir, "index")
     invalidate_cache(owner_id)
 
     return stats
 
 
+# ─── 向量查詢 ───
+#
+# 每次查詢只對 frames / convictions / traces 各查一次，信心校準直接沿用這次拿到的 distances。
+# 預設走快取裡的 in-memory 索引（engine/vector_index.py）；關閉時三個 ChromaDB collection 併發查。
+
+_VECTOR_WORKERS = 16
+_vector_executor = ThreadPoolExecutor(max_workers=_VECTOR_WORKERS, thread_name_prefix="mind-spiral-vector")
+
+
+def _vector_lookups(
+    q_emb: list[float],
+    cached: dict,
+    owner_id: str,
+    n_results: dict[str, int],
+) -> dict[str, dict | None]:
+    """對多個 layer（frames / convictions / traces）取 top-k。
+
+    回傳 layer → ChromaDB query 形狀的結果；索引不存在或查詢失敗為 None。
+    """
+    vectors = cached["vectors"]
+    if vectors is not None:
+        return {
+            layer: vectors[layer].query(q_emb, n) if vectors.get(layer) is not None else None
+            for layer, n in n_results.items() if n > 0
+        }
+
+    client = cached["chroma"]
+
+    def _query(layer: str, n: int) -> dict | None:
+        try:
+            col = client.get_collection(name=f"{owner_id}_{layer}")
+            return col.query(query_embeddings=[q_emb], n_results=n)
+        except Exception:
+            return None
+
+    futures = {
+        layer: _vector_executor.submit(_query, layer, n)
+        for layer, n in n_results.items() if n > 0
+    }
+    return {layer: future.result() for layer, future in futures.items()}
+
+
+def _result_ids(results: dict | None) -> list[str]:
+    if results and results["ids"] and results["ids"][0]:
+        return results["ids"][0]
+    return []
+
+
+def _result_pairs(results: dict | None) -> list[tuple[str, float]]:
+    """[(id, distance), ...]；沒有 distances 時視為 1.0。"""
+    ids = _result_ids(results)
+    distances = results["distances"][0] if results and results.get("distances") else [1.0] * len(ids)
+    return list(zip(ids, distances))
+
+
+def _top_distance(results: dict | None) -> float | None:
+    if results and results.get("distances") and results["distances"][0]:
+        return results["distances"][0][0]
+    return None
+
+
 # ─── Frame Matching ───
 
 
-def _reflex_match(question: str, frames: list[ContextFrame]) -> ContextFrame | None:
-    """反射匹配：關鍵字直接命中 trigger_patterns → 跳過 embedding。"""
+def _reflex_match(
+    question: str,
+    frame_keywords: list[tuple[ContextFrame, list[str]]],
+) -> ContextFrame | None:
+    """反射匹配：關鍵字直接命中 trigger_patterns → 跳過 frame 的向量查詢。
+
+    frame_keywords 為快取裡預先轉小寫的 (frame, keywords)。
+    """
     question_lower = question.lower()
     best_frame: ContextFrame | None = None
     best_hits = 0
 
-    for frame in frames:
-        hits = 0
-        for tp in frame.trigger_patterns:
-            if tp.keywords:
-                for kw in tp.keywords:
-                    if kw.lower() in question_lower:
-                        hits += 1
+    for frame, keywords in frame_keywords:
+        hits = sum(1 for kw in keywords if kw in question_lower)
         if hits > best_hits:
             best_hits = hits
             best_frame = frame
@@ -232,29 +516,18 @@ def _reflex_match(question: str, frames: list[ContextFrame]) -> ContextFrame | N
 
 
 def _embedding_match_frame(
-    question: str,
-    frames: list[ContextFrame],
-    q_emb: list[float],
-    client: chromadb.ClientAPI,
-    owner_id: str,
+    results: dict | None,
+    frame_map: dict[str, ContextFrame],
 ) -> ContextFrame | None:
-    """用 ChromaDB 索引匹配 frame。共用 q_emb 和 client。"""
-    if not frames:
+    """用 frames collection 的 top-1 匹配 frame（只回傳 active frame）。"""
+    ids = _result_ids(results)
+    if not ids:
         return None
-
-    frame_map = {f.frame_id: f for f in frames}
-
-    try:
-        col = client.get_collection(name=f"{owner_id}_frames")
-        results = col.query(query_embeddings=[q_emb], n_results=1)
-        if results["ids"] and results["ids"][0]:
-            best_id = results["ids"][0][0]
-            distance = results["distances"][0][0] if results.get("distances") else 1.0
-            if distance < 0.7 and best_id in frame_map:
-                return frame_map[best_id]
-    except Exception:
-        pass
-
+    distance = _top_distance(results)
+    if distance is None:
+        distance = 1.0
+    if distance < 0.7 and ids[0] in frame_map:
+        return frame_map[ids[0]]
     return None
 
 
@@ -262,92 +535,59 @@ def _embedding_match_frame(
 
 
 def _find_relevant_convictions(
-    q_emb: list[float],
-    client: chromadb.ClientAPI,
-    owner_id: str,
+    results: dict | None,
     conviction_map: dict[str, Conviction],
+    convictions_by_strength: list[Conviction],
     limit: int = 5,
 ) -> list[Conviction]:
-    """用 ChromaDB 索引找跟問題最相關的 convictions。"""
-    try:
-        col = client.get_collection(name=f"{owner_id}_convictions")
-        results = col.query(query_embeddings=[q_emb], n_results=limit)
-        if results["ids"] and results["ids"][0]:
-            found = []
-            for cid in results["ids"][0]:
-                if cid in conviction_map:
-                    found.append(conviction_map[cid])
-            if found:
-                return found
-    except Exception:
-        pass
+    """從 convictions collection 的查詢結果取最相關的 convictions。"""
+    found = [conviction_map[cid] for cid in _result_ids(results) if cid in conviction_map]
+    if found:
+        return found
 
     # Fallback: strength 最高的（索引不存在時）
-    sorted_convictions = sorted(conviction_map.values(), key=lambda c: -c.strength.score)
-    return sorted_convictions[:limit]
+    return convictions_by_strength[:limit]
 
 
 # ─── Trace Retrieval ───
 
 
 def _find_relevant_traces(
-    q_emb: list[float],
+    results: dict | None,
     frame: ContextFrame | None,
-    client: chromadb.ClientAPI,
-    owner_id: str,
     trace_map: dict[str, ReasoningTrace],
+    frame_traces: dict[str, list[ReasoningTrace]],
+    traces_by_recency: list[ReasoningTrace],
     limit: int = 5,
 ) -> list[ReasoningTrace]:
-    """用 ChromaDB 索引找相關 traces。共用 q_emb 和 client。"""
+    """從 traces collection 的查詢結果取相關 traces。"""
+    historical = frame_traces.get(frame.frame_id, []) if frame else []
     # 如果有 frame 且 historical_traces 夠多，直接用
-    if frame and frame.reasoning_patterns.historical_traces:
-        frame_trace_ids = set(frame.reasoning_patterns.historical_traces)
-        frame_traces = [t for tid, t in trace_map.items() if tid in frame_trace_ids]
-        if len(frame_traces) >= limit:
-            return frame_traces[:limit]
+    if len(historical) >= limit:
+        return historical[:limit]
 
-    try:
-        col = client.get_collection(name=f"{owner_id}_traces")
-        results = col.query(query_embeddings=[q_emb], n_results=limit)
-        if results["ids"] and results["ids"][0]:
-            found = []
-            for tid in results["ids"][0]:
-                if tid in trace_map:
-                    found.append(trace_map[tid])
-            if found:
-                return found
-    except Exception:
-        pass
+    found = [trace_map[tid] for tid in _result_ids(results) if tid in trace_map]
+    if found:
+        return found
 
     # Fallback: frame 的 historical_traces
-    if frame and frame.reasoning_patterns.historical_traces:
-        frame_trace_ids = set(frame.reasoning_patterns.historical_traces)
-        return [t for tid, t in trace_map.items() if tid in frame_trace_ids][:limit]
+    if historical:
+        return historical[:limit]
 
     # 最後 fallback: 按日期取最近的
-    sorted_traces = sorted(trace_map.values(), key=lambda t: t.source.date, reverse=True)
-    return sorted_traces[:limit]
+    return traces_by_recency[:limit]
 
 
 def _find_temporal_traces(
-    q_emb: list[float],
-    client: chromadb.ClientAPI,
-    owner_id: str,
+    results: dict | None,
     trace_map: dict[str, ReasoningTrace],
     limit: int = 6,
 ) -> list[ReasoningTrace]:
-    """時序查詢：取相關 traces 後按時間分散，讓 LLM 看到變化軌跡。"""
-    # 先用向量搜尋拿較多候選
-    candidates = []
-    try:
-        col = client.get_collection(name=f"{owner_id}_traces")
-        results = col.query(query_embeddings=[q_emb], n_results=min(limit * 3, len(trace_map)))
-        if results["ids"] and results["ids"][0]:
-            for tid in results["ids"][0]:
-                if tid in trace_map:
-                    candidates.append(trace_map[tid])
-    except Exception:
+    """時序查詢：取相關 traces（查詢時多拿 limit * 3 個候選）後按時間分散，讓 LLM 看到變化軌跡。"""
+    if results is None:
         candidates = list(trace_map.values())
+    else:
+        candidates = [trace_map[tid] for tid in _result_ids(results) if tid in trace_map]
 
     if not candidates:
         return []
@@ -372,23 +612,14 @@ def _find_temporal_traces(
 
 def _collect_raw_signals(
     convictions: list[Conviction],
+    conviction_signal_ids: dict[str, list[str]],
     store: SignalStore,
     max_signals: int = 6,
 ) -> list[str]:
     """從被激活的 convictions 回溯原始 signal 文本。用 ChromaDB get by ID，不做 vector search。"""
     signal_ids: list[str] = []
     for c in convictions:
-        ev = c.resonance_evidence
-        for source_list in [
-            ev.temporal_persistence or [],
-            ev.cross_context_consistency or [],
-            ev.input_output_convergence or [],
-            ev.spontaneous_mentions or [],
-            ev.action_alignment or [],
-        ]:
-            for item in source_list:
-                if hasattr(item, "signal_ids"):
-                    signal_ids.extend(item.signal_ids[:2])
+        signal_ids.extend(conviction_signal_ids.get(c.conviction_id, ()))
         if len(signal_ids) >= max_signals * 2:
             break
 
@@ -417,22 +648,17 @@ def _collect_raw_signals(
 
 
 def _check_low_confidence(
-    q_emb: list[float],
-    client: chromadb.ClientAPI,
-    owner_id: str,
+    lookups: dict[str, dict | None],
     distance_threshold: float = 0.8,
 ) -> bool:
-    """檢查最相關的 conviction 和 trace 是否都離問題太遠。"""
-    try:
-        for col_name in [f"{owner_id}_convictions", f"{owner_id}_traces"]:
-            col = client.get_collection(name=col_name)
-            results = col.query(query_embeddings=[q_emb], n_results=1)
-            if results["distances"] and results["distances"][0]:
-                if results["distances"][0][0] < distance_threshold:
-                    return False  # 至少有一個夠近
-        return True  # 全部都太遠
-    except Exception:
-        return False  # 索引不存在時不標記
+    """檢查最相關的 conviction 和 trace 是否都離問題太遠（沿用檢索時的 distances）。"""
+    for layer in ("convictions", "traces"):
+        if lookups.get(layer) is None:
+            return False  # 索引不存在時不標記
+        distance = _top_distance(lookups[layer])
+        if distance is not None and distance < distance_threshold:
+            return False  # 至少有一個夠近
+    return True  # 全部都太遠
 
 
 # ─── Response Generation ───
@@ -648,73 +874,105 @@ def _run_five_layer_pipeline(
     conviction_limit: int = 5,
     trace_limit: int = 5,
 ) -> QueryContext:
-    """共用的五層感知 pipeline，query 和 generate 都走這裡。"""
+    """共用的五層感知 pipeline，query 和 generate 都走這裡。
+
+    各階段耗時（ms）記在 ctx.timings。
+    """
+    t_start = time.perf_counter()
     owner_dir = get_owner_dir(cfg, owner_id)
     store = SignalStore(cfg, owner_id)
-    cached = _get_cached(owner_id, owner_dir)
+    cached = _get_cached(owner_id, owner_dir, cfg)
+    trace_map = cached["trace_map"]
 
     ctx = QueryContext(question=question, caller=caller)
+    t_mark = time.perf_counter()
+    ctx.timings["cache_ms"] = (t_mark - t_start) * 1000
 
-    frames = cached["frames"]
-    active_frames = [f for f in frames if f.lifecycle and f.lifecycle.status == "active"]
-    conviction_map = cached["conviction_map"]
-    trace_map = {t.trace_id: t for t in cached["traces"]}
-    client = cached["chroma"]
-
-    # Step 1: Frame Matching（反射優先，命中則跳過 embedding）
-    matched = _reflex_match(question, active_frames)
+    # Step 1a: 反射匹配（命中則不查 frames collection）
+    matched = _reflex_match(question, cached["frame_keywords"])
     if matched:
         ctx.matched_frame = matched
         ctx.match_method = "reflex"
 
-    # 只算一次 embedding，反射命中時不算
-    q_emb = None
+    q_emb = store.compute_embedding(question)
+    ctx.timings["embed_ms"] = (time.perf_counter() - t_mark) * 1000
+    t_mark = time.perf_counter()
+
+    # 三個 collection 一次併發查完；convictions / traces 的 top-1 distance 同時用於信心校準
+    ctx.is_temporal = _is_temporal_query(question)
+    n_traces = min(trace_limit * 3, len(trace_map)) if ctx.is_temporal else trace_limit
+    lookups = _vector_lookups(q_emb, cached, owner_id, {
+        "frames": 0 if ctx.matched_frame or not cached["frame_map"] else 1,
+        "convictions": conviction_limit,
+        "traces": n_traces,
+    })
+    ctx.timings["vector_ms"] = (time.perf_counter() - t_mark) * 1000
+    t_mark = time.perf_counter()
+
+    # Step 1b: Embedding 匹配 frame
     if not ctx.matched_frame:
-        q_emb = store.compute_embedding(question)
-        matched = _embedding_match_frame(question, active_frames, q_emb, client, owner_id)
+        matched = _embedding_match_frame(lookups.get("frames"), cached["frame_map"])
         if matched:
             ctx.matched_frame = matched
             ctx.match_method = "embedding"
 
-    # Step 2: Conviction Activation（向量搜尋取代 top-strength）
+    # Step 2: Conviction Activation（frame 的 primary convictions 優先，否則用向量搜尋結果）
+    conviction_map = cached["conviction_map"]
     if ctx.matched_frame:
         for ca in ctx.matched_frame.conviction_profile.primary_convictions:
             conv = conviction_map.get(ca.conviction_id)
             if conv:
                 ctx.activated_convictions.append(conv)
     if not ctx.activated_convictions:
-        # frame 沒激活到 conviction 或沒命中 frame → 用向量搜尋
-        if q_emb is None:
-            q_emb = store.compute_embedding(question)
         ctx.activated_convictions = _find_relevant_convictions(
-            q_emb, client, owner_id, conviction_map, limit=conviction_limit,
+            lookups.get("convictions"), conviction_map, cached["convictions_by_strength"],
+            limit=conviction_limit,
         )
 
     # Step 3: Trace Retrieval（時序查詢走不同路徑）
-    if q_emb is None:
-        q_emb = store.compute_embedding(question)
-    ctx.is_temporal = _is_temporal_query(question)
     if ctx.is_temporal:
-        ctx.relevant_traces = _find_temporal_traces(
-            q_emb, client, owner_id, trace_map, limit=trace_limit,
-        )
+        ctx.relevant_traces = _find_temporal_traces(lookups.get("traces"), trace_map, limit=trace_limit)
     else:
         ctx.relevant_traces = _find_relevant_traces(
-            q_emb, ctx.matched_frame, client, owner_id, trace_map, limit=trace_limit,
+            lookups.get("traces"), ctx.matched_frame, trace_map,
+            cached["frame_traces"], cached["traces_by_recency"], limit=trace_limit,
         )
 
     # Step 4: Identity Check
     ctx.identity_constraints = cached["identities"]
 
     # Step 5: Signal 回溯（從 conviction 拿原話佐證）
-    ctx.raw_signals = _collect_raw_signals(ctx.activated_convictions, store)
+    ctx.raw_signals = _collect_raw_signals(
+        ctx.activated_convictions, cached["conviction_signal_ids"], store,
+    )
+    ctx.timings["signals_ms"] = (time.perf_counter() - t_mark) * 1000
 
-    # Step 6: 信心校準（檢查匹配品質）
-    ctx.low_confidence = _check_low_confidence(q_emb, client, owner_id)
+    # Step 6: 信心校準（沿用 Step 2/3 查到的 distances）
+    ctx.low_confidence = _check_low_confidence(lookups)
 
+    ctx.timings["retrieval_ms"] = (time.perf_counter() - t_start) * 1000
+    ctx.timings = {k: round(v, 1) for k, v in ctx.timings.items()}
     return ctx
 
 
+def _prepare_query(owner_id: str, question: str, caller: str | None, cfg: dict) -> tuple[QueryContext, str]:
+    ctx = _run_five_layer_pipeline(owner_id, question, caller, cfg,
+                                    conviction_limit=5, trace_limit=5)
+    return ctx, _build_response_prompt(ctx)
+
+
+def _query_result(ctx: QueryContext) -> dict:
+    return {
+        "response": ctx.response,
+        "matched_frame": ctx.matched_frame.name if ctx.matched_frame else None,
+        "match_method": ctx.match_method,
+        "activated_convictions": [c.statement for c in ctx.activated_convictions],
+        "relevant_traces": len(ctx.relevant_traces),
+        "identity_constraints": [i.core_belief for i in ctx.identity_constraints],
+        "timings": ctx.timings,
+    }
+
+
 def query(
     owner_id: str,
     question: str,
@@ -725,21 +983,30 @@ def query(
     from engine.config import load_config
     cfg = config or load_config()
 
-    ctx = _run_five_layer_pipeline(owner_id, question, caller, cfg,
-                                    conviction_limit=5, trace_limit=5)
+    ctx, prompt = _prepare_query(owner_id, question, caller, cfg)
 
     # Step 5: Response Generation（五層 context 已精準，Sonnet 足夠）
-    prompt = _build_response_prompt(ctx)
+    t_llm = time.perf_counter()
     ctx.response = call_llm(prompt, config=cfg, tier="medium")
+    ctx.timings["llm_ms"] = round((time.perf_counter() - t_llm) * 1000, 1)
+    return _query_result(ctx)
 
-    return {
-        "response": ctx.response,
-        "matched_frame": ctx.matched_frame.name if ctx.matched_frame else None,
-        "match_method": ctx.match_method,
-        "activated_convictions": [c.statement for c in ctx.activated_convictions],
-        "relevant_traces": len(ctx.relevant_traces),
-        "identity_constraints": [i.core_belief for i in ctx.identity_constraints],
-    }
+
+async def aquery(
+    owner_id: str,
+    question: str,
+    caller: str | None = None,
+    config: dict | None = None,
+) -> dict:
+    """query 的 async 版本：檢索在 worker pool 跑，LLM 直接在呼叫端的 loop 上 await。"""
+    from engine.config import load_config
+    cfg = config or load_config()
+
+    ctx, prompt = await run_blocking(_prepare_query, owner_id, question, caller, cfg)
+    t_llm = time.perf_counter()
+    ctx.response = await acall_llm(prompt, config=cfg, tier="medium")
+    ctx.timings["llm_ms"] = round((time.perf_counter() - t_llm) * 1000, 1)
+    return _query_result(ctx)
 
 
 def _classify_intent(text: str) -> dict:
@@ -783,6 +1050,54 @@ def ask(
         return result
 
 
+async def aask(
+    owner_id: str,
+    text: str,
+    caller: str | None = None,
+    config: dict | None = None,
+) -> dict:
+    """ask 的 async 版本。"""
+    intent = _classify_intent(text)
+
+    if intent["mode"] == "generate":
+        result = await agenerate(owner_id, text, output_type=intent["output_type"],
+                                 caller=caller, config=config)
+        result["mode"] = "generate"
+        return result
+    else:
+        result = await aquery(owner_id, text, caller=caller, config=config)
+        result["mode"] = "query"
+        return result
+
+
+def _prepare_generation(
+    owner_id: str,
+    task: str,
+    output_type: str,
+    extra_instructions: str,
+    caller: str | None,
+    cfg: dict,
+) -> tuple[QueryContext, str]:
+    ctx = _run_five_layer_pipeline(owner_id, task, caller, cfg,
+                                    conviction_limit=7, trace_limit=8)
+    prompt = _build_generation_prompt(ctx, output_type, extra_instructions,
+                                     owner_id=owner_id, config=cfg)
+    return ctx, prompt
+
+
+def _generation_result(ctx: QueryContext, output_type: str) -> dict:
+    return {
+        "content": ctx.response,
+        "output_type": output_type,
+        "matched_frame": ctx.matched_frame.name if ctx.matched_frame else None,
+        "match_method": ctx.match_method,
+        "activated_convictions": [c.statement for c in ctx.activated_convictions],
+        "relevant_traces": len(ctx.relevant_traces),
+        "identity_constraints": [i.core_belief for i in ctx.identity_constraints],
+        "timings": ctx.timings,
+    }
+
+
 def generate(
     owner_id: str,
     task: str,
@@ -798,25 +1113,120 @@ def generate(
     from engine.config import load_config
     cfg = config or load_config()
 
-    ctx = _run_five_layer_pipeline(owner_id, task, caller, cfg,
-                                    conviction_limit=7, trace_limit=8)
+    ctx, prompt = _prepare_generation(owner_id, task, output_type, extra_instructions, caller, cfg)
 
     # Step 5: Generation（五層 context 已精準，Sonnet 足夠）
-    prompt = _build_generation_prompt(ctx, output_type, extra_instructions,
-                                     owner_id=owner_id, config=cfg)
+    t_llm = time.perf_counter()
     ctx.response = call_llm(prompt, config=cfg, tier="medium")
+    ctx.timings["llm_ms"] = round((time.perf_counter() - t_llm) * 1000, 1)
+    return _generation_result(ctx, output_type)
+
+
+async def agenerate(
+    owner_id: str,
+    task: str,
+    output_type: str = "article",
+    extra_instructions: str = "",
+    caller: str | None = None,
+    config: dict | None = None,
+) -> dict:
+    """generate 的 async 版本：檢索在 worker pool 跑，LLM 直接 await。"""
+    from engine.config import load_config
+    cfg = config or load_config()
+
+    ctx, prompt = await run_blocking(
+        _prepare_generation, owner_id, task, output_type, extra_instructions, caller, cfg,
+    )
+    t_llm = time.perf_counter()
+    ctx.response = await acall_llm(prompt, config=cfg, tier="medium")
+    ctx.timings["llm_ms"] = round((time.perf_counter() - t_llm) * 1000, 1)
+    return _generation_result(ctx, output_type)
+
 
+# ─── Streaming ───
+#
+# astream_* 是 async generator，依序 yield (event, data)：
+#   ("context", {...})  檢索完成就送出（命中框架、激活信念…），不等 LLM
+#   ("token", str)      LLM 逐段輸出
+#   ("done", {...})     與非串流版本相同的完整結果
+
+
+def _context_event(ctx: QueryContext, **extra) -> dict:
     return {
-        "content": ctx.response,
-        "output_type": output_type,
+        **extra,
         "matched_frame": ctx.matched_frame.name if ctx.matched_frame else None,
         "match_method": ctx.match_method,
         "activated_convictions": [c.statement for c in ctx.activated_convictions],
         "relevant_traces": len(ctx.relevant_traces),
         "identity_constraints": [i.core_belief for i in ctx.identity_constraints],
+        "timings": dict(ctx.timings),
     }
 
 
+async def _stream_response(ctx: QueryContext, prompt: str, cfg: dict):
+    parts: list[str] = []
+    t_llm = time.perf_counter()
+    async for text in astream_llm(prompt, config=cfg, tier="medium"):
+        parts.append(text)
+        yield "token", text
+    ctx.response = "".join(parts)
+    ctx.timings["llm_ms"] = round((time.perf_counter() - t_llm) * 1000, 1)
+
+
+async def astream_query(
+    owner_id: str,
+    question: str,
+    caller: str | None = None,
+    config: dict | None = None,
+    **extra,
+):
+    """query 的串流版本。"""
+    from engine.config import load_config
+    cfg = config or load_config()
+
+    ctx, prompt = await run_blocking(_prepare_query, owner_id, question, caller, cfg)
+    yield "context", _context_event(ctx, **extra)
+    async for event in _stream_response(ctx, prompt, cfg):
+        yield event
+    yield "done", {**_query_result(ctx), **extra}
+
+
+async def astream_generate(
+    owner_id: str,
+    task: str,
+    output_type: str = "article",
+    extra_instructions: str = "",
+    caller: str | None = None,
+    config: dict | None = None,
+    **extra,
+):
+    """generate 的串流版本。"""
+    from engine.config import load_config
+    cfg = config or load_config()
+
+    ctx, prompt = await run_blocking(
+        _prepare_generation, owner_id, task, output_type, extra_instructions, caller, cfg,
+    )
+    yield "context", _context_event(ctx, output_type=output_type, **extra)
+    async for event in _stream_response(ctx, prompt, cfg):
+        yield event
+    yield "done", {**_generation_result(ctx, output_type), **extra}
+
+
+def astream_ask(
+    owner_id: str,
+    text: str,
+    caller: str | None = None,
+    config: dict | None = None,
+):
+    """ask 的串流版本，context / done 事件帶 mode。"""
+    intent = _classify_intent(text)
+    if intent["mode"] == "generate":
+        return astream_generate(owner_id, text, output_type=intent["output_type"],
+                                caller=caller, config=config, mode="generate")
+    return astream_query(owner_id, text, caller=caller, config=config, mode="query")
+
+
 def context(
     owner_id: str,
     question: str,
@@ -876,4 +1286,5 @@ def context(
         "writing_style": writing_style,
         "low_confidence": ctx.low_confidence,
         "is_temporal": ctx.is_temporal,
+        "timings": ctx.timings,
     }
@@ -3,11 +3,11 @@
 from __future__ import annotations
 
 import json
+import threading
 from collections import Counter
 from pathlib import Path
 
-import chromadb
-
+from engine.chroma_registry import get_client, get_collection
 from engine.config import get_owner_dir
 from engine.models import Signal
 
@@ -15,18 +15,170 @@ from engine.models import Signal
 _global_embedder = None
 
 
+def _embedding_model_name(config: dict) -> str:
+    model_name = config.get("llm", {}).get("local", {}).get("embedding_model", "BAAI/bge-m3")
+    if "/" not in model_name:
+        model_name = f"BAAI/{model_name}"
+    return model_name
+
+
 def _get_global_embedder(config: dict):
     """全域 singleton embedder，避免每次請求重新載入模型（~16s）。"""
     global _global_embedder
     if _global_embedder is None:
         from sentence_transformers import SentenceTransformer
-        model_name = config.get("llm", {}).get("local", {}).get("embedding_model", "BAAI/bge-m3")
-        if "/" not in model_name:
-            model_name = f"BAAI/{model_name}"
-        _global_embedder = SentenceTransformer(model_name)
+        _global_embedder = SentenceTransformer(_embedding_model_name(config))
     return _global_embedder
 
 
+# ─── signals.jsonl byte offset 索引 ───
+
+_OFFSET_INDEX_FILENAME = "signals.idx"
+
+
+class _SignalOffsetIndex:
+    """signals.jsonl 的 sidecar 索引：signal_id → (byte offset, length)。
+
+    同時是 ingest 去重用的 signal ID 集合（精確，不需另外維護 Bloom filter）。
+
+    檔案格式：每行 `signal_id\toffset\tlength`，只 append 不覆寫。
+    `covered` 記錄索引已涵蓋到 signals.jsonl 的第幾個 byte：
+    - signals.jsonl 變長（外部直接 append）→ 只補掃尾端
+    - signals.jsonl 變短（被覆寫）→ 整份重建
+    讀取時若 offset 指到的不是該 signal（檔案被改寫但長度沒變），也會自動重建。
+    """
+
+    def __init__(self, signals_path: Path):
+        self.signals_path = signals_path
+        self.index_path = signals_path.with_name(_OFFSET_INDEX_FILENAME)
+        self.offsets: dict[str, tuple[int, int]] = {}
+        self.covered = 0
+        self.lock = threading.RLock()
+        self._load()
+
+    def __contains__(self, signal_id: str) -> bool:
+        return signal_id in self.offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def _load(self) -> None:
+        if not self.index_path.exists():
+            return
+        with open(self.index_path) as f:
+            for line in f:
+                parts = line.rstrip("\n").split("\t")
+                if len(parts) != 3:
+                    continue  # 寫到一半的行
+                try:
+                    offset, length = int(parts[1]), int(parts[2])
+                except ValueError:
+                    continue
+                self.offsets[parts[0]] = (offset, length)
+                self.covered = max(self.covered, offset + length)
+
+    def _append(self, entries: list[tuple[str, int, int]]) -> None:
+        if not entries:
+            return
+        with open(self.index_path, "a") as f:
+            for sid, offset, length in entries:
+                f.write(f"{sid}\t{offset}\t{length}\n")
+
+    def _scan_from(self, start: int) -> None:
+        """從 signals.jsonl 的 start byte 開始掃描，補上缺少的索引。"""
+        added: list[tuple[str, int, int]] = []
+        pos = start
+        with open(self.signals_path, "rb") as f:
+            f.seek(start)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # 寫到一半的行，下次再補
+                if raw.strip():
+                    try:
+                        sid = json.loads(raw).get("signal_id")
+                    except json.JSONDecodeError:
+                        sid = None
+                    if sid:
+                        self.offsets[sid] = (pos, len(raw))
+                        added.append((sid, pos, len(raw)))
+                pos += len(raw)
+        self.covered = pos
+        self._append(added)
+
+    def sync(self) -> None:
+        """確認索引涵蓋整個 signals.jsonl。"""
+        with self.lock:
+            size = self.signals_path.stat().st_size if self.signals_path.exists() else 0
+            if size < self.covered:
+                self.rebuild()
+            elif size > self.covered:
+                self._scan_from(self.covered)
+
+    def rebuild(self) -> None:
+        """丟掉既有索引，從頭掃描 signals.jsonl 重建。"""
+        with self.lock:
+            self.offsets = {}
+            self.covered = 0
+            self.index_path.unlink(missing_ok=True)
+            if self.signals_path.exists():
+                self._scan_from(0)
+
+    def add(self, entries: list[tuple[str, int, int]]) -> None:
+        """ingest append 後登記新寫入的 signals。"""
+        with self.lock:
+            for sid, offset, length in entries:
+                self.offsets[sid] = (offset, length)
+                self.covered = max(self.covered, offset + length)
+            self._append(entries)
+
+    def read(self, ids: list[str], _retried: bool = False) -> list[Signal]:
+        """依 offset 直接 seek 讀取，回傳順序同 signals.jsonl（與全檔掃描一致）。
+
+        offset 指到的不是完整的該 signal（檔案被改寫過）時重建索引重讀一次；
+        重建後仍對不上就是 signals.jsonl 本身壞了，直接拋出。
+        """
+        self.sync()
+        with self.lock:
+            located = sorted(
+                (self.offsets[sid], sid) for sid in set(ids) if sid in self.offsets
+            )
+        if not located:
+            return []
+
+        signals = []
+        with open(self.signals_path, "rb") as f:
+            for (offset, length), sid in located:
+                f.seek(offset)
+                raw = f.read(length)
+                try:
+                    obj = json.loads(raw)
+                except json.JSONDecodeError:
+                    if _retried:
+                        raise
+                    obj = None
+                if not isinstance(obj, dict) or obj.get("signal_id") != sid:
+                    if _retried:
+                        raise ValueError(f"signals.jsonl offset 索引重建後仍對不上: {sid}")
+                    self.rebuild()
+                    return self.read(ids, _retried=True)
+                signals.append(Signal.model_validate(obj))
+        return signals
+
+
+_offset_indexes: dict[Path, _SignalOffsetIndex] = {}
+_offset_indexes_lock = threading.Lock()
+
+
+def _get_offset_index(signals_path: Path) -> _SignalOffsetIndex:
+    """同一個 signals.jsonl 在 process 內共用一份索引，只載入一次。"""
+    with _offset_indexes_lock:
+        index = _offset_indexes.get(signals_path)
+        if index is None:
+            index = _SignalOffsetIndex(signals_path)
+            _offset_indexes[signals_path] = index
+        return index
+
+
 class SignalStore:
     def __init__(self, config: dict, owner_id: str):
         self.config = config
@@ -34,49 +186,47 @@ class SignalStore:
         self.owner_dir = get_owner_dir(config, owner_id)
         self.signals_path = self.owner_dir / "signals.jsonl"
 
-        # ChromaDB — 本地持久化
-        chroma_dir = self.owner_dir / "chroma"
-        self._chroma = chromadb.PersistentClient(path=str(chroma_dir))
-        self._collection = self._chroma.get_or_create_collection(
-            name=f"{owner_id}_signals",
-            metadata={"hnsw:space": "cosine"},
-        )
+        # ChromaDB — 本地持久化（process 內同一 owner 共用 client）
+        self._chroma = get_client(self.owner_dir)
+        self._collection = get_collection(self.owner_dir, f"{owner_id}_signals", create=True)
 
     def _get_embedder(self):
         return _get_global_embedder(self.config)
 
     def compute_embedding(self, text: str) -> list[float]:
-        embedder = self._get_embedder()
-        return embedder.encode(text, normalize_embeddings=True).tolist()
+        # 經 embedding service：並行請求的單句會合併成一批 encode
+        from engine.embedding_service import embed_text
+        return embed_text(self.config, text).tolist()
 
     def ingest(self, signals: list[Signal], compute_embeddings: bool = True) -> int:
         """寫入 signals 到 JSONL + ChromaDB。回傳寫入數量。"""
         if not signals:
             return 0
 
-        # 取得已存在的 IDs 避免重複
-        existing_ids = set()
-        if self.signals_path.exists():
-            with open(self.signals_path) as f:
-                for line in f:
-                    if line.strip():
-                        obj = json.loads(line)
-                        existing_ids.add(obj.get("signal_id", ""))
-
-        # 去重：跳過已存在 + batch 內去重
-        seen = set(existing_ids)
-        new_signals = []
-        for s in signals:
-            if s.signal_id not in seen:
-                seen.add(s.signal_id)
-                new_signals.append(s)
-        if not new_signals:
-            return 0
+        # 已存在的 IDs 直接查 offset 索引（process 內只載入一次），不再掃全檔。
+        # 持鎖到 append 完成，避免並行 ingest 重複寫入同一個 signal。
+        index = _get_offset_index(self.signals_path)
+        with index.lock:
+            index.sync()
+
+            # 去重：跳過已存在 + batch 內去重
+            seen: set[str] = set()
+            new_signals = []
+            for s in signals:
+                if s.signal_id not in seen and s.signal_id not in index:
+                    seen.add(s.signal_id)
+                    new_signals.append(s)
+            if not new_signals:
+                return 0
 
-        # 寫入 JSONL
-        with open(self.signals_path, "a") as f:
-            for s in new_signals:
-                f.write(s.model_dump_json() + "\n")
+            # 寫入 JSONL（同時記下每行的 byte offset 給索引用）
+            offset_entries: list[tuple[str, int, int]] = []
+            with open(self.signals_path, "ab") as f:
+                for s in new_signals:
+                    line = (s.model_dump_json() + "\n").encode("utf-8")
+                    offset_entries.append((s.signal_id, f.tell(), len(line)))
+                    f.write(line)
+            index.add(offset_entries)
 
         # 寫入 ChromaDB
         ids = [s.signal_id for s in new_signals]
@@ -145,18 +295,19 @@ class SignalStore:
         return self._load_signals_by_ids(ids)
 
     def _load_signals_by_ids(self, ids: list[str]) -> list[Signal]:
-        """從 JSONL 載入指定 ID 的 signals。"""
-        id_set = set(ids)
-        signals = []
+        """從 JSONL 載入指定 ID 的 signals（走 byte offset 索引，不掃全檔）。"""
         if not self.signals_path.exists():
-            return signals
-        with open(self.signals_path) as f:
-            for line in f:
-                if line.strip():
-                    obj = json.loads(line)
-                    if obj.get("signal_id") in id_set:
-                        signals.append(Signal.model_validate(obj))
-        return signals
+            return []
+        return _get_offset_index(self.signals_path).read(ids)
+
+    def signal_ids(self) -> list[str]:
+        """所有 signal IDs（依寫入順序），只讀索引不解析 signals.jsonl。"""
+        if not self.signals_path.exists():
+            return []
+        index = _get_offset_index(self.signals_path)
+        index.sync()
+        with index.lock:
+            return [sid for sid, _ in sorted(index.offsets.items(), key=lambda x: x[1][0])]
 
     def load_all(self) -> list[Signal]:
         """載入所有 signals。"""
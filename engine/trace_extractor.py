@@ -6,15 +6,21 @@ v2: 按 (date, context) 分組，把同一場景的 signals 合併送 LLM，
 
 from __future__ import annotations
 
+import asyncio
 import json
+import re
+import time
 import uuid
 from collections import defaultdict
 from datetime import datetime
 from pathlib import Path
 
+import numpy as np
+
 from engine.config import get_owner_dir
-from engine.conviction_detector import _load_convictions
-from engine.llm import batch_llm
+from engine.generations import bump_generation
+from engine.conviction_detector import _load_conviction_embeddings, _load_convictions
+from engine.llm import acall_llm, backend_max_concurrent, batch_llm, estimate_tokens, forget_cached
 from engine.models import (
     ActivatedConviction,
     ReasoningPath,
@@ -59,6 +65,61 @@ def _save_traces(owner_dir: Path, traces: list[ReasoningTrace]) -> None:
     with open(path, "w") as f:
         for t in traces:
             f.write(t.model_dump_json() + "\n")
+    bump_generation(owner_dir, "traces")
+
+
+def _append_traces(owner_dir: Path, traces: list[ReasoningTrace]) -> None:
+    """新 traces 直接 append 到 traces.jsonl 尾端，不重寫整份檔案。"""
+    if not traces:
+        return
+    path = owner_dir / "traces.jsonl"
+    with open(path, "a") as f:
+        for t in traces:
+            f.write(t.model_dump_json() + "\n")
+    bump_generation(owner_dir, "traces")
+
+
+# ─── Processed-group ledger ──────────────────────────────────────────────────
+#
+# trace_groups.jsonl：已送過 LLM 的 (date, context)，一行一筆，只 append。
+# 沒產出 trace 的分組也會記錄，不會每次重跑；LLM 回應無法解析的分組不記，下次重試。
+
+
+def _load_processed_groups(owner_dir: Path) -> set[tuple[str, str]]:
+    """讀取已處理過的 (date, context)。ledger 不存在時從 traces.jsonl 的 source 重建一次。"""
+    path = owner_dir / "trace_groups.jsonl"
+    processed: set[tuple[str, str]] = set()
+    if path.exists():
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    data = json.loads(line)
+                    processed.add((data["date"], data["context"]))
+        return processed
+
+    traces_path = owner_dir / "traces.jsonl"
+    if traces_path.exists():
+        # 只取 source 欄位，不建 ReasoningTrace model
+        with open(traces_path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                source = json.loads(line).get("source") or {}
+                if source.get("date"):
+                    processed.add((source["date"], source.get("context") or ""))
+    _record_processed_groups(owner_dir, sorted(processed))
+    return processed
+
+
+def _record_processed_groups(owner_dir: Path, keys: list[tuple[str, str]], trace_counts: list[int] | None = None) -> None:
+    path = owner_dir / "trace_groups.jsonl"
+    now = datetime.now().isoformat()
+    with open(path, "a") as f:
+        for n, (date, context) in enumerate(keys):
+            entry = {"date": date, "context": context, "processed_at": now}
+            if trace_counts is not None:
+                entry["traces"] = trace_counts[n]
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
 
 
 def _build_conviction_context(convictions: list) -> str:
@@ -70,6 +131,39 @@ def _build_conviction_context(convictions: list) -> str:
     return "\n".join(lines)
 
 
+def _select_convictions(
+    groups: list[tuple[str, str, list[Signal]]],
+    convictions: list,
+    store: SignalStore,
+    top_k: int,
+) -> list[list]:
+    """每組只挑語義最相近的 top_k 個 convictions 放進 prompt。
+
+    每組的 signals 文字合併後 encode 一次（所有組一起批次 encode），
+    與持久化的 conviction embeddings 做內積取 top_k。top_k <= 0 或 convictions 不多時全放。
+    """
+    if top_k <= 0 or len(convictions) <= top_k:
+        return [convictions] * len(groups)
+
+    conv_emb = _load_conviction_embeddings(store, convictions)
+    group_texts = ["\n".join(s.content.text for s in sigs) for _, _, sigs in groups]
+    group_emb = np.asarray(
+        store._get_embedder().encode(
+            group_texts, normalize_embeddings=True,
+            show_progress_bar=len(group_texts) > 50,
+        ),
+        dtype=np.float32,
+    )
+
+    sims = group_emb @ conv_emb.T
+    top = np.argpartition(-sims, top_k - 1, axis=1)[:, :top_k]
+    selected = []
+    for row, idx in enumerate(top):
+        idx = idx[np.argsort(-sims[row, idx])]  # 相似度高的排前面
+        selected.append([convictions[i] for i in idx])
+    return selected
+
+
 def _group_signals(signals: list[Signal]) -> list[tuple[str, str, list[Signal]]]:
     """按 (date, context) 分組，大組再拆 chunk。回傳 [(date, context, signals), ...]"""
     groups: dict[tuple[str, str], list[Signal]] = defaultdict(list)
@@ -85,40 +179,32 @@ def _group_signals(signals: list[Signal]) -> list[tuple[str, str, list[Signal]]]
     return result
 
 
-def _build_group_prompt(date: str, context: str, signals: list[Signal], conviction_context: str) -> str:
-    """建立一組 signals 的提取 prompt。"""
+def _format_signals(signals: list[Signal]) -> str:
     signal_lines = []
     for i, s in enumerate(signals, 1):
         meta = f"[{s.content.type}|{s.modality}|{s.content.confidence or '未標記'}]"
         signal_lines.append(f"{i}. {meta} {s.content.text}")
-    signals_text = "\n".join(signal_lines)
-
-    return f"""以下是同一個人在同一場景中的多段表達：
-
-日期：{date}
-情境：{context}
-共 {len(signals)} 段：
-
-{signals_text}
+    return "\n".join(signal_lines)
 
----
-
-以下是這個人目前已知的信念清單：
-{conviction_context}
 
-請從上面的內容中找出「有推理過程」的段落組合（某人面對一個問題→思考→得出結論），提取推理軌跡。
+def _trace_instructions(packed: bool = False) -> str:
+    """提取指示 + 輸出 JSON 格式。packed=True 時每個 trace 要標注所屬分組。"""
+    group_field = '\n      "group": "G1",' if packed else ""
+    group_note = "\n- 每個 trace 必須標注所屬分組（group，例如 G1），段落編號是該分組內的編號" if packed else ""
+    scope = "任一分組" if packed else "整組內容"
+    return f"""請從上面的內容中找出「有推理過程」的段落組合（某人面對一個問題→思考→得出結論），提取推理軌跡。
 
 注意：
 - 不是每段都有推理，只提取真正有推理過程的
 - 多段內容可能組成一個推理（例如：先描述問題，再分析，最後做決定）
 - 單獨的金句、引用、指令不算推理
-- 請標注每個 trace 用到了哪些段落編號（from_signals）
+- 請標注每個 trace 用到了哪些段落編號（from_signals）{group_note}
 
 輸出 JSON 格式（不要加 markdown 標記）：
 
 {{
   "traces": [
-    {{
+    {{{group_field}
       "from_signals": [1, 3, 5],
       "trigger": {{
         "situation": "觸發推理的情境描述（50字內）",
@@ -150,12 +236,73 @@ def _build_group_prompt(date: str, context: str, signals: list[Signal], convicti
   ]
 }}
 
-如果整組內容都沒有明確的推理過程，請回傳：
+如果{scope}都沒有明確的推理過程，請回傳：
 {{"traces": []}}"""
 
 
-def _parse_group_response(raw: str, signals: list[Signal], date: str, context: str) -> list[ReasoningTrace]:
-    """解析 LLM 對一組 signals 的回應。"""
+def _build_group_prompt(date: str, context: str, signals: list[Signal], conviction_context: str) -> str:
+    """建立一組 signals 的提取 prompt。"""
+    return f"""以下是同一個人在同一場景中的多段表達：
+
+日期：{date}
+情境：{context}
+共 {len(signals)} 段：
+
+{_format_signals(signals)}
+
+---
+
+以下是這個人目前已知的信念清單：
+{conviction_context}
+
+{_trace_instructions()}"""
+
+
+def _build_packed_prompt(groups: list[tuple[str, str, list[Signal]]], conviction_context: str) -> str:
+    """多個小分組合併成一個 prompt，以 G1、G2… 標記分組。"""
+    sections = []
+    for n, (date, context, signals) in enumerate(groups, 1):
+        sections.append(
+            f"[G{n}] 日期：{date}｜情境：{context}｜共 {len(signals)} 段：\n"
+            f"{_format_signals(signals)}"
+        )
+    body = "\n\n".join(sections)
+
+    return f"""以下是同一個人在 {len(groups)} 個不同場景（分組）中的表達，每個分組各自獨立：
+
+{body}
+
+---
+
+以下是這個人目前已知的信念清單：
+{conviction_context}
+
+{_trace_instructions(packed=True)}"""
+
+
+def _pack_groups(costs: list[int], budget: int, overhead: int) -> list[list[int]]:
+    """依序把分組裝進 prompt，直到加上 overhead 超過 token 預算就開新的一包。
+
+    costs: 每組（signals + 該組 convictions）的估計 token 數。回傳每包的分組 index。
+    單組本身就超過預算時自己一包；budget <= 0 時不打包。
+    """
+    if budget <= 0:
+        return [[i] for i in range(len(costs))]
+    packs: list[list[int]] = []
+    current: list[int] = []
+    used = overhead
+    for i, cost in enumerate(costs):
+        if current and used + cost > budget:
+            packs.append(current)
+            current, used = [], overhead
+        current.append(i)
+        used += cost
+    if current:
+        packs.append(current)
+    return packs
+
+
+def _load_response_json(raw: str) -> dict | None:
     cleaned = raw.strip()
     if cleaned.startswith("```"):
         cleaned = cleaned.split("\n", 1)[1] if "\n" in cleaned else cleaned[3:]
@@ -164,11 +311,47 @@ def _parse_group_response(raw: str, signals: list[Signal], date: str, context: s
     cleaned = cleaned.strip()
 
     try:
-        data = json.loads(cleaned)
+        return json.loads(cleaned)
     except json.JSONDecodeError:
-        return []
+        return None
 
-    raw_traces = data.get("traces", [])
+
+def _parse_group_response(raw: str, signals: list[Signal], date: str, context: str) -> list[ReasoningTrace] | None:
+    """解析 LLM 對一組 signals 的回應。回應不是合法 JSON 時回傳 None。"""
+    data = _load_response_json(raw)
+    if data is None:
+        return None
+    return _build_traces(data.get("traces", []), signals, date, context)
+
+
+_GROUP_TAG_RE = re.compile(r"\[?G?(\d+)\]?", re.IGNORECASE)
+
+
+def _parse_packed_response(
+    raw: str,
+    groups: list[tuple[str, str, list[Signal]]],
+) -> list[list[ReasoningTrace] | None]:
+    """解析合併 prompt 的回應，依 group 標記拆回各分組（順序同 groups）。
+
+    回應不是合法 JSON、或有 trace 的 group 標記缺漏 / 無法辨識 / 超出範圍時每組都是 None
+    （整包重跑；只丟掉那條 trace 的話，其他組會被當成處理完、0 條 trace 記進 ledger）。
+    """
+    data = _load_response_json(raw)
+    if data is None:
+        return [None] * len(groups)
+    per_group: list[list[dict]] = [[] for _ in groups]
+    for rt in data.get("traces", []):
+        match = _GROUP_TAG_RE.fullmatch(str(rt.get("group", "")).strip())
+        if match is None or not 1 <= int(match.group(1)) <= len(groups):
+            return [None] * len(groups)
+        per_group[int(match.group(1)) - 1].append(rt)
+    return [
+        _build_traces(raw_traces, sigs, date, context)
+        for (date, context, sigs), raw_traces in zip(groups, per_group)
+    ]
+
+
+def _build_traces(raw_traces: list[dict], signals: list[Signal], date: str, context: str) -> list[ReasoningTrace]:
     if not raw_traces:
         return []
 
@@ -239,6 +422,130 @@ def _parse_group_response(raw: str, signals: list[Signal], date: str, context: s
     return results
 
 
+def _build_pack_prompts(
+    groups: list[tuple[str, str, list[Signal]]],
+    group_convictions: list[list],
+    config: dict,
+) -> tuple[list[list[int]], list[str]]:
+    """把分組打包成 prompts，回傳 (每包的分組 index, prompts)。
+
+    打包預算 engine.trace.pack_token_budget：小分組合併進同一個 prompt，
+    共用指示與信念清單的固定開銷；回應依 group 標記拆回，保留各組的 date / context / from_signals。
+    """
+    budget = config.get("engine", {}).get("trace", {}).get("pack_token_budget", 6000)
+    overhead = estimate_tokens(_trace_instructions(packed=True))
+    costs = [
+        estimate_tokens(_format_signals(sigs)) + estimate_tokens(_build_conviction_context(convs))
+        for (_, _, sigs), convs in zip(groups, group_convictions)
+    ]
+    packs = _pack_groups(costs, budget, overhead)
+
+    prompts = []
+    for pack in packs:
+        if len(pack) == 1:
+            date, context, sigs = groups[pack[0]]
+            prompts.append(_build_group_prompt(
+                date, context, sigs, _build_conviction_context(group_convictions[pack[0]]),
+            ))
+        else:
+            # 信念清單取各組 top_k 的聯集（保持順序去重）
+            merged = list({c.conviction_id: c for i in pack for c in group_convictions[i]}.values())
+            prompts.append(_build_packed_prompt([groups[i] for i in pack], _build_conviction_context(merged)))
+    return packs, prompts
+
+
+def _split_responses(
+    groups: list[tuple[str, str, list[Signal]]],
+    packs: list[list[int]],
+    responses: list[str],
+) -> dict[int, list[ReasoningTrace] | None]:
+    """把每包的回應拆回各分組，回傳 {分組 index: traces}（無法解析為 None）。"""
+    per_group: dict[int, list[ReasoningTrace] | None] = {}
+    for pack, raw in zip(packs, responses):
+        if len(pack) == 1:
+            date, context, sigs = groups[pack[0]]
+            per_group[pack[0]] = _parse_group_response(raw, sigs, date, context)
+        else:
+            for i, traces in zip(pack, _parse_packed_response(raw, [groups[i] for i in pack])):
+                per_group[i] = traces
+    return per_group
+
+
+def _forget_unparsed(
+    packs: list[list[int]],
+    prompts: list[str],
+    per_group: dict[int, list[ReasoningTrace] | None],
+    config: dict,
+) -> None:
+    """解析失敗的 prompt 從 LLM 快取刪掉，分組下次重跑才會真的重問。"""
+    unparsed = [prompt for pack, prompt in zip(packs, prompts) if any(per_group.get(i) is None for i in pack)]
+    if unparsed:
+        forget_cached(unparsed, config=config, tier="medium")
+
+
+def _commit_groups(
+    owner_dir: Path,
+    groups: list[tuple[str, str, list[Signal]]],
+    per_group: dict[int, list[ReasoningTrace] | None],
+) -> list[ReasoningTrace]:
+    """append traces 並記入 ledger，回傳寫入的 traces。
+
+    同一 key 的 chunks 全部解析成功才寫入，否則整個 key 下次重跑。
+    """
+    failed = {groups[i][:2] for i, traces in per_group.items() if traces is None}
+    counts: dict[tuple[str, str], int] = {}
+    new_traces: list[ReasoningTrace] = []
+    for i, traces in sorted(per_group.items()):
+        key = groups[i][:2]
+        if key in failed:
+            continue
+        counts[key] = counts.get(key, 0) + len(traces)
+        new_traces.extend(traces)
+
+    _append_traces(owner_dir, new_traces)
+    _record_processed_groups(owner_dir, list(counts), list(counts.values()))
+    return new_traces
+
+
+def _pending_groups(
+    owner_dir: Path,
+    store: SignalStore,
+    signal_map: dict | None = None,
+) -> list[tuple[str, str, list[Signal]]]:
+    """還沒處理過的 (date, context) 分組（查 ledger，不載入整份 traces）。"""
+    processed = _load_processed_groups(owner_dir)
+    if signal_map is not None:
+        all_signals = list(signal_map.values())
+    else:
+        # 先用 ChromaDB metadata 篩出未處理分組的 signal IDs，只經 offset 索引讀這些
+        meta = store._collection.get(where={"direction": "output"}, include=["metadatas"])
+        pending_ids = [
+            sid for sid, m in zip(meta["ids"], meta["metadatas"] or [])
+            if m.get("modality") in _EXTRACTABLE_MODALITIES
+            and (m.get("date"), m.get("context")) not in processed
+        ]
+        all_signals = store._load_signals_by_ids(pending_ids) if pending_ids else []
+    candidates = [
+        s for s in all_signals
+        if s.direction == "output" and s.modality in _EXTRACTABLE_MODALITIES
+        and (s.source.date, s.source.context) not in processed
+    ]
+    return _group_signals(candidates)
+
+
+def _active_group_convictions(
+    owner_dir: Path,
+    store: SignalStore,
+    groups: list[tuple[str, str, list[Signal]]],
+    config: dict,
+) -> list[list]:
+    """載入 convictions 作為 context（每組只放最相關的 top_k 個）。"""
+    convictions = _load_convictions(owner_dir)
+    active_convictions = [c for c in convictions if c.lifecycle and c.lifecycle.status == "active"]
+    top_k = config.get("engine", {}).get("trace", {}).get("conviction_top_k", 20)
+    return _select_convictions(groups, active_convictions, store, top_k)
+
+
 def extract(
     owner_id: str,
     config: dict,
@@ -250,68 +557,139 @@ def extract(
 
     v2: 按 (date, context) 分組送 LLM，從整段對話中提取推理軌跡。
 
-    可傳入 store 和 signal_map 避免重複載入（daily_batch 共用）。
+    可傳入 store（daily_batch 共用）與已載入的 signal_map；沒傳 signal_map 時只讀需要的 signals。
     """
     store = store or SignalStore(config, owner_id)
     owner_dir = get_owner_dir(config, owner_id)
 
-    if signal_map is not None:
-        all_signals = list(signal_map.values())
-    else:
-        all_signals = store.load_all()
-    candidates = [
-        s for s in all_signals
-        if s.direction == "output" and s.modality in _EXTRACTABLE_MODALITIES
-    ]
-
-    if not candidates:
+    groups = _pending_groups(owner_dir, store, signal_map)
+    if not groups:
         return []
 
-    # 排除已處理過的 (date, context) 分組
-    existing_traces = _load_traces(owner_dir)
-    extracted_groups: set[tuple[str, str]] = set()
-    for t in existing_traces:
-        if t.source.date:
-            key = (t.source.date, t.source.context or "")
-            extracted_groups.add(key)
+    # 限制處理組數（同一個 (date, context) 拆出的 chunks 不切開，ledger 以 key 為單位記錄）
+    if limit and len(groups) > limit:
+        last_key = groups[limit - 1][:2]
+        end = limit
+        while end < len(groups) and groups[end][:2] == last_key:
+            end += 1
+        groups = groups[:end]
 
-    candidates = [
-        s for s in candidates
-        if (s.source.date, s.source.context) not in extracted_groups
-    ]
-
-    if not candidates:
-        return []
+    group_convictions = _active_group_convictions(owner_dir, store, groups, config)
 
-    # 按 (date, context) 分組
-    groups = _group_signals(candidates)
+    # 小分組合併成共用 prompt，批次呼叫 LLM
+    packs, prompts = _build_pack_prompts(groups, group_convictions, config)
+    responses = batch_llm(prompts, config=config, tier="medium", cache=True)
+    per_group = _split_responses(groups, packs, responses)
+    _forget_unparsed(packs, prompts, per_group, config)
+    return _commit_groups(owner_dir, groups, per_group)
 
-    # 限制處理組數
-    if limit:
-        groups = groups[:limit]
 
-    # 載入 convictions 作為 context
-    convictions = _load_convictions(owner_dir)
-    active_convictions = [c for c in convictions if c.lifecycle and c.lifecycle.status == "active"]
-    conviction_context = _build_conviction_context(active_convictions)
+def backfill(
+    owner_id: str,
+    config: dict,
+    max_concurrent: int | None = None,
+    on_progress=None,
+) -> dict:
+    """全量歷史 trace 提取（可中斷、可續跑）。
+
+    分組工作清單只算一次，打包後的 prompts 以 Semaphore 控制並行數（預設 =
+    目前 backend 的 llm.<backend>.max_concurrent）持續送出，不等整波結束；
+    某個 (date, context) 的 chunks 全部回來就立刻 append traces + 記 ledger 當 checkpoint。
+    中途當掉或被 rate limit 打斷，重跑時 ledger 已記錄的分組直接跳過；
+    單一 prompt 失敗只讓它涵蓋的分組留到下次重跑。
+
+    每個 prompt 完成時的進度（groups/min、tokens/min）append 到 owner 目錄的 extract_log.jsonl，
+    並傳給 on_progress(dict)。
+    """
+    store = SignalStore(config, owner_id)
+    owner_dir = get_owner_dir(config, owner_id)
+    max_concurrent = max_concurrent or backend_max_concurrent(config)
 
-    # 建立所有 prompts
-    prompts = [
-        _build_group_prompt(date, context, sigs, conviction_context)
-        for date, context, sigs in groups
-    ]
+    groups = _pending_groups(owner_dir, store)
+    summary = {"groups": len(groups), "groups_done": 0, "prompts": 0, "traces": 0, "tokens": 0, "elapsed_sec": 0.0}
+    if not groups:
+        return summary
 
-    # 批次呼叫 LLM
-    responses = batch_llm(prompts, config=config, tier="medium")
+    group_convictions = _active_group_convictions(owner_dir, store, groups, config)
+    packs, prompts = _build_pack_prompts(groups, group_convictions, config)
+    summary["prompts"] = len(prompts)
 
-    # 解析結果
-    new_traces: list[ReasoningTrace] = []
-    for (date, context, sigs), raw in zip(groups, responses):
-        traces = _parse_group_response(raw, sigs, date, context)
-        new_traces.extend(traces)
+    asyncio.run(_abackfill(owner_dir, groups, packs, prompts, config, max_concurrent, summary, on_progress))
+    return summary
 
-    if new_traces:
-        all_traces = existing_traces + new_traces
-        _save_traces(owner_dir, all_traces)
 
-    return new_traces
+async def _abackfill(
+    owner_dir: Path,
+    groups: list[tuple[str, str, list[Signal]]],
+    packs: list[list[int]],
+    prompts: list[str],
+    config: dict,
+    max_concurrent: int,
+    summary: dict,
+    on_progress,
+) -> None:
+    """backfill 的 pipeline：Semaphore 限制並行，as_completed 依完成順序 commit。"""
+    # 每個 (date, context) 還在等幾個 prompt；歸零才 commit（同一 key 的 chunks 可能分在不同包）
+    pending: dict[tuple[str, str], int] = defaultdict(int)
+    for pack in packs:
+        for key in {groups[i][:2] for i in pack}:
+            pending[key] += 1
+    key_groups: dict[tuple[str, str], list[int]] = defaultdict(list)
+    for i, group in enumerate(groups):
+        key_groups[group[:2]].append(i)
+
+    semaphore = asyncio.Semaphore(max_concurrent)
+
+    async def _run_one(n: int) -> tuple[int, str | None]:
+        async with semaphore:
+            try:
+                return n, await acall_llm(prompts[n], config=config, tier="medium", cache=True)
+            except Exception:
+                return n, None
+
+    log_path = owner_dir / "extract_log.jsonl"
+    started = time.time()
+    per_group: dict[int, list[ReasoningTrace] | None] = {}
+    prompts_done = 0
+    for next_done in asyncio.as_completed([_run_one(n) for n in range(len(prompts))]):
+        n, raw = await next_done
+        prompts_done += 1
+        pack = packs[n]
+        if raw is None:
+            per_group.update({i: None for i in pack})
+        else:
+            parsed = _split_responses(groups, [pack], [raw])
+            _forget_unparsed([pack], [prompts[n]], parsed, config)
+            per_group.update(parsed)
+
+        ready = []
+        for key in {groups[i][:2] for i in pack}:
+            pending[key] -= 1
+            if pending[key] == 0:
+                ready.append(key)
+        ready_groups = {i: per_group.pop(i) for key in ready for i in key_groups[key]}
+        new_traces = _commit_groups(owner_dir, groups, ready_groups) if ready_groups else []
+
+        summary["groups_done"] += sum(1 for traces in ready_groups.values() if traces is not None)
+        summary["traces"] += len(new_traces)
+        summary["tokens"] += estimate_tokens(prompts[n]) + (estimate_tokens(raw) if raw else 0)
+        elapsed = time.time() - started
+        minutes = max(elapsed / 60, 1e-6)
+        progress = {
+            "prompts_done": prompts_done,
+            "prompts_total": len(prompts),
+            "groups_done": summary["groups_done"],
+            "groups_total": len(groups),
+            "new_traces": len(new_traces),
+            "total_traces": summary["traces"],
+            "groups_per_min": round(summary["groups_done"] / minutes, 1),
+            "tokens_per_min": round(summary["tokens"] / minutes),
+            "elapsed_sec": round(elapsed, 1),
+            "timestamp": datetime.now().isoformat(),
+        }
+        with open(log_path, "a") as f:
+            f.write(json.dumps(progress, ensure_ascii=False) + "\n")
+        if on_progress:
+            on_progress(progress)
+
+    summary["elapsed_sec"] = round(time.time() - started, 1)
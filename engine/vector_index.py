@@ -0,0 +1,71 @@
+"""In-memory vector index — frames / convictions / traces 的 exact search
+
+這三層每個 owner 只有幾百到幾千個向量，整份放進 normalized float32 矩陣，
+一次矩陣 × 向量就比 ChromaDB（HNSW + SQLite）round trip 快好幾個數量級。
+ChromaDB 仍是持久化來源：owner 快取建立時、build_index 後（generations 的
+"index" 版本號變動）從 collection 讀出 embeddings 重建。
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from engine.chroma_registry import get_collection
+
+
+VECTOR_LAYERS = ("frames", "convictions", "traces")
+
+
+class _VectorIndex:
+    """單一 collection 的 exact-search 索引：ids + L2 normalized float32 矩陣。"""
+
+    def __init__(self, ids: list[str], matrix: np.ndarray):
+        self.ids = ids
+        if len(ids):
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix = matrix / np.maximum(norms, 1e-12)
+        self.matrix = matrix.astype(np.float32, copy=False)
+
+    @classmethod
+    def from_collection(cls, col) -> _VectorIndex:
+        data = col.get(include=["embeddings"])
+        ids = list(data["ids"])
+        if not ids:
+            return cls([], np.zeros((0, 0), dtype=np.float32))
+        return cls(ids, np.asarray(data["embeddings"], dtype=np.float32))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        return self.matrix.nbytes + sys.getsizeof(self.ids)
+
+    def query(self, q_emb, n_results: int) -> dict:
+        """回傳與 ChromaDB query 相同形狀的結果（cosine distance = 1 - 內積），呼叫端可直接沿用。"""
+        n = min(n_results, len(self.ids))
+        if n <= 0:
+            return {"ids": [[]], "distances": [[]]}
+        scores = self.matrix @ np.asarray(q_emb, dtype=np.float32)
+        top = np.argpartition(-scores, n - 1)[:n] if n < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return {
+            "ids": [[self.ids[i] for i in top]],
+            "distances": [(1.0 - scores[top]).tolist()],
+        }
+
+
+def load_vector_indexes(owner_dir: Path, owner_id: str) -> dict[str, _VectorIndex | None]:
+    """從 ChromaDB 讀出三層的 embeddings；collection 不存在（尚未 build_index）的為 None。"""
+    indexes: dict[str, _VectorIndex | None] = {}
+    for layer in VECTOR_LAYERS:
+        try:
+            col = get_collection(owner_dir, f"{owner_id}_{layer}")
+        except Exception:
+            indexes[layer] = None
+            continue
+        indexes[layer] = _VectorIndex.from_collection(col)
+    return indexes
@@ -0,0 +1,76 @@
+"""Worker pool — 把阻塞工作（embedding、ChromaDB、檔案 I/O）移出 event loop
+
+有上限的 ThreadPoolExecutor + 排隊深度限制（config: api.workers / api.max_queue）。
+執行中 + 排隊中的工作超過上限時直接丟 WorkerPoolFull，API 回 503，
+避免請求無限堆積；/health 與其他不進 pool 的 endpoint 不受影響。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from engine.config import load_config
+
+
+class WorkerPoolFull(RuntimeError):
+    """執行中 + 排隊中的工作已達上限。"""
+
+
+_executor: ThreadPoolExecutor | None = None
+_workers = 0
+_max_queue = 0
+_pending = 0
+_rejected = 0
+_lock = threading.Lock()
+
+
+def configure(config: dict) -> None:
+    """依 config 建立 pool（API 啟動時呼叫）；沒呼叫過則第一次使用時讀預設 config。"""
+    global _executor, _workers, _max_queue
+    with _lock:
+        if _executor is not None:
+            return
+        api_cfg = config.get("api", {})
+        _workers = api_cfg.get("workers", 8)
+        _max_queue = api_cfg.get("max_queue", 32)
+        _executor = ThreadPoolExecutor(max_workers=_workers, thread_name_prefix="mind-spiral-worker")
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """在 worker pool 執行阻塞函式並 await 結果；pool 滿了丟 WorkerPoolFull。"""
+    global _pending, _rejected
+    if _executor is None:
+        configure(load_config())
+    with _lock:
+        if _pending >= _workers + _max_queue:
+            _rejected += 1
+            raise WorkerPoolFull(f"worker pool 已滿（{_workers} 執行中 + {_max_queue} 排隊）")
+        _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, functools.partial(fn, *args, **kwargs))
+    finally:
+        with _lock:
+            _pending -= 1
+
+
+def pool_stats() -> dict:
+    with _lock:
+        return {
+            "workers": _workers,
+            "max_queue": _max_queue,
+            "in_flight": _pending,
+            "queued": max(0, _pending - _workers),
+            "rejected": _rejected,
+        }
+
+
+def shutdown() -> None:
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
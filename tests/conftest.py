@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import hashlib
+
+import numpy as np
+import pytest
+
+
+class FakeEmbedder:
+    """決定性的假 embedder：第一個詞決定主方向，整句決定小幅雜訊（同主題的句子彼此相近）。"""
+
+    dim = 32
+
+    def __init__(self):
+        self.calls = 0
+
+    def _vector(self, text: str) -> np.ndarray:
+        def seeded(key: str) -> np.ndarray:
+            seed = int(hashlib.md5(key.encode("utf-8")).hexdigest()[:8], 16)
+            return np.random.default_rng(seed).normal(size=self.dim)
+
+        v = seeded(text.split()[0]) + seeded(text) * 0.3
+        return (v / np.linalg.norm(v)).astype(np.float32)
+
+    def encode(self, texts, normalize_embeddings=True, show_progress_bar=False, **kwargs):
+        self.calls += 1
+        if isinstance(texts, str):
+            return self._vector(texts)
+        return np.array([self._vector(t) for t in texts])
+
+
+@pytest.fixture
+def fake_embedder(monkeypatch):
+    import engine.embedding_service as embedding_service
+    import engine.signal_store as signal_store
+
+    embedder = FakeEmbedder()
+    monkeypatch.setattr(signal_store, "_global_embedder", embedder)
+    monkeypatch.setattr(embedding_service, "_batcher", None)
+    monkeypatch.setattr(embedding_service, "_cache", None)
+    monkeypatch.setattr(embedding_service, "_cache_configured", False)
+    return embedder
+
+
+@pytest.fixture
+def config(tmp_path):
+    return {
+        "engine": {
+            "data_dir": str(tmp_path / "data"),
+            "llm_backend": "cloud",
+            "embedding": {"batch_max_size": 1, "cache_size": 0},
+        },
+        "llm": {"cloud": {"max_concurrent": 3}, "cache": {"enabled": False}},
+    }
@@ -0,0 +1,161 @@
+"""Contradiction alert：checked pairs 編碼、LLM 回應解析、backlog"""
+
+from __future__ import annotations
+
+import json
+
+import numpy as np
+import pytest
+
+import engine.llm as llm
+from engine.config import get_owner_dir
+from engine.contradiction_alert import _CheckedPairs, _is_unrelated, _pair_codes, _parse_tension, scan
+from engine.conviction_detector import _save_convictions
+from engine.models import Conviction
+
+
+def test_pair_codes_ignore_order():
+    a = np.array([1, 7, 3])
+    b = np.array([7, 1, 3])
+    assert _pair_codes(a, b).tolist() == _pair_codes(b, a).tolist()
+    assert _pair_codes(np.array([2]), np.array([5]))[0] == (2 << 32) | 5
+
+
+def test_checked_pairs_roundtrip(tmp_path):
+    checked = _CheckedPairs(tmp_path)
+    ords = checked.ordinals_for(["c1", "c2", "c3"])
+    checked.add(_pair_codes(ords[[0]], ords[[1]]))
+    checked.save()
+
+    reloaded = _CheckedPairs(tmp_path)
+    assert reloaded.ordinals == {"c1": 0, "c2": 1, "c3": 2}
+    ords = reloaded.ordinals_for(["c2", "c1", "c3"])
+    mask = reloaded.contains(_pair_codes(ords[[0, 0]], ords[[1, 2]]))
+    assert mask.tolist() == [True, False]
+
+
+def test_ordinals_are_stable_and_append_only(tmp_path):
+    checked = _CheckedPairs(tmp_path)
+    checked.ordinals_for(["a", "b"])
+    checked.save()
+    checked = _CheckedPairs(tmp_path)
+    assert checked.ordinals_for(["c", "a"]).tolist() == [2, 0]
+    checked.save()
+    assert (tmp_path / "checked_pairs.ids").read_text().splitlines() == ["a", "b", "c"]
+
+
+def test_unsaved_pairs_are_not_visible_after_reload(tmp_path):
+    checked = _CheckedPairs(tmp_path)
+    ords = checked.ordinals_for(["a", "b"])
+    checked.add(_pair_codes(ords[[0]], ords[[1]]))
+    assert not _CheckedPairs(tmp_path).contains(_pair_codes(np.array([0]), np.array([1])))[0]
+
+
+def test_prune_drops_pairs_of_merged_convictions(tmp_path):
+    checked = _CheckedPairs(tmp_path)
+    ords = checked.ordinals_for(["a", "b", "c"])
+    checked.add(_pair_codes(ords[[0, 0, 1]], ords[[1, 2, 2]]))
+    checked.save()
+
+    assert checked.prune(["a"]) == 2
+    reloaded = _CheckedPairs(tmp_path)
+    ords = reloaded.ordinals_for(["a", "b", "c"])
+    assert reloaded.contains(_pair_codes(ords[[0, 0, 1]], ords[[1, 2, 2]])).tolist() == [False, False, True]
+
+
+def test_legacy_json_is_migrated(tmp_path):
+    with open(tmp_path / "checked_pairs.json", "w") as f:
+        json.dump([["x", "y"], ["y", "z"]], f)
+
+    checked = _CheckedPairs(tmp_path)
+    assert not (tmp_path / "checked_pairs.json").exists()
+    ords = checked.ordinals_for(["x", "y", "z"])
+    assert checked.contains(_pair_codes(ords[[1, 2, 0]], ords[[0, 1, 2]])).tolist() == [True, True, False]
+    assert _CheckedPairs(tmp_path).ordinals == {"x": 0, "y": 1, "z": 2}
+
+
+# ─── LLM 回應解析與 backlog ───
+
+
+def test_parse_tension():
+    assert _parse_tension("contradiction 8") == ("contradiction", 8)
+    assert _parse_tension("  Evolution 3\n") == ("evolution", 3)
+    assert _parse_tension("creative_tension") == ("creative_tension", 5)
+    assert _parse_tension("context_dependent 高") == ("context_dependent", 5)
+    assert _parse_tension("unrelated 9") == (None, 0)
+    assert _parse_tension("我無法判斷") == (None, 0)
+    assert _parse_tension("") == (None, 0)
+
+
+def test_is_unrelated_separates_valid_answer_from_garbage():
+    assert _is_unrelated("Unrelated 7")
+    assert not _is_unrelated("我無法判斷")
+    assert not _is_unrelated("")
+
+
+def _conviction(k: int, topic: str) -> Conviction:
+    return Conviction.model_validate({
+        "owner_id": "o",
+        "conviction_id": f"c{k}",
+        "statement": f"{topic} 信念 {k}",
+        "strength": {"score": 0.2 + 0.05 * k, "level": "developing"},
+        "domains": ["x"],
+        "resonance_evidence": {},
+        "lifecycle": {"status": "active", "first_detected": "2026-01-01"},
+    })
+
+
+@pytest.fixture
+def owner_with_convictions(config, fake_embedder):
+    owner_dir = get_owner_dir(config, "o")
+    _save_convictions(owner_dir, [_conviction(k, ("定價", "人事")[k % 2]) for k in range(8)])
+    return owner_dir
+
+
+def _fake_backend(answer):
+    calls = []
+
+    async def backend(prompts, system, cfg, max_concurrent, tier, return_exceptions=False):
+        calls.append((len(prompts), max_concurrent))
+        return [answer(len(calls), i) for i in range(len(prompts))]
+
+    return backend, calls
+
+
+def test_scan_respects_budget_and_keeps_rest_in_backlog(config, owner_with_convictions, monkeypatch):
+    backend, calls = _fake_backend(lambda call, i: "contradiction 8")
+    monkeypatch.setattr(llm, "_abatch_backend", backend)
+    config["engine"]["contradiction"] = {"max_llm_per_scan": 4}
+
+    results, stats = scan("o", config)
+    assert stats["candidates"] > 4
+    assert stats["classified"] == 4
+    assert stats["backlog_remaining"] == stats["candidates"] - 4
+    assert len(results) == 4
+    # chunk 大小取自目前 backend（cloud.max_concurrent = 3）
+    assert calls == [(3, 3), (1, 3)]
+
+    remaining = stats["backlog_remaining"]
+    _, stats = scan("o", config)
+    assert stats["candidates"] == 0  # 入列過的 pair 不再重複入列
+    assert stats["classified"] == min(4, remaining)
+    assert stats["backlog_remaining"] == remaining - stats["classified"]
+
+
+def test_scan_keeps_failed_and_malformed_pairs_in_backlog(config, owner_with_convictions, monkeypatch):
+    def answer(call, i):
+        if i == 0:
+            return RuntimeError("rate limited")
+        if i == 1:
+            return "我無法判斷"
+        return "unrelated"
+
+    backend, _ = _fake_backend(answer)
+    monkeypatch.setattr(llm, "_abatch_backend", backend)
+    config["engine"]["contradiction"] = {"max_llm_per_scan": 3}
+
+    _, stats = scan("o", config)
+    assert stats["failed"] == 2
+    assert stats["classified"] == 1
+    backlog = json.loads((owner_with_convictions / "contradiction_backlog.json").read_text())
+    assert len(backlog) == stats["backlog_remaining"] == stats["candidates"] - 1
@@ -0,0 +1,175 @@
+"""Conviction detector：增量聚類狀態、statement embeddings 快取"""
+
+from __future__ import annotations
+
+import json
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+
+from engine.conviction_detector import (
+    _CLUSTER_CENTROIDS_FILE,
+    _CLUSTER_STATE_FILE,
+    _CONVICTION_EMB_FILE,
+    _LEGACY_EMB_FILE,
+    _LEGACY_EMB_META_FILE,
+    _assign_incremental,
+    _load_conviction_embeddings,
+    _load_cluster_state,
+    _needs_full_recluster,
+    _prune_conviction_embeddings,
+    _save_cluster_state,
+    _statement_key,
+)
+from engine.models import Conviction
+from engine.signal_store import _embedding_model_name
+
+
+def _unit(*xs: float) -> np.ndarray:
+    v = np.array(xs, dtype=np.float32)
+    return v / np.linalg.norm(v)
+
+
+def _state(**extra) -> dict:
+    state = {
+        "threshold": 0.8,
+        "last_full_recluster": datetime.now().strftime("%Y-%m-%d"),
+        "clusters": [["a", "b"], ["c"]],
+        "centroids": np.stack([_unit(1, 0, 0), _unit(0, 1, 0)]),
+    }
+    state.update(extra)
+    return state
+
+
+def test_cluster_state_roundtrip(tmp_path):
+    _save_cluster_state(tmp_path, _state())
+    loaded = _load_cluster_state(tmp_path)
+    assert loaded["clusters"] == [["a", "b"], ["c"]]
+    assert loaded["centroids"].dtype == np.float32
+    np.testing.assert_allclose(loaded["centroids"], _state()["centroids"])
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_cluster_state_rejects_mismatched_files(tmp_path):
+    _save_cluster_state(tmp_path, _state())
+    # 中途當掉：centroids 已換成新的一份，JSON 還是舊的（筆數相同）
+    np.save(tmp_path / _CLUSTER_CENTROIDS_FILE, np.stack([_unit(0, 0, 1), _unit(0, 1, 0)]))
+    assert _load_cluster_state(tmp_path) is None
+
+
+def test_cluster_state_rejects_count_mismatch_and_garbage(tmp_path):
+    _save_cluster_state(tmp_path, _state())
+    meta = json.loads((tmp_path / _CLUSTER_STATE_FILE).read_text())
+    meta["clusters"].append(["d"])
+    (tmp_path / _CLUSTER_STATE_FILE).write_text(json.dumps(meta))
+    assert _load_cluster_state(tmp_path) is None
+
+    (tmp_path / _CLUSTER_STATE_FILE).write_text("{")
+    assert _load_cluster_state(tmp_path) is None
+    assert _load_cluster_state(tmp_path / "missing") is None
+
+
+def test_cluster_state_without_clusters(tmp_path):
+    _save_cluster_state(tmp_path, _state(clusters=[], centroids=np.array([])))
+    assert _load_cluster_state(tmp_path)["clusters"] == []
+
+
+def test_needs_full_recluster():
+    conv_cfg = {"full_recluster_days": 7}
+    assert _needs_full_recluster(None, conv_cfg, 0.8)
+    assert not _needs_full_recluster(_state(), conv_cfg, 0.8)
+    assert _needs_full_recluster(_state(), conv_cfg, 0.75)
+    assert _needs_full_recluster(_state(), {"mode": "full"}, 0.8)
+    stale = (datetime.now() - timedelta(days=8)).strftime("%Y-%m-%d")
+    assert _needs_full_recluster(_state(last_full_recluster=stale), conv_cfg, 0.8)
+
+
+def test_assign_incremental_joins_or_seeds_clusters():
+    state = _state()
+    new_ids = ["d", "e", "f"]
+    new_embeddings = np.stack([_unit(1, 0.1, 0), _unit(0, 0, 1), _unit(0, 0.1, 1)])
+
+    touched = _assign_incremental(state, new_ids, new_embeddings, threshold=0.8)
+
+    # d 併入 cluster 0；e 開新 cluster，f 跟著 e
+    assert state["clusters"] == [["a", "b", "d"], ["c"], ["e", "f"]]
+    assert touched == {0, 2}
+    assert state["centroids"].shape == (3, 3)
+    assert state["centroids"][2] @ _unit(0, 0, 1) > 0.95
+
+
+# ─── Statement embeddings 快取 ───
+
+
+def _conviction(k: int, statement: str | None = None) -> Conviction:
+    return Conviction.model_validate({
+        "owner_id": "o",
+        "conviction_id": f"c{k}",
+        "statement": statement or f"定價 信念 {k}",
+        "strength": {"score": 0.5, "level": "developing"},
+        "domains": ["x"],
+        "resonance_evidence": {},
+        "lifecycle": {"status": "active", "first_detected": "2026-01-01"},
+    })
+
+
+def _store(tmp_path, config, embedder) -> SimpleNamespace:
+    return SimpleNamespace(owner_dir=tmp_path, config=config, _get_embedder=lambda: embedder)
+
+
+def test_conviction_embeddings_merge_subsets(tmp_path, config, fake_embedder):
+    store = _store(tmp_path, config, fake_embedder)
+    convictions = [_conviction(k) for k in range(6)]
+
+    first = _load_conviction_embeddings(store, convictions[:4])
+    assert first.shape == (4, fake_embedder.dim)
+    # 只傳另一個子集：新的 encode、舊的 row 不會被丟掉
+    _load_conviction_embeddings(store, convictions[2:])
+    calls = fake_embedder.calls
+    again = _load_conviction_embeddings(store, convictions)
+    assert fake_embedder.calls == calls
+    np.testing.assert_allclose(again[:4], first)
+
+
+def test_conviction_embeddings_reencode_changed_statement(tmp_path, config, fake_embedder):
+    store = _store(tmp_path, config, fake_embedder)
+    _load_conviction_embeddings(store, [_conviction(0), _conviction(1)])
+    calls = fake_embedder.calls
+    changed = _conviction(1, "人事 新的說法")
+    emb = _load_conviction_embeddings(store, [_conviction(0), changed])
+    assert fake_embedder.calls == calls + 1
+    np.testing.assert_allclose(emb[1], fake_embedder.encode(["人事 新的說法"])[0])
+
+
+def test_conviction_embeddings_prune_and_model_change(tmp_path, config, fake_embedder):
+    store = _store(tmp_path, config, fake_embedder)
+    convictions = [_conviction(k) for k in range(3)]
+    _load_conviction_embeddings(store, convictions)
+    assert _prune_conviction_embeddings(tmp_path, config, convictions[:2]) == 1
+    with np.load(tmp_path / _CONVICTION_EMB_FILE) as data:
+        assert sorted(data["keys"].tolist()) == sorted(_statement_key(c) for c in convictions[:2])
+
+    config["llm"]["local"] = {"embedding_model": "other/model"}
+    calls = fake_embedder.calls
+    _load_conviction_embeddings(store, convictions[:2])
+    assert fake_embedder.calls == calls + 1  # 換 model 整份重算
+
+
+def test_conviction_embeddings_migrate_legacy_files(tmp_path, config, fake_embedder):
+    store = _store(tmp_path, config, fake_embedder)
+    convictions = [_conviction(0), _conviction(1)]
+    matrix = fake_embedder.encode([c.statement for c in convictions])
+    np.save(tmp_path / _LEGACY_EMB_FILE, matrix)
+    (tmp_path / _LEGACY_EMB_META_FILE).write_text(json.dumps({
+        "model": _embedding_model_name(config),
+        "keys": [_statement_key(c) for c in convictions],
+    }))
+    calls = fake_embedder.calls
+
+    emb = _load_conviction_embeddings(store, convictions)
+    assert fake_embedder.calls == calls
+    np.testing.assert_allclose(emb, matrix)
+    assert (tmp_path / _CONVICTION_EMB_FILE).exists()
+    assert not (tmp_path / _LEGACY_EMB_FILE).exists()
+    assert not (tmp_path / _LEGACY_EMB_META_FILE).exists()
@@ -0,0 +1,86 @@
+"""Embedding service：查詢 embedding 的 LRU 與落地快取、micro-batching"""
+
+from __future__ import annotations
+
+import numpy as np
+
+import engine.embedding_service as embedding_service
+from engine.embedding_service import _EmbeddingCache, embed_text
+
+
+def _vec(i: float) -> np.ndarray:
+    return np.full(4, i, dtype=np.float32)
+
+
+def test_key_normalizes_whitespace_and_width():
+    assert _EmbeddingCache.key("m", " 定價\t策略 ") == _EmbeddingCache.key("m", "定價 策略")
+    assert _EmbeddingCache.key("m", "ＡＢＣ") == _EmbeddingCache.key("m", "ABC")
+    assert _EmbeddingCache.key("m", "abc") != _EmbeddingCache.key("m", "ABC")
+    assert _EmbeddingCache.key("m1", "abc") != _EmbeddingCache.key("m2", "abc")
+
+
+def test_memory_lru_evicts_least_recently_used():
+    cache = _EmbeddingCache(capacity=2)
+    cache.put("a", _vec(1))
+    cache.put("b", _vec(2))
+    assert cache.get("a") is not None
+    cache.put("c", _vec(3))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert not cache.get("a").flags.writeable
+
+
+def test_disk_cache_survives_restart(tmp_path):
+    path = tmp_path / "embedding_cache.sqlite"
+    cache = _EmbeddingCache(capacity=1, path=path)
+    cache.put("a", _vec(1))
+    cache.put("b", _vec(2))
+    assert cache.get("a") is not None  # 記憶體已被擠掉，從 SQLite 讀回
+    assert cache.disk_hits == 1
+
+    reopened = _EmbeddingCache(capacity=4, path=path)
+    np.testing.assert_array_equal(reopened.get("b"), _vec(2))
+    assert reopened.disk_hits == 1
+
+
+def test_disk_cache_prunes_least_recently_used(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_service, "_EVICT_EVERY", 4)
+    cache = _EmbeddingCache(capacity=2, path=tmp_path / "c.sqlite", disk_max_entries=3)
+    for i in range(8):
+        cache.put(f"k{i}", _vec(i))
+        assert cache.get("k0") is not None  # 一直被用到的 key 不會被淘汰
+
+    rows = {key for (key,) in cache.conn.execute("SELECT key FROM embeddings")}
+    assert len(rows) <= 3 + 4
+    cache.evict()
+    rows = {key for (key,) in cache.conn.execute("SELECT key FROM embeddings")}
+    assert len(rows) == 3
+    assert "k0" in rows and "k7" in rows
+
+    # 重開時也會依上限淘汰
+    reopened = _EmbeddingCache(capacity=2, path=tmp_path / "c.sqlite", disk_max_entries=1)
+    assert reopened.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] == 1
+
+
+def test_embed_text_uses_cache(config, fake_embedder):
+    config["engine"]["embedding"] = {"batch_max_size": 1, "cache_size": 8}
+    first = embed_text(config, "定價 策略")
+    calls = fake_embedder.calls
+    again = embed_text(config, "定價  策略")
+    assert fake_embedder.calls == calls
+    np.testing.assert_array_equal(first, again)
+
+
+def test_batcher_merges_concurrent_requests(config, fake_embedder):
+    from concurrent.futures import ThreadPoolExecutor
+
+    config["engine"]["embedding"] = {"batch_max_size": 16, "batch_max_wait_ms": 50, "cache_size": 0}
+    texts = [f"主題{i} 說法" for i in range(8)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda t: embed_text(config, t), texts))
+
+    for text, emb in zip(texts, results):
+        np.testing.assert_allclose(emb, fake_embedder.encode(text), rtol=1e-6)
+    stats = embedding_service.batcher_stats()
+    assert stats["texts"] == 8
+    assert stats["batches"] < 8
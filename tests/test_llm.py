@@ -0,0 +1,94 @@
+"""LLM 抽象層：重試、並行數"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+import engine.llm as llm
+
+
+class _HTTPError(Exception):
+    def __init__(self, status_code: int, retry_after: str | None = None):
+        super().__init__(status_code)
+        self.status_code = status_code
+        headers = {"retry-after": retry_after} if retry_after is not None else {}
+        self.response = type("Response", (), {"headers": headers})()
+
+
+def _flaky(errors: list[Exception]):
+    attempts = []
+
+    async def call():
+        attempts.append(time.monotonic())
+        if len(attempts) <= len(errors):
+            raise errors[len(attempts) - 1]
+        return "ok"
+
+    return call, attempts
+
+
+RETRY_CFG = {"llm": {"retry": {"max_attempts": 3, "base_delay": 0.01, "max_delay": 0.05}}}
+
+
+def test_with_retry_retries_429_and_5xx():
+    call, attempts = _flaky([_HTTPError(429), _HTTPError(503)])
+    assert asyncio.run(llm._with_retry(call, RETRY_CFG)) == "ok"
+    assert len(attempts) == 3
+
+
+def test_with_retry_clamps_retry_after_to_max_delay():
+    call, _ = _flaky([_HTTPError(429, retry_after="3600")])
+    started = time.monotonic()
+    assert asyncio.run(llm._with_retry(call, RETRY_CFG)) == "ok"
+    assert time.monotonic() - started < 1
+
+
+def test_with_retry_gives_up():
+    call, attempts = _flaky([_HTTPError(400)])
+    with pytest.raises(_HTTPError):
+        asyncio.run(llm._with_retry(call, RETRY_CFG))
+    assert len(attempts) == 1
+
+    call, attempts = _flaky([_HTTPError(500)] * 5)
+    with pytest.raises(_HTTPError):
+        asyncio.run(llm._with_retry(call, RETRY_CFG))
+    assert len(attempts) == 3
+
+
+def test_batch_concurrency_defaults_to_backend_config(config, monkeypatch):
+    seen = []
+
+    async def backend(prompts, system, cfg, max_concurrent, tier, return_exceptions=False):
+        seen.append(max_concurrent)
+        return ["r"] * len(prompts)
+
+    monkeypatch.setattr(llm, "_abatch_backend", backend)
+    config["llm"]["cloud"]["max_concurrent"] = 11
+    llm.batch_llm(["a", "b"], config=config)
+    llm.batch_llm(["a"], config=config, max_concurrent=2)
+    assert seen == [11, 2]
+    assert llm.backend_max_concurrent({"engine": {"llm_backend": "local"}}) == 5
+
+
+def test_api_batch_bounds_in_flight_requests(config, monkeypatch):
+    state = {"live": 0, "peak": 0}
+
+    async def query(prompt, system, cfg, tier):
+        state["live"] += 1
+        state["peak"] = max(state["peak"], state["live"])
+        await asyncio.sleep(0.001)
+        state["live"] -= 1
+        if prompt == "bad":
+            raise RuntimeError(prompt)
+        return prompt.upper()
+
+    monkeypatch.setattr(llm, "_anthropic_query", query)
+    results = asyncio.run(llm._api_batch(
+        ["a", "bad", "c", "d", "e"], None, config, max_concurrent=2, return_exceptions=True,
+    ))
+    assert results[0] == "A" and results[4] == "E"
+    assert isinstance(results[1], RuntimeError)
+    assert state["peak"] == 2
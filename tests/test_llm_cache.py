@@ -0,0 +1,100 @@
+"""LLM response cache：淘汰、刪除、batch 只寫入成功的回應"""
+
+from __future__ import annotations
+
+import time
+
+import pytest
+
+import engine.llm as llm
+import engine.llm_cache as llm_cache
+from engine.llm_cache import _LLMCache, get_cache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    c = _LLMCache(tmp_path / "llm_cache.sqlite", max_age_days=30, max_size_mb=1)
+    yield c
+    c.close()
+
+
+def test_put_and_get_many(cache):
+    cache.put_many([("a", "回應 A", "m", "light"), ("b", "回應 B", "m", "light")])
+    assert cache.get_many(["a", "b", "c"]) == {"a": "回應 A", "b": "回應 B"}
+    assert cache.get_many([]) == {}
+
+
+def test_evict_drops_expired_entries(cache):
+    cache.put_many([("old", "x", "m", "light"), ("new", "y", "m", "light")])
+    cache.conn.execute("UPDATE responses SET created_at = ? WHERE key = 'old'", (time.time() - 31 * 86400,))
+    cache.conn.commit()
+    assert cache.get_many(["old"]) == {}  # 過期的讀不到
+    assert cache.evict() == 1
+    assert cache.stats()["entries"] == 1
+
+
+def test_evict_keeps_most_recently_read_within_size_limit(cache):
+    cache.max_bytes = 25
+    cache.put_many([(f"k{i}", "x" * 10, "m", "light") for i in range(4)])
+    now = time.time()
+    for i, key in enumerate(["k2", "k0", "k3", "k1"]):
+        cache.conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now + i, key))
+    cache.conn.commit()
+    assert cache.evict() == 2
+    assert set(cache.get_many([f"k{i}" for i in range(4)])) == {"k3", "k1"}
+
+
+def test_delete_many(cache):
+    cache.put_many([(f"k{i}", "x", "m", "light") for i in range(3)])
+    assert cache.delete_many(["k0", "k2", "missing"]) == 2
+    assert cache.delete_many([]) == 0
+    assert set(cache.get_many(["k0", "k1", "k2"])) == {"k1"}
+
+
+@pytest.fixture
+def cached_config(config, tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_cache, "_caches", {})
+    config["llm"]["cache"] = {"enabled": True, "path": str(tmp_path / "llm_cache.sqlite")}
+    return config
+
+
+def _backend(answers):
+    sent: list[str] = []
+
+    async def backend(prompts, system, cfg, max_concurrent, tier, return_exceptions=False):
+        sent.extend(prompts)
+        return [answers[p] for p in prompts]
+
+    return backend, sent
+
+
+def test_batch_cache_is_opt_in(cached_config, monkeypatch):
+    backend, sent = _backend({"p": "r"})
+    monkeypatch.setattr(llm, "_abatch_backend", backend)
+    llm.batch_llm(["p"], config=cached_config)
+    llm.batch_llm(["p"], config=cached_config)
+    assert sent == ["p", "p"]
+    assert get_cache(cached_config).stats()["entries"] == 0
+
+
+def test_batch_caches_only_successful_responses(cached_config, monkeypatch):
+    backend, sent = _backend({"ok": "r", "empty": "", "boom": RuntimeError("x")})
+    monkeypatch.setattr(llm, "_abatch_backend", backend)
+    results = llm.batch_llm(["ok", "empty", "boom", "ok"], config=cached_config, cache=True, return_exceptions=True)
+    assert results[0] == results[3] == "r"
+    assert isinstance(results[2], RuntimeError)
+    assert sent == ["ok", "empty", "boom"]  # 同批重複的 prompt 只送一次
+
+    sent.clear()
+    llm.batch_llm(["ok", "empty"], config=cached_config, cache=True)
+    assert sent == ["empty"]
+
+
+def test_forget_cached_makes_next_call_hit_backend(cached_config, monkeypatch):
+    backend, sent = _backend({"p": "壞回應"})
+    monkeypatch.setattr(llm, "_abatch_backend", backend)
+    llm.batch_llm(["p"], config=cached_config, tier="medium", cache=True)
+    assert llm.forget_cached(["p"], config=cached_config, tier="light") == 0  # tier 不同，key 不同
+    assert llm.forget_cached(["p"], config=cached_config, tier="medium") == 1
+    llm.batch_llm(["p"], config=cached_config, tier="medium", cache=True)
+    assert sent == ["p", "p"]
@@ -0,0 +1,59 @@
+"""Query engine：owner 快取依 generations 重新載入"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+
+import pytest
+
+import engine.query_engine as query_engine
+from engine.generations import LAYERS, bump_generation, read_generations
+
+
+def test_generations_start_at_zero_and_bump(tmp_path):
+    assert read_generations(tmp_path) == {layer: 0 for layer in LAYERS}
+    bump_generation(tmp_path, "traces")
+    gens = bump_generation(tmp_path, "traces", "frames")
+    assert gens["traces"] == 2 and gens["frames"] == 1 and gens["convictions"] == 0
+    assert read_generations(tmp_path) == gens
+    assert not (tmp_path / "generations.json.tmp").exists()
+
+
+def test_generations_tolerate_corrupt_manifest(tmp_path):
+    (tmp_path / "generations.json").write_text("{")
+    assert read_generations(tmp_path)["frames"] == 0
+
+
+@pytest.fixture
+def owner_cache(tmp_path, monkeypatch):
+    """用計數的假 loader 取代各層載入，回傳 (owner_dir, 各層載入次數)。"""
+    monkeypatch.setattr(query_engine, "_cache", OrderedDict())
+    loads = {layer: 0 for layer in query_engine._LAYER_LOADERS}
+
+    def loader(layer):
+        def load(owner_dir):
+            loads[layer] += 1
+            return []
+        return load
+
+    for layer in list(loads):
+        monkeypatch.setitem(query_engine._LAYER_LOADERS, layer, loader(layer))
+    monkeypatch.setattr(query_engine, "load_vector_indexes", lambda owner_dir, owner_id: {})
+    owner_dir = tmp_path / "o"
+    owner_dir.mkdir()
+    return owner_dir, loads
+
+
+def test_get_cached_reloads_only_bumped_layers(owner_cache, config):
+    owner_dir, loads = owner_cache
+    first = query_engine._get_cached("o", owner_dir, config)
+    assert all(n == 1 for n in loads.values())
+    assert query_engine._get_cached("o", owner_dir, config) is first
+
+    bump_generation(owner_dir, "traces")
+    second = query_engine._get_cached("o", owner_dir, config)
+    assert loads["traces"] == 2
+    assert loads["frames"] == loads["convictions"] == loads["identities"] == 1
+    # 換新的 dict，正在跑的查詢手上的舊快照不受影響
+    assert second is not first
+    assert first["generations"]["traces"] == 0 and second["generations"]["traces"] == 1
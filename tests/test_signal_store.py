@@ -0,0 +1,114 @@
+"""signals.jsonl byte offset 索引（_SignalOffsetIndex）"""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from engine.models import Signal
+from engine.signal_store import _SignalOffsetIndex
+
+
+def _signal(i: int, text: str | None = None) -> Signal:
+    return Signal.model_validate({
+        "owner_id": "o",
+        "signal_id": f"s{i}",
+        "direction": "output",
+        "modality": "spoken_spontaneous",
+        "content": {"text": text or f"說法 {i}", "type": "idea"},
+        "source": {"date": "2026-01-01", "context": "other"},
+        "lifecycle": {"active": True},
+    })
+
+
+def _write(path, signals: list[Signal], mode: str = "w") -> None:
+    with open(path, mode) as f:
+        for s in signals:
+            f.write(s.model_dump_json() + "\n")
+
+
+@pytest.fixture
+def signals_path(tmp_path):
+    path = tmp_path / "signals.jsonl"
+    _write(path, [_signal(i) for i in range(10)])
+    return path
+
+
+def test_read_returns_file_order(signals_path):
+    index = _SignalOffsetIndex(signals_path)
+    got = index.read(["s7", "s2", "s5", "missing"])
+    assert [s.signal_id for s in got] == ["s2", "s5", "s7"]
+
+
+def test_index_persists_and_reloads(signals_path):
+    _SignalOffsetIndex(signals_path).sync()
+    reloaded = _SignalOffsetIndex(signals_path)
+    assert len(reloaded) == 10
+    assert [s.signal_id for s in reloaded.read(["s9"])] == ["s9"]
+
+
+def test_sync_scans_only_appended_tail(signals_path):
+    index = _SignalOffsetIndex(signals_path)
+    index.sync()
+    _write(signals_path, [_signal(10), _signal(11)], mode="a")
+    assert "s11" not in index
+    index.sync()
+    assert "s11" in index
+    assert len(index) == 12
+
+
+def test_sync_ignores_partial_last_line(signals_path):
+    index = _SignalOffsetIndex(signals_path)
+    index.sync()
+    with open(signals_path, "a") as f:
+        f.write(_signal(10).model_dump_json())  # 還沒寫換行
+    index.sync()
+    assert "s10" not in index
+    with open(signals_path, "a") as f:
+        f.write("\n")
+    index.sync()
+    assert "s10" in index
+
+
+def test_sync_rebuilds_when_file_shrinks(signals_path):
+    index = _SignalOffsetIndex(signals_path)
+    index.sync()
+    _write(signals_path, [_signal(i) for i in range(3)])
+    index.sync()
+    assert len(index) == 3
+    assert [s.signal_id for s in index.read(["s0", "s2", "s8"])] == ["s0", "s2"]
+
+
+def test_read_rebuilds_on_stale_offsets(signals_path):
+    index = _SignalOffsetIndex(signals_path)
+    index.sync()
+    # 同樣長度但順序被改寫：舊 offset 會落在別的 signal 或行中間
+    lines = signals_path.read_bytes().splitlines(keepends=True)
+    signals_path.write_bytes(b"".join(lines[5:] + lines[:5]))
+    got = index.read(["s0", "s9", "s4"])
+    assert [s.signal_id for s in got] == ["s9", "s0", "s4"]
+
+
+def test_read_rebuilds_on_undecodable_offset(signals_path):
+    index = _SignalOffsetIndex(signals_path)
+    index.sync()
+    # 第一行變長，後面每個舊 offset 都落在行中間（JSONDecodeError）
+    lines = signals_path.read_bytes().splitlines(keepends=True)
+    first = json.loads(lines[0])
+    first["content"]["text"] += "很長的補充"
+    longer = (json.dumps(first, ensure_ascii=False) + "\n").encode("utf-8")
+    signals_path.write_bytes(longer + b"".join(lines[1:]))
+    got = index.read(["s3"])
+    assert [s.signal_id for s in got] == ["s3"]
+    assert got[0].content.text == "說法 3"
+
+
+def test_read_raises_when_rebuild_cannot_recover(signals_path, monkeypatch):
+    index = _SignalOffsetIndex(signals_path)
+    index.sync()
+    # rebuild 之後 offset 仍然錯：不能無限遞迴
+    monkeypatch.setattr(index, "rebuild", lambda: None)
+    signals_path.write_bytes(b"x" * signals_path.stat().st_size)
+    with pytest.raises(json.JSONDecodeError):
+        index.read(["s1"])
@@ -0,0 +1,177 @@
+"""Trace extractor：分組打包、合併 prompt 回應拆分、ledger 與 backfill"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+
+import engine.trace_extractor as trace_extractor
+from engine.config import get_owner_dir
+from engine.models import Signal
+from engine.signal_store import SignalStore
+from engine.trace_extractor import (
+    _commit_groups,
+    _load_processed_groups,
+    _load_traces,
+    _pack_groups,
+    _parse_group_response,
+    _parse_packed_response,
+    _split_responses,
+)
+
+
+def _signal(i: int, date: str = "2026-01-01", context: str = "other") -> Signal:
+    return Signal.model_validate({
+        "owner_id": "o",
+        "signal_id": f"s{i}",
+        "direction": "output",
+        "modality": "spoken_spontaneous",
+        "content": {"text": f"說法 {i}", "type": "idea"},
+        "source": {"date": date, "context": context},
+        "lifecycle": {"active": True},
+    })
+
+
+def _trace(group: str | None = None, **extra) -> dict:
+    rt = {
+        "trigger": {"situation": "要不要漲價", "stimulus_type": "self_reflection"},
+        "activated_convictions": [],
+        "reasoning_path": {"steps": [{"action": "analyze", "description": "比較成本"}], "style": "analytical"},
+        "conclusion": {"decision": "先不漲", "confidence": "high"},
+        "from_signals": [1],
+    }
+    if group is not None:
+        rt["group"] = group
+    rt.update(extra)
+    return rt
+
+
+@pytest.fixture
+def groups():
+    return [
+        ("2026-01-01", "other", [_signal(1, "2026-01-01")]),
+        ("2026-01-02", "other", [_signal(2, "2026-01-02")]),
+        ("2026-01-03", "email", [_signal(3, "2026-01-03", "email")]),
+    ]
+
+
+def test_pack_groups_respects_budget():
+    assert _pack_groups([30, 30, 30, 30], budget=100, overhead=20) == [[0, 1], [2, 3]]
+    # 單組超過預算時自己一包
+    assert _pack_groups([10, 500, 10], budget=100, overhead=20) == [[0], [1], [2]]
+    assert _pack_groups([10, 10], budget=0, overhead=20) == [[0], [1]]
+
+
+def test_parse_group_response_handles_code_fence(groups):
+    date, context, sigs = groups[0]
+    raw = "```json\n" + json.dumps({"traces": [_trace()]}) + "\n```"
+    traces = _parse_group_response(raw, sigs, date, context)
+    assert len(traces) == 1
+    assert traces[0].conclusion.output_signal == "s1"
+    assert _parse_group_response("not json", sigs, date, context) is None
+
+
+@pytest.mark.parametrize("tag", ["G2", "[G2]", "g2", "2", " [g2] "])
+def test_parse_packed_response_accepts_tag_variants(groups, tag):
+    raw = json.dumps({"traces": [_trace("G1"), _trace(tag)]})
+    per_group = _parse_packed_response(raw, groups)
+    assert [len(t) for t in per_group] == [1, 1, 0]
+    assert per_group[1][0].source.date == "2026-01-02"
+    assert per_group[1][0].conclusion.output_signal == "s2"
+
+
+@pytest.mark.parametrize("tag", [None, "", "Group 1", "G0", "G4", "GG1", "1a"])
+def test_parse_packed_response_retries_whole_pack_on_bad_tag(groups, tag):
+    raw = json.dumps({"traces": [_trace("G1"), _trace(tag)]})
+    assert _parse_packed_response(raw, groups) == [None, None, None]
+
+
+def test_parse_packed_response_invalid_json(groups):
+    assert _parse_packed_response("抱歉，我無法完成", groups) == [None, None, None]
+
+
+def test_parse_packed_response_empty_traces_is_success(groups):
+    assert _parse_packed_response(json.dumps({"traces": []}), groups) == [[], [], []]
+
+
+def test_split_responses_maps_packs_back_to_groups(groups):
+    packs = [[0, 1], [2]]
+    responses = [
+        json.dumps({"traces": [_trace("G2")]}),
+        "not json",
+    ]
+    per_group = _split_responses(groups, packs, responses)
+    assert per_group[0] == []
+    assert len(per_group[1]) == 1
+    assert per_group[2] is None
+
+
+# ─── Ledger / backfill ───
+
+
+def _ledger(owner_dir) -> list[dict]:
+    with open(owner_dir / "trace_groups.jsonl") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _traces_for(group) -> list:
+    date, context, sigs = group
+    return _parse_group_response(json.dumps({"traces": [_trace()]}), sigs, date, context)
+
+
+def test_commit_groups_skips_keys_with_any_failed_chunk(tmp_path, groups):
+    # 同一個 (date, context) 拆成兩個 chunk（index 0 與 3）：其中一個失敗，整個 key 都不記
+    chunked = groups + [("2026-01-01", "other", [_signal(4, "2026-01-01")])]
+    per_group = {0: _traces_for(chunked[0]), 1: [], 2: _traces_for(chunked[2]), 3: None}
+
+    new_traces = _commit_groups(tmp_path, chunked, per_group)
+    assert [t.source.date for t in new_traces] == ["2026-01-03"]
+    # 沒產出 trace 的分組也記進 ledger，不會每次重跑
+    assert [(e["date"], e["context"], e["traces"]) for e in _ledger(tmp_path)] == [
+        ("2026-01-02", "other", 0),
+        ("2026-01-03", "email", 1),
+    ]
+    assert len(_load_traces(tmp_path)) == 1
+    assert ("2026-01-01", "other") not in _load_processed_groups(tmp_path)
+
+
+def test_backfill_commits_as_prompts_finish_and_resumes(config, fake_embedder, monkeypatch):
+    store = SignalStore(config, "o")
+    store.ingest([_signal(i, f"2026-01-{1 + i % 6:02d}") for i in range(18)])
+    config["engine"]["trace"] = {"pack_token_budget": 0}
+
+    calls = {"n": 0, "live": 0, "peak": 0}
+
+    async def fake_acall(prompt, **kwargs):
+        calls["n"] += 1
+        n = calls["n"]
+        calls["live"] += 1
+        calls["peak"] = max(calls["peak"], calls["live"])
+        await asyncio.sleep(0.001)
+        calls["live"] -= 1
+        if n == 2:
+            raise RuntimeError("rate limited")
+        if n == 4:
+            return "not json"
+        return json.dumps({"traces": [_trace()]})
+
+    monkeypatch.setattr(trace_extractor, "acall_llm", fake_acall)
+    monkeypatch.setattr(trace_extractor, "forget_cached", lambda *a, **kw: 0)
+    progress: list[dict] = []
+
+    summary = trace_extractor.backfill("o", config, on_progress=progress.append)
+    assert summary["groups"] == 6
+    assert summary["groups_done"] == 4
+    assert 1 < calls["peak"] <= 3  # 並行，但不超過 cloud.max_concurrent
+    assert len(progress) == 6
+    assert progress[-1]["prompts_done"] == 6
+
+    # 失敗的兩組留到下次；已記 ledger 的不再送
+    summary = trace_extractor.backfill("o", config)
+    assert summary["groups"] == 2
+    assert summary["groups_done"] == 2
+    owner_dir = get_owner_dir(config, "o")
+    assert len(_load_traces(owner_dir)) == 6
+    assert trace_extractor.backfill("o", config)["groups"] == 0
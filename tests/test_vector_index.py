@@ -0,0 +1,36 @@
+"""Vector index：in-memory exact search 與 ChromaDB query 結果同形"""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import numpy as np
+
+from engine.vector_index import _VectorIndex
+
+
+def _collection(ids: list[str], embeddings: list[list[float]]) -> SimpleNamespace:
+    return SimpleNamespace(get=lambda include: {"ids": ids, "embeddings": embeddings})
+
+
+def test_query_returns_chroma_shaped_cosine_results():
+    index = _VectorIndex.from_collection(_collection(
+        ["a", "b", "c"], [[3, 0, 0], [1, 1, 0], [0, 0, 2]],
+    ))
+    np.testing.assert_allclose(np.linalg.norm(index.matrix, axis=1), 1.0, rtol=1e-6)
+
+    result = index.query([1, 0, 0], n_results=2)
+    assert set(result) == {"ids", "distances"}
+    assert result["ids"] == [["a", "b"]]
+    np.testing.assert_allclose(result["distances"], [[0.0, 1 - np.sqrt(0.5)]], atol=1e-6)
+
+
+def test_query_caps_n_results_and_handles_empty():
+    index = _VectorIndex.from_collection(_collection(["a", "b"], [[1, 0], [0, 1]]))
+    result = index.query([0, 1], n_results=10)
+    assert result["ids"] == [["b", "a"]]
+    assert len(index) == 2 and index.nbytes > 0
+
+    empty = _VectorIndex.from_collection(_collection([], []))
+    assert len(empty) == 0
+    assert empty.query([1, 0], n_results=5) == {"ids": [[]], "distances": [[]]}
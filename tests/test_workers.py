@@ -0,0 +1,50 @@
+"""Worker pool：排隊上限與 503"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import pytest
+
+import engine.workers as workers
+
+
+@pytest.fixture
+def pool():
+    workers.shutdown()
+    workers.configure({"api": {"workers": 1, "max_queue": 1}})
+    yield workers
+    workers.shutdown()
+
+
+def test_run_blocking_returns_result(pool):
+    assert asyncio.run(pool.run_blocking(lambda a, b=0: a + b, 2, b=3)) == 5
+    assert pool.pool_stats()["in_flight"] == 0
+
+
+def test_run_blocking_rejects_when_full(pool):
+    release = threading.Event()
+    rejected = pool.pool_stats()["rejected"]
+
+    async def main():
+        busy = [asyncio.ensure_future(pool.run_blocking(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0)
+        stats = pool.pool_stats()
+        assert stats["in_flight"] == 2 and stats["queued"] == 1
+        with pytest.raises(workers.WorkerPoolFull):
+            await pool.run_blocking(release.wait)
+        release.set()
+        await asyncio.gather(*busy)
+
+    asyncio.run(main())
+    stats = pool.pool_stats()
+    assert stats["rejected"] == rejected + 1 and stats["in_flight"] == 0
+
+
+def test_worker_pool_full_maps_to_503():
+    from engine.api import worker_pool_full_handler
+
+    response = asyncio.run(worker_pool_full_handler(None, workers.WorkerPoolFull("滿了")))
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "5"